@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import os
+import threading
 import time
 from pathlib import Path
 from typing import TYPE_CHECKING
@@ -27,15 +29,33 @@ class AwsBoto3Error(RuntimeError):
     pass
 
 
-# Global client instances (reused for connection pooling)
+# Global client instances (reused for connection pooling), shared by all threads.
+# Created under _clients_lock: boto3's default session isn't safe to build
+# clients from concurrently, and racing upload workers would otherwise each get
+# a client (and connection pool) of their own.
 _s3_client: BaseClient | None = None
 _presign_client: BaseClient | None = None
+_clients_lock = threading.Lock()
+_large_transfer_config: TransferConfig | None = None
+
+# Files above this use _large_transfer_config; smaller ones get boto3's
+# default TransferConfig (which already goes multipart from 8MB).
+_LARGE_FILE_BYTES = 100 * 1024 * 1024
+
+# Long-lived transfer managers for s3_upload_file, keyed by "large file?" and
+# stored with the client they wrap. client.upload_file would build (and tear
+# down) a TransferManager and its thread pools for every object.
+_transfer_managers: dict[bool, tuple[BaseClient, object]] = {}
 
 
 def _get_s3_client() -> BaseClient:
     """Get or create a reusable S3 client with connection pooling."""
     global _s3_client
-    if _s3_client is None:
+    if _s3_client is not None:
+        return _s3_client
+    with _clients_lock:
+        if _s3_client is not None:
+            return _s3_client
         if not BOTO3_AVAILABLE:
             raise AwsBoto3Error(
                 "boto3 is not installed.\n"
@@ -46,19 +66,24 @@ def _get_s3_client() -> BaseClient:
         # Configure for better performance: connection pooling and retries
         config = Config(
             max_pool_connections=50,  # Connection pooling
+            tcp_keepalive=True,  # Keep idle pooled connections alive between log uploads
             retries={
                 'max_attempts': 3,
                 'mode': 'adaptive'  # Adaptive retry mode
             }
         )
         _s3_client = boto3.client('s3', config=config)
-    return _s3_client
+        return _s3_client
 
 
 def _get_presign_client() -> BaseClient:
     """Get or create a reusable S3 client for presigning (lighter config)."""
     global _presign_client
-    if _presign_client is None:
+    if _presign_client is not None:
+        return _presign_client
+    with _clients_lock:
+        if _presign_client is not None:
+            return _presign_client
         if not BOTO3_AVAILABLE:
             raise AwsBoto3Error(
                 "boto3 is not installed.\n"
@@ -66,7 +91,44 @@ def _get_presign_client() -> BaseClient:
                 "  Or: pip install -e ."
             )
         _presign_client = boto3.client('s3')
-    return _presign_client
+        return _presign_client
+
+
+def _reset_clients_after_fork() -> None:
+    """Drop cached clients in a forked child; their pooled sockets belong to the parent."""
+    global _s3_client, _presign_client, _clients_lock
+    _s3_client = None
+    _presign_client = None
+    # The managers' worker threads don't exist in the child
+    _transfer_managers.clear()
+    _clients_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_clients_after_fork)
+
+
+def _get_large_transfer_config() -> TransferConfig:
+    """Get or create the shared TransferConfig for files over _LARGE_FILE_BYTES."""
+    global _large_transfer_config
+    if _large_transfer_config is None:
+        _large_transfer_config = TransferConfig(
+            multipart_threshold=_LARGE_FILE_BYTES,
+            max_concurrency=10,
+            multipart_chunksize=10 * 1024 * 1024,  # 10MB chunks
+        )
+    return _large_transfer_config
+
+
+def _get_transfer_manager(client: BaseClient, *, large: bool):
+    """Shared TransferManager for client; safe to submit to from several threads."""
+    with _clients_lock:
+        entry = _transfer_managers.get(large)
+        if entry is None or entry[0] is not client:
+            config = _get_large_transfer_config() if large else TransferConfig()
+            entry = (client, boto3.s3.transfer.create_transfer_manager(client, config))
+            _transfer_managers[large] = entry
+        return entry[1]
 
 
 def _parse_boto3_error(error: ClientError) -> str:
@@ -103,7 +165,15 @@ def _parse_boto3_error(error: ClientError) -> str:
     return f"Error code: {error_code}"
 
 
-def s3_upload_file(local_path: Path, *, bucket: str, key: str, retries: int = 3, content_type: str | None = None) -> None:
+def s3_upload_file(
+    local_path: Path,
+    *,
+    bucket: str,
+    key: str,
+    retries: int = 3,
+    content_type: str | None = None,
+    size_bytes: int | None = None,
+) -> None:
     """Upload a file to S3 using boto3 (faster than AWS CLI subprocess).
     
     Args:
@@ -113,17 +183,21 @@ def s3_upload_file(local_path: Path, *, bucket: str, key: str, retries: int = 3,
         retries: Number of retry attempts (handled by boto3 config)
         content_type: MIME type for the file (e.g., 'text/html', 'image/png'). 
                      If None, boto3 will attempt to guess from file extension.
+        size_bytes: File size if the caller already has it (saves a stat)
     
     Raises:
         AwsBoto3Error: If upload fails
     """
     client = _get_s3_client()
-    file_size = local_path.stat().st_size
+    file_size = size_bytes if size_bytes is not None else local_path.stat().st_size
     
+    # Pre-compressed pages (index.html.gz) are served as HTML with gzip encoding
+    gzipped_html = local_path.name.lower().endswith(".html.gz")
+
     # Auto-detect content type from file extension if not provided
     if content_type is None:
         suffix = local_path.suffix.lower()
-        if suffix == ".html":
+        if suffix == ".html" or gzipped_html:
             content_type = "text/html; charset=utf-8"
         elif suffix == ".json":
             content_type = "application/json; charset=utf-8"
@@ -143,34 +217,16 @@ def s3_upload_file(local_path: Path, *, bucket: str, key: str, retries: int = 3,
     
     # Prepare ExtraArgs for metadata
     extra_args = {"ContentType": content_type}
+    if gzipped_html:
+        extra_args["ContentEncoding"] = "gzip"
     
     # Use multipart upload for large files (>100MB) for better performance and error recovery
-    transfer_config = None
-    if file_size > 100 * 1024 * 1024:  # > 100MB
-        transfer_config = TransferConfig(
-            multipart_threshold=100 * 1024 * 1024,
-            max_concurrency=10,
-            multipart_chunksize=10 * 1024 * 1024,  # 10MB chunks
-        )
+    manager = _get_transfer_manager(client, large=file_size > _LARGE_FILE_BYTES)
     
     last_error: Exception | None = None
     for attempt in range(1, retries + 1):
         try:
-            if transfer_config:
-                client.upload_file(
-                    str(local_path),
-                    bucket,
-                    key,
-                    ExtraArgs=extra_args,
-                    Config=transfer_config
-                )
-            else:
-                client.upload_file(
-                    str(local_path),
-                    bucket,
-                    key,
-                    ExtraArgs=extra_args
-                )
+            manager.upload(str(local_path), bucket, key, extra_args=extra_args).result()
             return  # Success
         except ClientError as e:
             last_error = e
@@ -199,6 +255,94 @@ def s3_upload_file(local_path: Path, *, bucket: str, key: str, retries: int = 3,
         raise AwsBoto3Error(f"Upload failed after {retries} attempts: {last_error}") from last_error
 
 
+# S3 rejects non-final multipart parts smaller than this.
+S3_MIN_PART_BYTES = 5 * 1024 * 1024
+
+
+def s3_put_bytes(data: bytes, *, bucket: str, key: str, content_type: str) -> None:
+    """Upload an in-memory payload as an S3 object.
+
+    Args:
+        data: Object body
+        bucket: S3 bucket name
+        key: S3 object key (path)
+        content_type: MIME type for the object
+
+    Raises:
+        AwsBoto3Error: If upload fails
+    """
+    client = _get_s3_client()
+    try:
+        client.put_object(Bucket=bucket, Key=key, Body=data, ContentType=content_type)
+    except Exception as e:
+        error_msg = f"Failed to upload {len(data)} bytes to s3://{bucket}/{key}"
+        if isinstance(e, ClientError):
+            guidance = _parse_boto3_error(e)
+            if guidance:
+                error_msg += f"\n\n{guidance}\n"
+        error_msg += f"\nError: {e}"
+        raise AwsBoto3Error(error_msg) from e
+
+
+def s3_append_bytes(data: bytes, *, bucket: str, key: str, offset: int, content_type: str | None = None) -> None:
+    """Replace an S3 object with its first ``offset`` bytes followed by data.
+
+    Only ``data`` is sent; the existing prefix is copied server-side. The object
+    is rebuilt as a two-part multipart upload: part 1 is an UploadPartCopy of
+    bytes [0, offset) of the current object, part 2 is data. The object stays
+    whole and readable between calls, unlike a long-running multipart upload
+    that is only visible once completed.
+
+    Args:
+        data: Bytes to append
+        bucket: S3 bucket name
+        key: S3 object key (path)
+        offset: Number of leading bytes of the existing object to keep
+                (must be at least S3_MIN_PART_BYTES)
+        content_type: MIME type for the rebuilt object
+
+    Raises:
+        AwsBoto3Error: If the append fails (the partial upload is aborted)
+    """
+    if offset < S3_MIN_PART_BYTES:
+        raise AwsBoto3Error(
+            f"Cannot append to s3://{bucket}/{key}: prefix of {offset} bytes is below "
+            f"the {S3_MIN_PART_BYTES}-byte multipart minimum; upload the whole object instead."
+        )
+    client = _get_s3_client()
+
+    create_args = {"Bucket": bucket, "Key": key, "ContentType": content_type or "text/plain; charset=utf-8"}
+    upload_id = client.create_multipart_upload(**create_args)["UploadId"]
+    try:
+        copied = client.upload_part_copy(
+            Bucket=bucket,
+            Key=key,
+            UploadId=upload_id,
+            PartNumber=1,
+            CopySource={"Bucket": bucket, "Key": key},
+            CopySourceRange=f"bytes=0-{offset - 1}",
+        )
+        parts = [{"PartNumber": 1, "ETag": copied["CopyPartResult"]["ETag"]}]
+        if data:
+            sent = client.upload_part(Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=2, Body=data)
+            parts.append({"PartNumber": 2, "ETag": sent["ETag"]})
+        client.complete_multipart_upload(
+            Bucket=bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+        )
+    except Exception as e:
+        try:
+            client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        except Exception:
+            pass
+        error_msg = f"Failed to append {len(data)} bytes to s3://{bucket}/{key}"
+        if isinstance(e, ClientError):
+            guidance = _parse_boto3_error(e)
+            if guidance:
+                error_msg += f"\n\n{guidance}\n"
+        error_msg += f"\nError: {e}"
+        raise AwsBoto3Error(error_msg) from e
+
+
 def s3_object_exists(*, bucket: str, key: str) -> bool:
     """Check if an S3 object exists.
     
@@ -220,6 +364,27 @@ def s3_object_exists(*, bucket: str, key: str) -> bool:
         raise
 
 
+def s3_list_keys(*, bucket: str, prefix: str) -> set[str]:
+    """All object keys under prefix (one ListObjectsV2 request per 1000 keys).
+    
+    Raises:
+        AwsBoto3Error: If listing fails (e.g. no s3:ListBucket permission)
+    """
+    client = _get_s3_client()
+    keys: set[str] = set()
+    try:
+        for page in client.get_paginator("list_objects_v2").paginate(Bucket=bucket, Prefix=prefix):
+            keys.update(obj["Key"] for obj in page.get("Contents", ()))
+    except ClientError as e:
+        guidance = _parse_boto3_error(e)
+        error_msg = f"Failed to list s3://{bucket}/{prefix}"
+        if guidance:
+            error_msg += f"\n\n{guidance}\n"
+        error_msg += f"\nError: {e}"
+        raise AwsBoto3Error(error_msg) from e
+    return keys
+
+
 def s3_presign_url(*, bucket: str, key: str, expires_in_seconds: int) -> str:
     """Generate a presigned URL for an S3 object using boto3.
     
@@ -13,7 +13,7 @@ from .config import load_config
 from .doctor import format_results, run_doctor
 from .logging_utils import setup_logging
 from .pipeline import PipelineError, run_pipeline
-from .status import Status, StatusWriter, get_hostname, get_ip_address
+from .status import AsyncStatusWriter, Status, StatusWriter, get_hostname, get_ip_address
 from .volume_watch import find_candidate_mounts, pick_mount_with_dcim
 from .watchdog_watcher import WatchdogWatcher
 from .web import GhostRollWebServer
@@ -312,10 +312,14 @@ def cmd_run(args: argparse.Namespace) -> int:
     else:
         volume = Path(vol_arg).resolve()
     logger = setup_logging(session_dir=None, verbose=not args.quiet)
-    status = StatusWriter(
-        json_path=cfg.status_path,
-        image_path=cfg.status_image_path,
-        image_size=cfg.status_image_size,
+    # Status updates are written off the pipeline's thread; close() below
+    # flushes them before the caller (e.g. watch mode) writes its own.
+    status = AsyncStatusWriter(
+        StatusWriter(
+            json_path=cfg.status_path,
+            image_path=cfg.status_image_path,
+            image_size=cfg.status_image_size,
+        )
     )
     status.write(Status(state="running", step="start", message="Starting run…", volume=str(volume)))
     logger.info(f"Volume: {volume}")
@@ -361,6 +365,8 @@ def cmd_run(args: argparse.Namespace) -> int:
             )
         )
         return 2
+    finally:
+        status.close()
 
 
 def cmd_watch(args: argparse.Namespace) -> int:
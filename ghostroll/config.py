@@ -6,6 +6,9 @@ from pathlib import Path
 import multiprocessing
 
 
+HASH_ALGOS = ("sha256", "blake3")
+
+
 def _expand(p: str) -> Path:
     return Path(os.path.expanduser(p)).resolve()
 
@@ -71,6 +74,9 @@ class Config:
     # RAW file upload settings
     upload_raw_files: bool
 
+    # Content hash identifying ingested files: "sha256" or "blake3" (optional dependency)
+    hash_algo: str
+
     @property
     def sessions_dir(self) -> Path:
         return self.base_output_dir
@@ -107,6 +113,7 @@ def load_config(
     web_host: str | None = None,
     web_port: int | None = None,
     upload_raw_files: bool | None = None,
+    hash_algo: str | None = None,
 ) -> Config:
     env = os.environ
     
@@ -256,6 +263,10 @@ def load_config(
         # Default to enabled
         upload_raw_files = True
 
+    hash_algo = (hash_algo or env.get("GHOSTROLL_HASH_ALGO", "sha256")).strip().lower()
+    if hash_algo not in HASH_ALGOS:
+        raise ValueError(f"Invalid hash algorithm '{hash_algo}' (expected one of: {', '.join(HASH_ALGOS)})")
+
     cfg = Config(
         sd_label=sd_label,
         base_output_dir=_expand(base_output_dir),
@@ -281,6 +292,7 @@ def load_config(
         web_host=web_host,
         web_port=web_port,
         upload_raw_files=upload_raw_files,
+        hash_algo=hash_algo,
     )
 
     cfg.base_output_dir.mkdir(parents=True, exist_ok=True)
@@ -30,6 +30,16 @@ CREATE TABLE IF NOT EXISTS failed_files (
   failure_count INTEGER NOT NULL DEFAULT 1
 );
 
+-- SHA-256 of local files keyed by inode; valid while mtime_ns and size still match
+CREATE TABLE IF NOT EXISTS file_hashes (
+  dev INTEGER NOT NULL,
+  ino INTEGER NOT NULL,
+  mtime_ns INTEGER NOT NULL,
+  size_bytes INTEGER NOT NULL,
+  sha256 TEXT NOT NULL,
+  PRIMARY KEY (dev, ino)
+);
+
 -- Indexes for query performance
 CREATE INDEX IF NOT EXISTS idx_ingested_files_size_bytes ON ingested_files(size_bytes);
 CREATE INDEX IF NOT EXISTS idx_ingested_files_first_seen_utc ON ingested_files(first_seen_utc);
@@ -39,10 +49,21 @@ CREATE INDEX IF NOT EXISTS idx_failed_files_size_bytes ON failed_files(size_byte
 """
 
 
+# Wait this long for another connection's write lock instead of failing with
+# "database is locked"; WAL readers never wait on the writer.
+BUSY_TIMEOUT_S = 5.0
+
+# Per-connection settings (journal_mode and synchronous are set by SCHEMA)
+_CONNECTION_PRAGMAS = """
+PRAGMA temp_store=MEMORY;
+PRAGMA mmap_size=268435456;
+"""
+
+
 def connect(db_path: Path) -> sqlite3.Connection:
-    conn = sqlite3.connect(str(db_path))
+    conn = sqlite3.connect(str(db_path), timeout=BUSY_TIMEOUT_S)
     conn.row_factory = sqlite3.Row
-    conn.executescript(SCHEMA)
+    conn.executescript(SCHEMA + _CONNECTION_PRAGMAS)
     return conn
 
 
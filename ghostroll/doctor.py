@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import hashlib
 import os
+import re
 import shutil
+import ssl
 import subprocess
 from dataclasses import dataclass
 from pathlib import Path
@@ -131,6 +134,34 @@ def _check_s3_access(cfg: Config) -> CheckResult:
     return CheckResult("s3_access", True, f"S3 access OK for bucket: {cfg.s3_bucket}")
 
 
+_CPUINFO = Path("/proc/cpuinfo")
+
+# /proc/cpuinfo flags for SHA-256 instructions: x86 "sha_ni", ARMv8 "sha2"
+_SHA_CPU_FLAG = re.compile(r"^(?:flags|Features)\s*:.*\b(sha_ni|sha2)\b", re.MULTILINE)
+
+
+def _check_hash_backend() -> CheckResult:
+    # Every ingested file is SHA-256 hashed; hashlib only gets the CPU's SHA
+    # instructions when it is backed by OpenSSL.
+    if type(hashlib.sha256()).__module__ != "_hashlib":
+        return CheckResult(
+            "hash_backend",
+            False,
+            "hashlib.sha256 is Python's built-in implementation (no OpenSSL); hashing will be slow",
+        )
+    try:
+        m = _SHA_CPU_FLAG.search(_CPUINFO.read_text(encoding="utf-8", errors="replace"))
+    except OSError:
+        return CheckResult("hash_backend", True, f"SHA-256 via {ssl.OPENSSL_VERSION} (CPU features unknown)")
+    if m:
+        return CheckResult("hash_backend", True, f"SHA-256 via {ssl.OPENSSL_VERSION} with CPU SHA extensions ({m.group(1)})")
+    return CheckResult(
+        "hash_backend",
+        True,
+        f"SHA-256 via {ssl.OPENSSL_VERSION}; CPU has no SHA extensions, hashing is software-only",
+    )
+
+
 def run_doctor(
     *,
     base_dir: str | None = None,
@@ -155,6 +186,7 @@ def run_doctor(
     results.append(_check_sd_detection(cfg))
     results.append(_check_disk_space(cfg.base_output_dir, min_free_gb=min_free_gb))
     results.append(_check_status_paths(cfg))
+    results.append(_check_hash_backend())
 
     if not skip_aws:
         results.append(_check_aws_cli())
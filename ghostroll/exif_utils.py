@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
+from types import ModuleType
 
 
 @dataclass(frozen=True)
@@ -12,19 +13,67 @@ class BasicExif:
     camera: str | None
 
 
+_NO_EXIF = BasicExif(captured_at=None, captured_at_display=None, camera=None)
+
+_JPEG_SOI = b"\xff\xd8\xff"
+
+# PIL.Image, resolved on first use. False means the import failed; don't retry.
+_PIL_IMAGE: ModuleType | bool | None = None
+
+
+def _get_pil() -> ModuleType | None:
+    global _PIL_IMAGE
+    if _PIL_IMAGE is None:
+        try:
+            from PIL import Image
+        except Exception:
+            _PIL_IMAGE = False
+        else:
+            _PIL_IMAGE = Image
+    return _PIL_IMAGE or None
+
+
 def _parse_exif_datetime(s: str) -> datetime | None:
     """
     Common EXIF datetime format: 'YYYY:MM:DD HH:MM:SS'
+
+    The format is fixed-width ASCII, so fields are sliced by position instead of
+    going through strptime. An optional '+HHMM' / '+HH:MM' UTC offset is accepted.
     """
     s = (s or "").strip()
-    if not s:
+    if len(s) < 19:
         return None
-    for fmt in ("%Y:%m:%d %H:%M:%S", "%Y:%m:%d %H:%M:%S%z"):
+    if s[4] != ":" or s[7] != ":" or s[10] != " " or s[13] != ":" or s[16] != ":":
+        return None
+    digits = s[0:4] + s[5:7] + s[8:10] + s[11:13] + s[14:16] + s[17:19]
+    # isdigit() alone also accepts non-ASCII digits such as "²", which int() rejects
+    if not (digits.isascii() and digits.isdigit()):
+        return None
+
+    tz = None
+    if len(s) > 19:
+        offset = s[19:].replace(":", "")
+        if len(offset) != 5 or offset[0] not in "+-" or not (offset[1:].isascii() and offset[1:].isdigit()):
+            return None
+        minutes = int(offset[1:3]) * 60 + int(offset[3:5])
         try:
-            return datetime.strptime(s, fmt)
-        except Exception:
-            continue
-    return None
+            tz = timezone(timedelta(minutes=-minutes if offset[0] == "-" else minutes))
+        except ValueError:
+            # Offsets must be under 24 hours
+            return None
+
+    try:
+        return datetime(
+            int(s[0:4]),
+            int(s[5:7]),
+            int(s[8:10]),
+            int(s[11:13]),
+            int(s[14:16]),
+            int(s[17:19]),
+            tzinfo=tz,
+        )
+    except ValueError:
+        return None
 
 
 def extract_basic_exif(jpeg_path: Path) -> BasicExif:
@@ -33,40 +82,39 @@ def extract_basic_exif(jpeg_path: Path) -> BasicExif:
     Derived outputs strip EXIF, so call this on originals.
     """
     try:
-        from PIL import Image
+        with jpeg_path.open("rb") as fh:
+            # Only JPEGs (SOI marker) carry the APP1 block we read; skip Image.open otherwise.
+            if fh.read(3) != _JPEG_SOI:
+                return _NO_EXIF
+            Image = _get_pil()
+            if Image is None:
+                return _NO_EXIF
+            fh.seek(0)
+            with Image.open(fh) as im:
+                exif = im.getexif()
+                if not exif:
+                    return _NO_EXIF
+
+                # EXIF tag IDs
+                make = exif.get(271)
+                model = exif.get(272)
+                dt_original = exif.get(36867) or exif.get(306)  # DateTimeOriginal or DateTime
+
+                captured_at = _parse_exif_datetime(str(dt_original) if dt_original is not None else "")
+                captured_display = (
+                    captured_at.strftime("%Y-%m-%d %H:%M:%S") if captured_at is not None else None
+                )
+
+                make_s = str(make).strip() if make is not None else ""
+                model_s = str(model).strip() if model is not None else ""
+                camera = " ".join([p for p in [make_s, model_s] if p])
+                if camera == "":
+                    camera = None
+
+                return BasicExif(
+                    captured_at=captured_at,
+                    captured_at_display=captured_display,
+                    camera=camera,
+                )
     except Exception:
-        return BasicExif(captured_at=None, captured_at_display=None, camera=None)
-
-    try:
-        with Image.open(jpeg_path) as im:
-            exif = im.getexif()
-            if not exif:
-                return BasicExif(captured_at=None, captured_at_display=None, camera=None)
-
-            # EXIF tag IDs
-            make = exif.get(271)
-            model = exif.get(272)
-            dt_original = exif.get(36867) or exif.get(306)  # DateTimeOriginal or DateTime
-
-            captured_at = _parse_exif_datetime(str(dt_original) if dt_original is not None else "")
-            captured_display = (
-                captured_at.strftime("%Y-%m-%d %H:%M:%S") if captured_at is not None else None
-            )
-
-            make_s = str(make).strip() if make is not None else ""
-            model_s = str(model).strip() if model is not None else ""
-            camera = " ".join([p for p in [make_s, model_s] if p])
-            if camera == "":
-                camera = None
-
-            return BasicExif(
-                captured_at=captured_at,
-                captured_at_display=captured_display,
-                camera=camera,
-            )
-    except Exception:
-        return BasicExif(captured_at=None, captured_at_display=None, camera=None)
-
-
-
-
+        return _NO_EXIF
@@ -1,359 +1,533 @@
 from __future__ import annotations
 
+import gzip
 import html
 import json
+import os
+import re
+import secrets
+from collections.abc import Iterable, Iterator
+from functools import lru_cache
 from pathlib import Path
 
+__all__ = [
+    "build_index_html",
+    "build_index_html_from_items",
+    "build_index_html_loading",
+    "build_index_html_presigned",
+]
 
-def _posix(p: Path) -> str:
-    return "/".join(p.parts)
 
+# html.escape(quote=True) only rewrites these; most hrefs and captions contain none.
+_NEEDS_ESC = re.compile("[&<>\"']").search
+
+
+# Per-tile markup; only the escaped values change between tiles. Positional
+# %-formatting: (full, full, enhanced_attr, cap, sub, idx, num, thumb, alt).
+_TILE_FMT = (
+    '<a class="tile" href="%s" data-full="%s"%s data-cap="%s" data-sub="%s" '
+    'data-idx="%d" aria-label="Open image %d">'
+    '<img src="%s" loading="lazy" decoding="async" alt="%s">'
+    "</a>\n"
+)
+
+
+def _esc(s: str) -> str:
+    return html.escape(s) if _NEEDS_ESC(s) else s
+
+
+def _with_jpg_suffix(rel_posix: str) -> str:
+    """String-only equivalent of PurePosixPath(rel_posix).with_suffix(".jpg")."""
+    name_start = rel_posix.rfind("/") + 1
+    dot = rel_posix.rfind(".")
+    if dot > name_start and dot < len(rel_posix) - 1:
+        return rel_posix[:dot] + ".jpg"
+    return rel_posix + ".jpg"
+
+
+def _write_atomic(out_path: Path, data: bytes, *, durable: bool = False) -> None:
+    """
+    Writes data with a single os.write loop into a uniquely named sibling temp file,
+    then renames it over out_path so readers never observe a half-written page and
+    concurrent writers never share a temp file.
+
+    The pages are reproducible, so fsync is skipped unless durable=True.
+    """
+    tmp_path = out_path.with_name(f"{out_path.name}.tmp.{secrets.token_hex(4)}")
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    try:
+        try:
+            view = memoryview(data)
+            while view:
+                n = os.write(fd, view)
+                view = view[n:]
+            if durable:
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _iter_thumbs(root: Path) -> Iterator[str]:
+    """
+    Yields the forward-slash path relative to root of every file under root.
+
+    Walks with os.scandir so the file/dir checks come from the cached readdir
+    d_type instead of an extra stat() per entry. Each directory's entries are
+    sorted by name and subdirectories are descended in place, so paths come
+    out in per-component order without a global sort.
+    """
+    stack: list[tuple[Iterator[os.DirEntry[str]], str]] = []
+
+    def _push(dir_path: str, rel_prefix: str) -> None:
+        try:
+            with os.scandir(dir_path) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            return
+        stack.append((iter(entries), rel_prefix))
+
+    _push(str(root), "")
+    while stack:
+        entries, rel_prefix = stack[-1]
+        for entry in entries:
+            rel = rel_prefix + entry.name
+            if entry.is_dir(follow_symlinks=False):
+                _push(entry.path, rel + "/")
+                break
+            if entry.is_file():
+                yield rel
+        else:
+            stack.pop()
+
+
+# Static scaffolding of the gallery page, encoded once at import.
+_GALLERY_HEAD_OPEN = (
+    "<!doctype html>\n"
+    "<html><head><meta charset=\"utf-8\">"
+    "<meta name=\"viewport\" content=\"width=device-width,initial-scale=1\">"
+    "<link rel=\"icon\" href=\"data:,\">"
+    "<title>"
+).encode("utf-8")
+
+_GALLERY_HEAD_CLOSE = (
+    "</title>\n"
+    "<style>"
+    ":root{color-scheme:light dark;"
+    "--bg:#0b0f14;--fg:#e7edf5;--muted:#9aa7b5;--card:#101826;--border:#1a2a3d;"
+    "--shadow:0 10px 30px rgba(0,0,0,.35);--radius:14px}"
+    "@media (prefers-color-scheme:light){"
+    ":root{--bg:#f6f8fb;--fg:#111827;--muted:#5b6472;--card:#ffffff;--border:#e6e9ef;"
+    "--shadow:0 10px 30px rgba(17,24,39,.08)}}"
+    "html,body{height:100%}"
+    "body{margin:0;background:var(--bg);color:var(--fg);font-family:ui-sans-serif,system-ui,-apple-system,Segoe UI,Roboto,Helvetica,Arial}"
+    ".skip-link{position:absolute;top:-40px;left:0;background:var(--card);color:var(--fg);padding:8px 16px;text-decoration:none;z-index:100;border-radius:4px}"
+    ".skip-link:focus{top:0}"
+    ".wrap{max-width:1100px;margin:0 auto;padding:max(18px,env(safe-area-inset-top)) max(18px,env(safe-area-inset-right)) max(18px,env(safe-area-inset-bottom)) max(18px,env(safe-area-inset-left))}"
+    ".top{display:flex;align-items:baseline;gap:12px;justify-content:space-between;margin-bottom:14px}"
+    ".title{font-size:18px;font-weight:700;letter-spacing:.2px;margin:0}"
+    ".meta{color:var(--muted);font-size:13px}"
+    ".btn{display:inline-flex;align-items:center;gap:6px;padding:8px 10px;border-radius:999px;"
+    "border:1px solid var(--border);background:var(--card);text-decoration:none;color:inherit}"
+    ".btn:hover{filter:brightness(1.05)}"
+    ".btn:focus{outline:2px solid #3b82f6;outline-offset:2px}"
+    ".grid{display:flex;flex-direction:column;gap:12px}"
+    ".tile{position:relative;display:block;border-radius:var(--radius);overflow:hidden;background:var(--card);"
+    "border:1px solid var(--border);box-shadow:var(--shadow);transform:translateZ(0);width:100%;"
+    "transition:transform 0.2s,box-shadow 0.2s;cursor:pointer}"
+    ".tile:hover{transform:translateY(-2px);box-shadow:0 12px 40px rgba(0,0,0,.4)}"
+    ".tile:focus{outline:2px solid #3b82f6;outline-offset:2px}"
+    ".tile:focus:not(:focus-visible){outline:none}"
+    ".tile:focus-visible{outline:2px solid #3b82f6;outline-offset:2px}"
+    ".tile img{display:block;width:100%;height:auto;object-fit:contain;background:linear-gradient(90deg,#1a1a1a 25%,#2a2a2a 50%,#1a1a1a 75%);background-size:200% 100%;animation:shimmer 1.5s infinite}"
+    "@keyframes shimmer{0%{background-position:-200% 0}100%{background-position:200% 0}}"
+    ".tile img[src]{animation:none;background:#0a0a0a}"
+    ".empty{padding:22px;border:1px dashed var(--border);border-radius:var(--radius);color:var(--muted);text-align:center}"
+    # lightbox
+    ".lb{position:fixed;inset:0;display:none;align-items:center;justify-content:center;background:rgba(0,0,0,.78);z-index:50;height:100dvh}"
+    ".lb.open{display:flex}"
+    ".lb-inner{width:min(92vw,1200px);height:min(88vh,900px);display:flex;flex-direction:column;gap:10px}"
+    ".lb-bar{display:flex;align-items:center;justify-content:space-between;color:#fff;font-size:13px;flex-wrap:wrap;gap:12px}"
+    ".lb-info{display:flex;flex-direction:column;gap:4px}"
+    ".lb-cap{font-weight:600}"
+    ".lb-sub{opacity:.8;font-size:12px}"
+    ".lb-counter{opacity:.8;font-size:12px;margin-top:4px}"
+    ".lb-controls{display:flex;gap:8px;flex-wrap:wrap}"
+    ".lb-btn{appearance:none;border:1px solid rgba(255,255,255,.22);background:rgba(0,0,0,.25);color:#fff;"
+    "padding:8px 10px;border-radius:10px;cursor:pointer;transition:background 0.2s;font-size:13px;font-family:inherit}"
+    ".lb-btn:hover{background:rgba(0,0,0,.4)}"
+    ".lb-btn:focus{outline:2px solid #fff;outline-offset:2px}"
+    ".lb-btn:active{transform:scale(0.95)}"
+    ".lb-img{flex:1;display:flex;align-items:center;justify-content:center;overflow:hidden;border-radius:14px;position:relative}"
+    ".lb-img img{max-width:100%;max-height:100%;border-radius:14px;background:#000}"
+    ".lb-loading{position:absolute;top:50%;left:50%;transform:translate(-50%,-50%);width:40px;height:40px;border:4px solid rgba(255,255,255,.2);border-top-color:#fff;border-radius:50%;animation:spin 1s linear infinite;display:none}"
+    ".lb-loading.active{display:block}"
+    "@keyframes spin{to{transform:translate(-50%,-50%) rotate(360deg)}}"
+    ".lb-img img.error{opacity:.5}"
+    "@media (max-width:600px){"
+    ".top{flex-direction:column;gap:8px}"
+    ".meta{font-size:12px}"
+    ".lb-btn{padding:12px 16px;min-height:44px;font-size:14px}"
+    ".lb-bar{flex-direction:column;align-items:stretch}"
+    ".lb-controls{justify-content:space-between;width:100%}"
+    "}"
+    "@media (prefers-reduced-motion:reduce){"
+    "*{animation-duration:0.01ms!important;animation-iteration-count:1!important;transition-duration:0.01ms!important}"
+    "}"
+    # Improved accessibility
+    "a:focus-visible,button:focus-visible{outline:2px solid #3b82f6;outline-offset:2px}"
+    "a:focus:not(:focus-visible){outline:none}"
+    ".qr-section{padding:18px 0;border-top:1px solid var(--border);margin-top:18px;display:flex;flex-direction:column;align-items:center;gap:12px}"
+    ".qr-title{font-size:13px;color:var(--muted);text-transform:uppercase;letter-spacing:0.5px;font-weight:600}"
+    ".qr-code{width:160px;height:160px;border-radius:var(--radius);border:2px solid var(--border);padding:8px;background:#ffffff;box-shadow:var(--shadow);display:block;transition:transform 0.2s,box-shadow 0.2s}"
+    ".qr-code:hover{transform:translateY(-2px);box-shadow:0 12px 40px rgba(0,0,0,.4)}"
+    ".qr-code img{width:100%;height:100%;object-fit:contain;display:block}"
+    ".qr-hint{font-size:12px;color:var(--muted);text-align:center}"
+    "@media (max-width:600px){"
+    ".qr-code{width:140px;height:140px}"
+    "}"
+    "</style>\n"
+    "</head><body>\n"
+    "<a href=\"#grid\" class=\"skip-link\">Skip to gallery</a>\n"
+    "<div class=\"wrap\">\n"
+    "<div class=\"top\">"
+).encode("utf-8")
+
+# QR share section; only the link target and image src vary.
+_QR_SECTION_OPEN = (
+    '<div class="qr-section">\n'
+    '<div class="qr-title">Scan to Open Gallery</div>\n'
+).encode("utf-8")
+_QR_HINT = (
+    '<div class="qr-hint">Point your phone camera at the code</div>\n'
+    '</div>\n'
+)
+_QR_LINK_CLOSE = ("</a>\n" + _QR_HINT).encode("utf-8")
+_QR_BOX_CLOSE = ("</div>\n" + _QR_HINT).encode("utf-8")
+
+# Lightbox shell + JS, then the document close.
+_GALLERY_TAIL = (
+    "<div class=\"lb\" id=\"lb\" role=\"dialog\" aria-modal=\"true\" aria-label=\"Image viewer\">"
+    "<div class=\"lb-inner\">"
+    "<div class=\"lb-bar\">"
+    "<div class=\"lb-info\">"
+    "<div class=\"lb-cap\" id=\"lbCap\"></div>"
+    "<div class=\"lb-sub\" id=\"lbSub\"></div>"
+    "<div class=\"lb-counter\" id=\"lbCounter\"></div>"
+    "</div>"
+    "<div class=\"lb-controls\">"
+    "<button class=\"lb-btn\" id=\"prevBtn\" type=\"button\" aria-label=\"Previous image\">← Prev</button>"
+    "<button class=\"lb-btn\" id=\"nextBtn\" type=\"button\" aria-label=\"Next image\">Next →</button>"
+    "<a class=\"lb-btn\" id=\"downloadBtn\" href=\"#\" aria-label=\"Download image\" style=\"display:none;text-decoration:none\">↓ Download</a>"
+    "<button class=\"lb-btn\" id=\"closeBtn\" type=\"button\" aria-label=\"Close lightbox\">Esc ✕</button>"
+    "</div></div>"
+    "<div class=\"lb-img\">"
+    "<div class=\"lb-loading\" id=\"lbLoading\"></div>"
+    "<img id=\"lbImg\" alt=\"\">"
+    "</div>"
+    "</div></div>\n"
+    "<script>"
+    "(() => {"
+    "const lb=document.getElementById('lb');"
+    "const img=document.getElementById('lbImg');"
+    "const cap=document.getElementById('lbCap');"
+    "const sub=document.getElementById('lbSub');"
+    "const counter=document.getElementById('lbCounter');"
+    "const loading=document.getElementById('lbLoading');"
+    "const downloadBtn=document.getElementById('downloadBtn');"
+    "const closeBtn=document.getElementById('closeBtn');"
+    "const prevBtn=document.getElementById('prevBtn');"
+    "const nextBtn=document.getElementById('nextBtn');"
+    "const grid=document.getElementById('grid');"
+    "const tiles=grid?grid.children:[];"
+    "let idx=-1;"
+    "let lastFocusedElement=null;"
+    "const enhanceToggle=document.getElementById('enhanceToggle');"
+    "const enhanceToggleText=document.getElementById('enhanceToggleText');"
+    "let useEnhanced=true;"
+    "function updateEnhanceToggle(){"
+    "  if(!enhanceToggleText) return;"
+    "  enhanceToggleText.textContent=useEnhanced?'✨ Enhanced':'📷 Original';"
+    "  if(enhanceToggle) enhanceToggle.setAttribute('aria-pressed',useEnhanced.toString());"
+    "}"
+    "if(enhanceToggle&&enhanceToggleText){"
+    "  const saved=localStorage.getItem('ghostrollUseEnhanced');"
+    "  if(saved!==null)useEnhanced=saved==='true';"
+    "  updateEnhanceToggle();"
+    "  enhanceToggle.addEventListener('click',(e)=>{"
+    "    e.preventDefault();"
+    "    useEnhanced=!useEnhanced;"
+    "    localStorage.setItem('ghostrollUseEnhanced',useEnhanced.toString());"
+    "    updateEnhanceToggle();"
+    "    if(lb&&lb.classList.contains('open')&&idx>=0){openAt(idx);}"
+    "  });"
+    "}"
+    "if(!lb||!img||!cap||!sub||!counter||!loading) return;"
+    "function getImageUrl(tile){"
+    "  if(useEnhanced&&tile.dataset.enhanced){return tile.dataset.enhanced;}"
+    "  return tile.dataset.full;"
+    "}"
+    "function preloadAdjacent(){"
+    "if(idx+1<tiles.length){const nextImg=new Image();nextImg.src=tiles[idx+1].dataset.full;}"
+    "if(idx-1>=0){const prevImg=new Image();prevImg.src=tiles[idx-1].dataset.full;}"
+    "}"
+    "function updateCounter(){"
+    "if(tiles.length>0){counter.textContent=(idx+1)+' / '+tiles.length;}else{counter.textContent='';}"
+    "}"
+    "function showLoading(){if(loading) loading.classList.add('active');}"
+    "function hideLoading(){if(loading) loading.classList.remove('active');}"
+    "function openAt(i){"
+    "if(!tiles.length) return;"
+    "lastFocusedElement=document.activeElement;"
+    "idx=(i+tiles.length)%tiles.length;"
+    "const t=tiles[idx];"
+    "showLoading();"
+    "img.onload=function(){hideLoading();img.classList.remove('error');};"
+    "img.onerror=function(){hideLoading();img.classList.add('error');img.alt='Failed to load image';};"
+    "img.src=getImageUrl(t);"
+    "img.alt=t.dataset.cap||'';"
+    "cap.textContent=t.dataset.cap||'';"
+    "sub.textContent=t.dataset.sub||'';"
+    "updateCounter();"
+    "if(downloadBtn){downloadBtn.style.display='inline-flex';downloadBtn.href=getImageUrl(t);downloadBtn.download='';}"
+    "lb.classList.add('open');"
+    "document.body.style.overflow='hidden';"
+    "preloadAdjacent();"
+    "setTimeout(()=>{if(closeBtn) closeBtn.focus();},100);"
+    "}"
+    "function close(){"
+    "lb.classList.remove('open');"
+    "document.body.style.overflow='';"
+    "idx=-1;"
+    "img.src='';"
+    "hideLoading();"
+    "if(lastFocusedElement){lastFocusedElement.focus();lastFocusedElement=null;}"
+    "}"
+    "function next(){openAt(idx+1)}"
+    "function prev(){openAt(idx-1)}"
+    "let touchStartX=0;"
+    "let touchStartY=0;"
+    "lb.addEventListener('touchstart',(e)=>{"
+    "touchStartX=e.touches[0].clientX;"
+    "touchStartY=e.touches[0].clientY;"
+    "},{passive:true});"
+    "lb.addEventListener('touchend',(e)=>{"
+    "if(!lb.classList.contains('open')) return;"
+    "const touchEndX=e.changedTouches[0].clientX;"
+    "const touchEndY=e.changedTouches[0].clientY;"
+    "const deltaX=touchStartX-touchEndX;"
+    "const deltaY=touchStartY-touchEndY;"
+    "if(Math.abs(deltaX)>Math.abs(deltaY)&&Math.abs(deltaX)>50){"
+    "if(deltaX>0) next();"
+    "else prev();"
+    "}"
+    "},{passive:true});"
+    "function tileIndex(el){"
+    "const t=el instanceof Element?el.closest('#grid .tile'):null;"
+    "return t?parseInt(t.dataset.idx||'0',10):-1;"
+    "}"
+    "if(grid){"
+    "grid.addEventListener('click',(e)=>{const i=tileIndex(e.target);if(i<0) return;e.preventDefault();openAt(i);});"
+    "grid.addEventListener('keydown',(e)=>{if(e.key!=='Enter'&&e.key!==' ') return;const i=tileIndex(e.target);if(i<0) return;e.preventDefault();openAt(i);});"
+    "}"
+    "if(closeBtn) closeBtn.addEventListener('click', close);"
+    "if(nextBtn) nextBtn.addEventListener('click', next);"
+    "if(prevBtn) prevBtn.addEventListener('click', prev);"
+    "if(downloadBtn) downloadBtn.addEventListener('click',(e)=>{e.preventDefault();if(downloadBtn.href&&downloadBtn.href!='#'){window.open(downloadBtn.href,'_blank');}});"
+    "lb.addEventListener('click',(e)=>{if(e.target===lb) close();});"
+    "document.addEventListener('keydown',(e)=>{"
+    "if(!lb.classList.contains('open')){"
+    # Keyboard shortcuts when lightbox is closed: arrow keys to navigate gallery
+    "  if(e.key==='ArrowRight'||e.key==='ArrowLeft'){"
+    "    e.preventDefault();"
+    "    const currentIndex=Math.max(0,tileIndex(document.activeElement));"
+    "    const newIndex=(currentIndex+(e.key==='ArrowRight'?1:-1)+tiles.length)%tiles.length;"
+    "    if(tiles[newIndex]){tiles[newIndex].focus();}"
+    "  }"
+    "  return;"
+    "}"
+    "if(e.key==='Escape'){e.preventDefault();close();}"
+    "else if(e.key==='ArrowRight'||e.key==='ArrowDown'){e.preventDefault();next();}"
+    "else if(e.key==='ArrowLeft'||e.key==='ArrowUp'){e.preventDefault();prev();}"
+    "else if(e.key==='Home'){e.preventDefault();openAt(0);}"
+    "else if(e.key==='End'){e.preventDefault();openAt(tiles.length-1);}"
+    "else if((e.key==='d'||e.key==='D')&&e.target.tagName!=='INPUT'&&e.target.tagName!=='TEXTAREA'){"
+    "  e.preventDefault();"
+    "  if(downloadBtn&&downloadBtn.href&&downloadBtn.href!='#'){window.open(downloadBtn.href,'_blank');}"
+    "}"
+    "});"
+    "})();"
+    "</script>\n"
+    "</div></body></html>\n"
+).encode("utf-8")
 
 def _write_gallery_html(
     *,
     session_id: str,
-    # list of (thumb_src, full_href, title, subtitle, enhanced_href)
+    # iterable of (thumb_src, full_href, title, subtitle, enhanced_href)
     # enhanced_href can be None if not available
-    items: list[tuple[str, str, str, str, str | None]],
+    items: Iterable[tuple[str, str, str, str] | tuple[str, str, str, str, str | None]],
     download_href: str | None = None,
     out_path: Path,
 ) -> None:
+    """
+    Writes the gallery page. An out_path ending in ".gz" gets a gzip-compressed
+    page (for serving with Content-Encoding: gzip).
+    """
     out_path.parent.mkdir(parents=True, exist_ok=True)
+    data = _render_gallery_bytes(
+        session_id=session_id,
+        items=items,
+        download_href=download_href,
+        base_dir=out_path.parent,
+    )
+    if out_path.suffix == ".gz":
+        data = gzip.compress(data, compresslevel=6, mtime=0)
+    _write_atomic(out_path, data)
+
+
+def _render_gallery_bytes(
+    *,
+    session_id: str,
+    items: Iterable[tuple[str, str, str, str] | tuple[str, str, str, str, str | None]],
+    download_href: str | None = None,
+    base_dir: Path,
+) -> bytes:
+    """
+    Renders the gallery page as UTF-8 bytes. base_dir is where the page will live;
+    share-qr.png / share.txt next to it add the QR section.
+    """
+    # The header needs the count before any tile is written, so materialize once.
+    if not isinstance(items, list):
+        items = list(items)
     count = len(items)
-    with out_path.open("w", encoding="utf-8") as f:
-        f.write("<!doctype html>\n")
-        f.write(
-            "<html><head><meta charset=\"utf-8\">"
-            "<meta name=\"viewport\" content=\"width=device-width,initial-scale=1\">"
-            "<link rel=\"icon\" href=\"data:,\">"
-            f"<title>{html.escape(session_id)}</title>\n"
+    esc_session = _esc(session_id)
+    parts: list[str] = []
+    w = parts.append
+    w(f"<h1 class=\"title\">{esc_session}</h1>")
+    w("<div class=\"meta\">")
+    w(f"{count} image{'s' if count != 1 else ''}")
+    if download_href:
+        w(
+            f" · <a class=\"btn\" href=\"{_esc(download_href)}\">Download all</a>"
         )
-        f.write(
-            "<style>"
-            ":root{color-scheme:light dark;"
-            "--bg:#0b0f14;--fg:#e7edf5;--muted:#9aa7b5;--card:#101826;--border:#1a2a3d;"
-            "--shadow:0 10px 30px rgba(0,0,0,.35);--radius:14px}"
-            "@media (prefers-color-scheme:light){"
-            ":root{--bg:#f6f8fb;--fg:#111827;--muted:#5b6472;--card:#ffffff;--border:#e6e9ef;"
-            "--shadow:0 10px 30px rgba(17,24,39,.08)}}"
-            "html,body{height:100%}"
-            "body{margin:0;background:var(--bg);color:var(--fg);font-family:ui-sans-serif,system-ui,-apple-system,Segoe UI,Roboto,Helvetica,Arial}"
-            ".skip-link{position:absolute;top:-40px;left:0;background:var(--card);color:var(--fg);padding:8px 16px;text-decoration:none;z-index:100;border-radius:4px}"
-            ".skip-link:focus{top:0}"
-            ".wrap{max-width:1100px;margin:0 auto;padding:max(18px,env(safe-area-inset-top)) max(18px,env(safe-area-inset-right)) max(18px,env(safe-area-inset-bottom)) max(18px,env(safe-area-inset-left))}"
-            ".top{display:flex;align-items:baseline;gap:12px;justify-content:space-between;margin-bottom:14px}"
-            ".title{font-size:18px;font-weight:700;letter-spacing:.2px;margin:0}"
-            ".meta{color:var(--muted);font-size:13px}"
-            ".btn{display:inline-flex;align-items:center;gap:6px;padding:8px 10px;border-radius:999px;"
-            "border:1px solid var(--border);background:var(--card);text-decoration:none;color:inherit}"
-            ".btn:hover{filter:brightness(1.05)}"
-            ".btn:focus{outline:2px solid #3b82f6;outline-offset:2px}"
-            ".grid{display:flex;flex-direction:column;gap:12px}"
-            ".tile{position:relative;display:block;border-radius:var(--radius);overflow:hidden;background:var(--card);"
-            "border:1px solid var(--border);box-shadow:var(--shadow);transform:translateZ(0);width:100%;"
-            "transition:transform 0.2s,box-shadow 0.2s;cursor:pointer}"
-            ".tile:hover{transform:translateY(-2px);box-shadow:0 12px 40px rgba(0,0,0,.4)}"
-            ".tile:focus{outline:2px solid #3b82f6;outline-offset:2px}"
-            ".tile:focus:not(:focus-visible){outline:none}"
-            ".tile:focus-visible{outline:2px solid #3b82f6;outline-offset:2px}"
-            ".tile img{display:block;width:100%;height:auto;object-fit:contain;background:linear-gradient(90deg,#1a1a1a 25%,#2a2a2a 50%,#1a1a1a 75%);background-size:200% 100%;animation:shimmer 1.5s infinite}"
-            "@keyframes shimmer{0%{background-position:-200% 0}100%{background-position:200% 0}}"
-            ".tile img[src]{animation:none;background:#0a0a0a}"
-            ".empty{padding:22px;border:1px dashed var(--border);border-radius:var(--radius);color:var(--muted);text-align:center}"
-            "/* lightbox */"
-            ".lb{position:fixed;inset:0;display:none;align-items:center;justify-content:center;background:rgba(0,0,0,.78);z-index:50;height:100dvh}"
-            ".lb.open{display:flex}"
-            ".lb-inner{width:min(92vw,1200px);height:min(88vh,900px);display:flex;flex-direction:column;gap:10px}"
-            ".lb-bar{display:flex;align-items:center;justify-content:space-between;color:#fff;font-size:13px;flex-wrap:wrap;gap:12px}"
-            ".lb-info{display:flex;flex-direction:column;gap:4px}"
-            ".lb-cap{font-weight:600}"
-            ".lb-sub{opacity:.8;font-size:12px}"
-            ".lb-counter{opacity:.8;font-size:12px;margin-top:4px}"
-            ".lb-controls{display:flex;gap:8px;flex-wrap:wrap}"
-            ".lb-btn{appearance:none;border:1px solid rgba(255,255,255,.22);background:rgba(0,0,0,.25);color:#fff;"
-            "padding:8px 10px;border-radius:10px;cursor:pointer;transition:background 0.2s;font-size:13px;font-family:inherit}"
-            ".lb-btn:hover{background:rgba(0,0,0,.4)}"
-            ".lb-btn:focus{outline:2px solid #fff;outline-offset:2px}"
-            ".lb-btn:active{transform:scale(0.95)}"
-            ".lb-img{flex:1;display:flex;align-items:center;justify-content:center;overflow:hidden;border-radius:14px;position:relative}"
-            ".lb-img img{max-width:100%;max-height:100%;border-radius:14px;background:#000}"
-            ".lb-loading{position:absolute;top:50%;left:50%;transform:translate(-50%,-50%);width:40px;height:40px;border:4px solid rgba(255,255,255,.2);border-top-color:#fff;border-radius:50%;animation:spin 1s linear infinite;display:none}"
-            ".lb-loading.active{display:block}"
-            "@keyframes spin{to{transform:translate(-50%,-50%) rotate(360deg)}}"
-            ".lb-img img.error{opacity:.5}"
-            "@media (max-width:600px){"
-            ".top{flex-direction:column;gap:8px}"
-            ".meta{font-size:12px}"
-            ".lb-btn{padding:12px 16px;min-height:44px;font-size:14px}"
-            ".lb-bar{flex-direction:column;align-items:stretch}"
-            ".lb-controls{justify-content:space-between;width:100%}"
-            "}"
-            "@media (prefers-reduced-motion:reduce){"
-            "*{animation-duration:0.01ms!important;animation-iteration-count:1!important;transition-duration:0.01ms!important}"
-            "}"
-            "/* Improved accessibility */"
-            "a:focus-visible,button:focus-visible{outline:2px solid #3b82f6;outline-offset:2px}"
-            "a:focus:not(:focus-visible){outline:none}"
-            ".qr-section{padding:18px 0;border-top:1px solid var(--border);margin-top:18px;display:flex;flex-direction:column;align-items:center;gap:12px}"
-            ".qr-title{font-size:13px;color:var(--muted);text-transform:uppercase;letter-spacing:0.5px;font-weight:600}"
-            ".qr-code{width:160px;height:160px;border-radius:var(--radius);border:2px solid var(--border);padding:8px;background:#ffffff;box-shadow:var(--shadow);display:block;transition:transform 0.2s,box-shadow 0.2s}"
-            ".qr-code:hover{transform:translateY(-2px);box-shadow:0 12px 40px rgba(0,0,0,.4)}"
-            ".qr-code img{width:100%;height:100%;object-fit:contain;display:block}"
-            ".qr-hint{font-size:12px;color:var(--muted);text-align:center}"
-            "@media (max-width:600px){"
-            ".qr-code{width:140px;height:140px}"
-            "}"
-            "</style>\n"
+    # Check if any images have enhanced versions
+    has_enhanced = any(item[4] for item in items if len(item) > 4)
+    if has_enhanced:
+        w(
+            ' · <button class="btn" id="enhanceToggle" type="button" aria-label="Toggle enhanced images">'
+            '<span id="enhanceToggleText">✨ Enhanced</span>'
+            '</button>'
         )
-        f.write("</head><body>\n")
-        f.write("<a href=\"#grid\" class=\"skip-link\">Skip to gallery</a>\n")
-        f.write("<div class=\"wrap\">\n")
-        f.write("<div class=\"top\">")
-        f.write(f"<h1 class=\"title\">{html.escape(session_id)}</h1>")
-        f.write("<div class=\"meta\">")
-        f.write(f"{count} image{'s' if count != 1 else ''}")
-        if download_href:
-            f.write(
-                f" · <a class=\"btn\" href=\"{html.escape(download_href)}\">Download all</a>"
-            )
-        # Check if any images have enhanced versions
-        has_enhanced = any(item[4] for item in items if len(item) > 4)
-        if has_enhanced:
-            f.write(
-                ' · <button class="btn" id="enhanceToggle" type="button" aria-label="Toggle enhanced images">'
-                '<span id="enhanceToggleText">✨ Enhanced</span>'
-                '</button>'
-            )
-        f.write("</div>")
-        f.write("</div>\n")
+    w("</div>")
+    w("</div>\n")
         
-        # Check if QR code exists in the same directory as the output file
-        qr_code_path = out_path.parent / "share-qr.png"
-        qr_code_url = None
-        if qr_code_path.exists() and qr_code_path.is_file() and qr_code_path.stat().st_size > 0:
-            qr_code_url = "share-qr.png"
-
-        if not items:
-            f.write("<div class=\"empty\">No shareable images found.</div>\n")
-        else:
-            f.write("<div class=\"grid\" id=\"grid\">\n")
-            for i, item in enumerate(items):
-                # Handle both old format (4 items) and new format (5 items with enhanced)
-                if len(item) >= 5:
-                    thumb_src, full_href, title, subtitle, enhanced_href = item
-                else:
-                    thumb_src, full_href, title, subtitle = item[:4]
-                    enhanced_href = None
-                
-                # Generate better alt text: use subtitle if available, otherwise descriptive text
-                alt_text = subtitle if subtitle else (f"Gallery image {i + 1}" if not title or "/" in title or "\\" in title else title)
-                
-                # Build data attributes - include both normal and enhanced URLs
-                data_attrs = f'data-full="{html.escape(full_href)}"'
-                if enhanced_href:
-                    data_attrs += f' data-enhanced="{html.escape(enhanced_href)}"'
+    # Check if QR code exists in the same directory as the output file
+    qr_code_path = base_dir / "share-qr.png"
+    qr_code_url = None
+    if qr_code_path.exists() and qr_code_path.is_file() and qr_code_path.stat().st_size > 0:
+        qr_code_url = "share-qr.png"
+
+    if not items:
+        w("<div class=\"empty\">No shareable images found.</div>\n")
+    else:
+        w("<div class=\"grid\" id=\"grid\">\n")
+        # Locals for the per-tile loop (saves the global lookups on large galleries)
+        esc = _esc
+        tile_fmt = _TILE_FMT
+        for i, item in enumerate(items):
+            # Handle both old format (4 items) and new format (5 items with enhanced)
+            if len(item) >= 5:
+                thumb_src, full_href, title, subtitle, enhanced_href = item
+            else:
+                thumb_src, full_href, title, subtitle = item[:4]
+                enhanced_href = None
                 
-                f.write(
-                    "<a class=\"tile\" href=\"{full}\" {data_attrs} data-cap=\"{cap}\" data-sub=\"{sub}\" "
-                    "data-idx=\"{idx}\" aria-label=\"Open image {num}\">"
-                    "<img src=\"{thumb}\" loading=\"lazy\" decoding=\"async\" alt=\"{alt}\">"
-                    "</a>\n".format(
-                        full=html.escape(full_href),
-                        data_attrs=data_attrs,
-                        thumb=html.escape(thumb_src),
-                        cap=html.escape(title),
-                        sub=html.escape(subtitle),
-                        alt=html.escape(alt_text),
-                        idx=i,
-                        num=i + 1,
-                    )
+            # Escape each distinct string once; href and data-full share a value.
+            esc_full = esc(full_href)
+            esc_thumb = esc(thumb_src)
+            esc_cap = esc(title)
+            esc_sub = esc(subtitle)
+
+            # Generate better alt text: use subtitle if available, otherwise descriptive text
+            if subtitle:
+                esc_alt = esc_sub
+            elif not title or "/" in title or "\\" in title:
+                esc_alt = f"Gallery image {i + 1}"
+            else:
+                esc_alt = esc_cap
+
+            # Include the enhanced URL as a data attribute only when available
+            enhanced_attr = f' data-enhanced="{esc(enhanced_href)}"' if enhanced_href else ""
+
+            w(
+                tile_fmt
+                % (
+                    esc_full,
+                    esc_full,
+                    enhanced_attr,
+                    esc_cap,
+                    esc_sub,
+                    i,
+                    i + 1,
+                    esc_thumb,
+                    esc_alt,
                 )
-            f.write("</div>\n")
+            )
+        w("</div>\n")
         
-        # Add QR code section if available
-        if qr_code_url:
-            # Try to get the URL from share.txt if available
-            share_txt_path = out_path.parent / "share.txt"
-            qr_link_url = None
-            if share_txt_path.exists():
-                try:
-                    share_url = share_txt_path.read_text(encoding="utf-8").strip()
-                    if share_url:
-                        qr_link_url = share_url
-                except Exception:
-                    pass
-            # Fallback to download_href or just show QR without link
-            if not qr_link_url and download_href:
-                qr_link_url = download_href
+    # Add QR code section if available
+    if qr_code_url:
+        # Try to get the URL from share.txt if available
+        share_txt_path = base_dir / "share.txt"
+        qr_link_url = None
+        if share_txt_path.exists():
+            try:
+                share_url = share_txt_path.read_text(encoding="utf-8").strip()
+                if share_url:
+                    qr_link_url = share_url
+            except Exception:
+                pass
+        # Fallback to download_href or just show QR without link
+        if not qr_link_url and download_href:
+            qr_link_url = download_href
             
-            f.write('<div class="qr-section">\n')
-            f.write('<div class="qr-title">Scan to Open Gallery</div>\n')
-            if qr_link_url:
-                f.write(f'<a href="{html.escape(qr_link_url)}" target="_blank" class="qr-code" aria-label="QR code for gallery link">\n')
-            else:
-                f.write('<div class="qr-code">\n')
-            f.write(f'<img src="{html.escape(qr_code_url)}" alt="QR code" loading="lazy">\n')
-            if qr_link_url:
-                f.write('</a>\n')
-            else:
-                f.write('</div>\n')
-            f.write('<div class="qr-hint">Point your phone camera at the code</div>\n')
-            f.write('</div>\n')
-
-        # Lightbox shell + JS
-        f.write(
-            "<div class=\"lb\" id=\"lb\" role=\"dialog\" aria-modal=\"true\" aria-label=\"Image viewer\">"
-            "<div class=\"lb-inner\">"
-            "<div class=\"lb-bar\">"
-            "<div class=\"lb-info\">"
-            "<div class=\"lb-cap\" id=\"lbCap\"></div>"
-            "<div class=\"lb-sub\" id=\"lbSub\"></div>"
-            "<div class=\"lb-counter\" id=\"lbCounter\"></div>"
-            "</div>"
-            "<div class=\"lb-controls\">"
-            "<button class=\"lb-btn\" id=\"prevBtn\" type=\"button\" aria-label=\"Previous image\">← Prev</button>"
-            "<button class=\"lb-btn\" id=\"nextBtn\" type=\"button\" aria-label=\"Next image\">Next →</button>"
-            "<a class=\"lb-btn\" id=\"downloadBtn\" href=\"#\" aria-label=\"Download image\" style=\"display:none;text-decoration:none\">↓ Download</a>"
-            "<button class=\"lb-btn\" id=\"closeBtn\" type=\"button\" aria-label=\"Close lightbox\">Esc ✕</button>"
-            "</div></div>"
-            "<div class=\"lb-img\">"
-            "<div class=\"lb-loading\" id=\"lbLoading\"></div>"
-            "<img id=\"lbImg\" alt=\"\">"
-            "</div>"
-            "</div></div>\n"
-        )
-        f.write(
-            "<script>"
-            "(() => {"
-            "const lb=document.getElementById('lb');"
-            "const img=document.getElementById('lbImg');"
-            "const cap=document.getElementById('lbCap');"
-            "const sub=document.getElementById('lbSub');"
-            "const counter=document.getElementById('lbCounter');"
-            "const loading=document.getElementById('lbLoading');"
-            "const downloadBtn=document.getElementById('downloadBtn');"
-            "const closeBtn=document.getElementById('closeBtn');"
-            "const prevBtn=document.getElementById('prevBtn');"
-            "const nextBtn=document.getElementById('nextBtn');"
-            "const tiles=[...document.querySelectorAll('#grid .tile')];"
-            "let idx=-1;"
-            "let lastFocusedElement=null;"
-            "const enhanceToggle=document.getElementById('enhanceToggle');"
-            "const enhanceToggleText=document.getElementById('enhanceToggleText');"
-            "let useEnhanced=true;"
-            "function updateEnhanceToggle(){"
-            "  if(!enhanceToggleText) return;"
-            "  enhanceToggleText.textContent=useEnhanced?'✨ Enhanced':'📷 Original';"
-            "  if(enhanceToggle) enhanceToggle.setAttribute('aria-pressed',useEnhanced.toString());"
-            "}"
-            "if(enhanceToggle&&enhanceToggleText){"
-            "  const saved=localStorage.getItem('ghostrollUseEnhanced');"
-            "  if(saved!==null)useEnhanced=saved==='true';"
-            "  updateEnhanceToggle();"
-            "  enhanceToggle.addEventListener('click',(e)=>{"
-            "    e.preventDefault();"
-            "    useEnhanced=!useEnhanced;"
-            "    localStorage.setItem('ghostrollUseEnhanced',useEnhanced.toString());"
-            "    updateEnhanceToggle();"
-            "    if(lb&&lb.classList.contains('open')&&idx>=0){openAt(idx);}"
-            "  });"
-            "}"
-            "if(!lb||!img||!cap||!sub||!counter||!loading) return;"
-            "function getImageUrl(tile){"
-            "  if(useEnhanced&&tile.dataset.enhanced){return tile.dataset.enhanced;}"
-            "  return tile.dataset.full;"
-            "}"
-            "function preloadAdjacent(){"
-            "if(idx+1<tiles.length){const nextImg=new Image();nextImg.src=tiles[idx+1].dataset.full;}"
-            "if(idx-1>=0){const prevImg=new Image();prevImg.src=tiles[idx-1].dataset.full;}"
-            "}"
-            "function updateCounter(){"
-            "if(tiles.length>0){counter.textContent=(idx+1)+' / '+tiles.length;}else{counter.textContent='';}"
-            "}"
-            "function showLoading(){if(loading) loading.classList.add('active');}"
-            "function hideLoading(){if(loading) loading.classList.remove('active');}"
-            "function openAt(i){"
-            "if(!tiles.length) return;"
-            "lastFocusedElement=document.activeElement;"
-            "idx=(i+tiles.length)%tiles.length;"
-            "const t=tiles[idx];"
-            "showLoading();"
-            "img.onload=function(){hideLoading();img.classList.remove('error');}"
-            "img.onerror=function(){hideLoading();img.classList.add('error');img.alt='Failed to load image';}"
-            "img.src=getImageUrl(t);"
-            "img.alt=t.dataset.cap||'';"
-            "cap.textContent=t.dataset.cap||'';"
-            "sub.textContent=t.dataset.sub||'';"
-            "updateCounter();"
-            "if(downloadBtn){downloadBtn.style.display='inline-flex';downloadBtn.href=getImageUrl(t);downloadBtn.download='';}"
-            "lb.classList.add('open');"
-            "document.body.style.overflow='hidden';"
-            "preloadAdjacent();"
-            "setTimeout(()=>{if(closeBtn) closeBtn.focus();},100);"
-            "}"
-            "function close(){"
-            "lb.classList.remove('open');"
-            "document.body.style.overflow='';"
-            "idx=-1;"
-            "img.src='';"
-            "hideLoading();"
-            "if(lastFocusedElement){lastFocusedElement.focus();lastFocusedElement=null;}"
-            "}"
-            "function next(){openAt(idx+1)}"
-            "function prev(){openAt(idx-1)}"
-            "let touchStartX=0;"
-            "let touchStartY=0;"
-            "lb.addEventListener('touchstart',(e)=>{"
-            "touchStartX=e.touches[0].clientX;"
-            "touchStartY=e.touches[0].clientY;"
-            "},{passive:true});"
-            "lb.addEventListener('touchend',(e)=>{"
-            "if(!lb.classList.contains('open')) return;"
-            "const touchEndX=e.changedTouches[0].clientX;"
-            "const touchEndY=e.changedTouches[0].clientY;"
-            "const deltaX=touchStartX-touchEndX;"
-            "const deltaY=touchStartY-touchEndY;"
-            "if(Math.abs(deltaX)>Math.abs(deltaY)&&Math.abs(deltaX)>50){"
-            "if(deltaX>0) next();"
-            "else prev();"
-            "}"
-            "},{passive:true});"
-            "tiles.forEach((t,idx) => {"
-            "t.addEventListener('click',(e)=>{e.preventDefault();openAt(idx);});"
-            "t.setAttribute('tabindex','0');"
-            "t.addEventListener('keydown',(e)=>{if(e.key==='Enter'||e.key===' '){e.preventDefault();openAt(idx);}});"
-            "});"
-            "if(closeBtn) closeBtn.addEventListener('click', close);"
-            "if(nextBtn) nextBtn.addEventListener('click', next);"
-            "if(prevBtn) prevBtn.addEventListener('click', prev);"
-            "if(downloadBtn) downloadBtn.addEventListener('click',(e)=>{e.preventDefault();if(downloadBtn.href&&downloadBtn.href!='#'){window.open(downloadBtn.href,'_blank');}});"
-            "lb.addEventListener('click',(e)=>{if(e.target===lb) close();});"
-            "document.addEventListener('keydown',(e)=>{"
-            "if(!lb.classList.contains('open')){"
-            "  // Keyboard shortcuts when lightbox is closed: arrow keys to navigate gallery"
-            "  if(e.key==='ArrowRight'||e.key==='ArrowLeft'){"
-            "    e.preventDefault();"
-            "    const currentIndex=document.activeElement instanceof Element&&tiles.includes(document.activeElement)?tiles.indexOf(document.activeElement):0;"
-            "    const newIndex=(currentIndex+(e.key==='ArrowRight'?1:-1)+tiles.length)%tiles.length;"
-            "    if(tiles[newIndex]){tiles[newIndex].focus();}"
-            "  }"
-            "  return;"
-            "}"
-            "if(e.key==='Escape'){e.preventDefault();close();}"
-            "else if(e.key==='ArrowRight'||e.key==='ArrowDown'){e.preventDefault();next();}"
-            "else if(e.key==='ArrowLeft'||e.key==='ArrowUp'){e.preventDefault();prev();}"
-            "else if(e.key==='Home'){e.preventDefault();openAt(0);}"
-            "else if(e.key==='End'){e.preventDefault();openAt(tiles.length-1);}"
-            "else if((e.key==='d'||e.key==='D')&&e.target.tagName!=='INPUT'&&e.target.tagName!=='TEXTAREA'){"
-            "  e.preventDefault();"
-            "  if(downloadBtn&&downloadBtn.href&&downloadBtn.href!='#'){window.open(downloadBtn.href,'_blank');}"
-            "}"
-            "});"
-            "})();"
-            "</script>\n"
+        if qr_link_url:
+            qr_open = (
+                f'<a href="{_esc(qr_link_url)}" target="_blank" class="qr-code" '
+                'aria-label="QR code for gallery link">\n'
+            )
+            qr_close = _QR_LINK_CLOSE
+        else:
+            qr_open = '<div class="qr-code">\n'
+            qr_close = _QR_BOX_CLOSE
+        qr_section = b"".join(
+            (
+                _QR_SECTION_OPEN,
+                qr_open.encode("utf-8"),
+                f'<img src="{_esc(qr_code_url)}" alt="QR code" loading="lazy">\n'.encode("utf-8"),
+                qr_close,
+            )
         )
+    else:
+        qr_section = b""
 
-        f.write("</div></body></html>\n")
+    return b"".join(
+        (
+            _GALLERY_HEAD_OPEN,
+            esc_session.encode("utf-8"),
+            _GALLERY_HEAD_CLOSE,
+            "".join(parts).encode("utf-8"),
+            qr_section,
+            _GALLERY_TAIL,
+        )
+    )
 
 
 def build_index_html(*, session_id: str, thumbs_dir: Path, out_path: Path) -> None:
@@ -363,19 +537,15 @@ def build_index_html(*, session_id: str, thumbs_dir: Path, out_path: Path) -> No
       share/<relpath>.jpg
     and emits links with those relative paths.
     """
-    thumbs: list[Path] = []
+    thumbs: list[str] = []
     if thumbs_dir.exists():
-        thumbs = sorted([p for p in thumbs_dir.rglob("*") if p.is_file()])
+        thumbs = list(_iter_thumbs(thumbs_dir))
 
-    items: list[tuple[str, str, str, str]] = []
-    for t in thumbs:
-        rel = t.relative_to(thumbs_dir)
-        thumb_href = _posix(Path("thumbs") / rel)
-        share_href = _posix(Path("share") / rel.with_suffix(".jpg"))
-        title = rel.as_posix()
-        items.append((thumb_href, share_href, title, ""))
+    def _iter_items() -> Iterator[tuple[str, str, str, str]]:
+        for rel_str in thumbs:
+            yield ("thumbs/" + rel_str, "share/" + _with_jpg_suffix(rel_str), rel_str, "")
 
-    _write_gallery_html(session_id=session_id, items=items, out_path=out_path)
+    _write_gallery_html(session_id=session_id, items=_iter_items(), out_path=out_path)
 
 
 def build_index_html_from_items(
@@ -402,6 +572,95 @@ def build_index_html_presigned(
     _write_gallery_html(session_id=session_id, items=items, download_href=download_href, out_path=out_path)
 
 
+# Static scaffolding of the loading page; only the session id and the poll
+# settings vary per call.
+_LOADING_HEAD_OPEN = _GALLERY_HEAD_OPEN
+
+_LOADING_HEAD_CLOSE = (
+    "</title>\n"
+    "<style>"
+    ":root{color-scheme:light dark;"
+    "--bg:#0b0f14;--fg:#e7edf5;--muted:#9aa7b5;--card:#101826;--border:#1a2a3d;"
+    "--shadow:0 10px 30px rgba(0,0,0,.35);--radius:14px}"
+    "@media (prefers-color-scheme:light){"
+    ":root{--bg:#f6f8fb;--fg:#111827;--muted:#5b6472;--card:#ffffff;--border:#e6e9ef;"
+    "--shadow:0 10px 30px rgba(17,24,39,.08)}}"
+    "html,body{height:100%}"
+    "body{margin:0;background:var(--bg);color:var(--fg);font-family:ui-sans-serif,system-ui,-apple-system,Segoe UI,Roboto,Helvetica,Arial}"
+    ".wrap{max-width:900px;margin:0 auto;padding:18px}"
+    ".top{display:flex;align-items:baseline;gap:12px;justify-content:space-between;margin-bottom:14px}"
+    ".title{font-size:18px;font-weight:700;letter-spacing:.2px;margin:0}"
+    ".meta{color:var(--muted);font-size:13px}"
+    ".card{padding:18px;border-radius:var(--radius);border:1px solid var(--border);background:var(--card);box-shadow:var(--shadow)}"
+    ".msg{font-size:15px;font-weight:650;margin:0 0 8px 0}"
+    ".sub{color:var(--muted);font-size:13px;margin:0}"
+    ".dot{display:inline-block;width:8px;height:8px;border-radius:999px;background:#f59e0b;margin-right:8px;vertical-align:baseline;box-shadow:0 0 0 3px rgba(245,158,11,.18)}"
+    "</style>\n"
+    "</head><body>\n"
+    "<div class=\"wrap\">\n"
+    "<div class=\"top\">"
+    "<h1 class=\"title\">"
+).encode("utf-8")
+
+_LOADING_BODY = (
+    "</h1>"
+    "<div class=\"meta\">Gallery</div>"
+    "</div>\n"
+    "<div class=\"card\" id=\"card\">"
+    "<p class=\"msg\" id=\"msg\"><span class=\"dot\"></span>Upload in progress…</p>"
+    "<p class=\"sub\" id=\"sub\">This page will auto-refresh when the gallery is ready.</p>"
+    "</div>\n"
+    "</div>\n"
+    "<script>\n"
+).encode("utf-8")
+
+# Poll status JSON; reload when uploading is complete.
+_LOADING_TAIL = (
+    "const msgEl=document.getElementById('msg');\n"
+    "const subEl=document.getElementById('sub');\n"
+    "let stopped=false;\n"
+    "async function tick(){\n"
+    "  if(stopped) return;\n"
+    "  try{\n"
+    "    const res=await fetch(STATUS_URL,{cache:'no-store'});\n"
+    "    if(!res.ok) throw new Error('status fetch failed: '+res.status);\n"
+    "    const j=await res.json();\n"
+    "    const uploading=(j && typeof j.uploading==='boolean') ? j.uploading : true;\n"
+    "    if(j && j.message && subEl) subEl.textContent=j.message;\n"
+    "    if(!uploading){\n"
+    "      stopped=true;\n"
+    "      if(msgEl) msgEl.textContent='Upload complete. Loading gallery…';\n"
+    "      setTimeout(()=>{ try{ window.location.reload(); }catch(e){} }, 250);\n"
+    "    }\n"
+    "  }catch(e){\n"
+    "    // Keep the optimistic default; transient errors shouldn't blank the UI.\n"
+    "  }\n"
+    "}\n"
+    "tick();\n"
+    "setInterval(tick, POLL_MS);\n"
+    "</script>\n"
+    "</body></html>\n"
+).encode("utf-8")
+
+
+@lru_cache(maxsize=32)
+def _render_loading_bytes(session_id: str, status_json_url: str, poll_ms: int) -> bytes:
+    # The page is fully determined by these three values; rewrites reuse the bytes.
+    esc_session = _esc(session_id).encode("utf-8")
+    return b"".join(
+        (
+            _LOADING_HEAD_OPEN,
+            esc_session,
+            _LOADING_HEAD_CLOSE,
+            esc_session,
+            _LOADING_BODY,
+            f"const STATUS_URL = {json.dumps(status_json_url)};\n"
+            f"const POLL_MS = {poll_ms};\n".encode("utf-8"),
+            _LOADING_TAIL,
+        )
+    )
+
+
 def build_index_html_loading(
     *,
     session_id: str,
@@ -419,75 +678,4 @@ def build_index_html_loading(
     """
     out_path.parent.mkdir(parents=True, exist_ok=True)
     poll_ms = max(500, int(poll_seconds * 1000))
-    with out_path.open("w", encoding="utf-8") as f:
-        f.write("<!doctype html>\n")
-        f.write(
-            "<html><head><meta charset=\"utf-8\">"
-            "<meta name=\"viewport\" content=\"width=device-width,initial-scale=1\">"
-            "<link rel=\"icon\" href=\"data:,\">"
-            f"<title>{html.escape(session_id)}</title>\n"
-        )
-        f.write(
-            "<style>"
-            ":root{color-scheme:light dark;"
-            "--bg:#0b0f14;--fg:#e7edf5;--muted:#9aa7b5;--card:#101826;--border:#1a2a3d;"
-            "--shadow:0 10px 30px rgba(0,0,0,.35);--radius:14px}"
-            "@media (prefers-color-scheme:light){"
-            ":root{--bg:#f6f8fb;--fg:#111827;--muted:#5b6472;--card:#ffffff;--border:#e6e9ef;"
-            "--shadow:0 10px 30px rgba(17,24,39,.08)}}"
-            "html,body{height:100%}"
-            "body{margin:0;background:var(--bg);color:var(--fg);font-family:ui-sans-serif,system-ui,-apple-system,Segoe UI,Roboto,Helvetica,Arial}"
-            ".wrap{max-width:900px;margin:0 auto;padding:18px}"
-            ".top{display:flex;align-items:baseline;gap:12px;justify-content:space-between;margin-bottom:14px}"
-            ".title{font-size:18px;font-weight:700;letter-spacing:.2px;margin:0}"
-            ".meta{color:var(--muted);font-size:13px}"
-            ".card{padding:18px;border-radius:var(--radius);border:1px solid var(--border);background:var(--card);box-shadow:var(--shadow)}"
-            ".msg{font-size:15px;font-weight:650;margin:0 0 8px 0}"
-            ".sub{color:var(--muted);font-size:13px;margin:0}"
-            ".dot{display:inline-block;width:8px;height:8px;border-radius:999px;background:#f59e0b;margin-right:8px;vertical-align:baseline;box-shadow:0 0 0 3px rgba(245,158,11,.18)}"
-            "</style>\n"
-        )
-        f.write("</head><body>\n")
-        f.write("<div class=\"wrap\">\n")
-        f.write("<div class=\"top\">")
-        f.write(f"<h1 class=\"title\">{html.escape(session_id)}</h1>")
-        f.write("<div class=\"meta\">Gallery</div>")
-        f.write("</div>\n")
-        f.write("<div class=\"card\" id=\"card\">")
-        f.write("<p class=\"msg\" id=\"msg\"><span class=\"dot\"></span>Upload in progress…</p>")
-        f.write("<p class=\"sub\" id=\"sub\">This page will auto-refresh when the gallery is ready.</p>")
-        f.write("</div>\n")
-        f.write("</div>\n")
-
-        # Poll status JSON; reload when uploading is complete.
-        f.write("<script>\n")
-        f.write(f"const STATUS_URL = {json.dumps(status_json_url)};\n")
-        f.write(f"const POLL_MS = {poll_ms};\n")
-        f.write(
-            "const msgEl=document.getElementById('msg');\n"
-            "const subEl=document.getElementById('sub');\n"
-            "let stopped=false;\n"
-            "async function tick(){\n"
-            "  if(stopped) return;\n"
-            "  try{\n"
-            "    const res=await fetch(STATUS_URL,{cache:'no-store'});\n"
-            "    if(!res.ok) throw new Error('status fetch failed: '+res.status);\n"
-            "    const j=await res.json();\n"
-            "    const uploading=(j && typeof j.uploading==='boolean') ? j.uploading : true;\n"
-            "    if(j && j.message && subEl) subEl.textContent=j.message;\n"
-            "    if(!uploading){\n"
-            "      stopped=true;\n"
-            "      if(msgEl) msgEl.textContent='Upload complete. Loading gallery…';\n"
-            "      setTimeout(()=>{ try{ window.location.reload(); }catch(e){} }, 250);\n"
-            "    }\n"
-            "  }catch(e){\n"
-            "    // Keep the optimistic default; transient errors shouldn't blank the UI.\n"
-            "  }\n"
-            "}\n"
-            "tick();\n"
-            "setInterval(tick, POLL_MS);\n"
-        )
-        f.write("</script>\n")
-        f.write("</body></html>\n")
-
-
+    _write_atomic(out_path, _render_loading_bytes(session_id, status_json_url, poll_ms))
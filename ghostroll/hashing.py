@@ -1,10 +1,45 @@
 from __future__ import annotations
 
 import hashlib
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from types import ModuleType
 
 
-def sha256_file(path: Path, *, chunk_size: int | None = None) -> tuple[str, int]:
+# Files at least this large are hashed through mmap when the caller allows it.
+_MMAP_MIN_BYTES = 32 * 1024 * 1024
+
+# BLAKE3 digests are stored with this prefix so they can't collide with SHA-256 hex
+BLAKE3_PREFIX = "b3:"
+
+# blake3 module once imported, False if unavailable (optional dependency).
+_BLAKE3: ModuleType | bool | None = None
+
+
+def _get_blake3() -> ModuleType | None:
+    global _BLAKE3
+    if _BLAKE3 is None:
+        try:
+            import blake3
+        except Exception:
+            _BLAKE3 = False
+        else:
+            _BLAKE3 = blake3
+    return _BLAKE3 or None
+
+
+def blake3_available() -> bool:
+    return _get_blake3() is not None
+
+
+def hash_algo_of(digest: str) -> str:
+    """Which algorithm produced digest (as returned by content_hash_file)."""
+    return "blake3" if digest.startswith(BLAKE3_PREFIX) else "sha256"
+
+
+def sha256_file(path: Path, *, chunk_size: int | None = None, use_mmap: bool = False) -> tuple[str, int]:
     """Compute SHA-256 hash of a file.
     
     Args:
@@ -13,34 +48,170 @@ def sha256_file(path: Path, *, chunk_size: int | None = None) -> tuple[str, int]
             - >50MB: 8MB chunks (better for fast storage)
             - >10MB: 4MB chunks
             - Otherwise: 1MB chunks (default)
-    
+            Explicit sizes are rounded up to a multiple of the 64-byte SHA-256 block.
+        use_mmap: Hash files >= 32MB straight out of the page cache via mmap (one
+            update call, no copy into a user buffer). Only for local disks: if the
+            backing device disappears (SD card pulled) the process gets SIGBUS
+            instead of an OSError.
+
+    hashlib.sha256 is OpenSSL's EVP implementation on standard CPython builds, so
+    SHA-NI / ARMv8 crypto extensions are used when the CPU and OpenSSL support them.
+
     Returns:
         Tuple of (hex digest, file size in bytes)
     """
-    # Adaptive chunk size based on file size for better performance
-    if chunk_size is None:
+    h = hashlib.sha256()
+    size = _hash_into(h, path, chunk_size=chunk_size, use_mmap=use_mmap)
+    return h.hexdigest(), size
+
+
+def blake3_file(path: Path, *, chunk_size: int | None = None, use_mmap: bool = False) -> tuple[str, int]:
+    """
+    BLAKE3 of a file, as (BLAKE3_PREFIX + hex digest, size); same reading strategy
+    and arguments as sha256_file. Needs the optional blake3 package.
+    """
+    h = _new_hasher("blake3")
+    size = _hash_into(h, path, chunk_size=chunk_size, use_mmap=use_mmap)
+    return BLAKE3_PREFIX + h.hexdigest(), size
+
+
+def content_hash_file(path: Path, *, algo: str = "sha256", use_mmap: bool = False) -> tuple[str, int]:
+    """sha256_file or blake3_file, by algo ("sha256" or "blake3")."""
+    if algo == "blake3":
+        return blake3_file(path, use_mmap=use_mmap)
+    return sha256_file(path, use_mmap=use_mmap)
+
+
+def _new_hasher(algo: str):
+    if algo == "blake3":
+        b3 = _get_blake3()
+        if b3 is None:
+            raise RuntimeError("BLAKE3 hashing needs the blake3 package (pip install 'ghostroll[blake3]')")
+        return b3.blake3()
+    return hashlib.sha256()
+
+
+def hash_and_copy_file(src: Path, dst: Path, *, algo: str = "sha256") -> tuple[str, int]:
+    """
+    content_hash_file(src) while writing the same bytes to dst, so a file that is
+    both hashed and copied is read once. dst is created or truncated; on error it
+    may be left partial and the caller should remove it. Metadata is not copied.
+    """
+    h = _new_hasher(algo)
+    size = 0
+    with src.open("rb", buffering=0) as fsrc, dst.open("wb", buffering=0) as fdst:
         try:
-            file_size = path.stat().st_size
+            expected = os.fstat(fsrc.fileno()).st_size
+        except OSError:
+            expected = 0
+        if hasattr(os, "posix_fadvise"):
+            try:
+                os.posix_fadvise(fsrc.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            except OSError:
+                pass
+        if expected and hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(fdst.fileno(), 0, expected)
+            except OSError:
+                pass
+        buf = bytearray(4 * 1024 * 1024 if expected > 10 * 1024 * 1024 else 1024 * 1024)
+        view = memoryview(buf)
+        while True:
+            n = fsrc.readinto(buf)
+            if not n:
+                break
+            size += n
+            h.update(view[:n])
+            written = 0
+            while written < n:
+                written += fdst.write(view[written:n])
+        if size != expected:
+            # Source shrank while reading: drop the preallocated tail
+            fdst.truncate(size)
+    digest = h.hexdigest()
+    return (BLAKE3_PREFIX + digest if algo == "blake3" else digest), size
+
+
+def _hash_into(h, path: Path, *, chunk_size: int | None, use_mmap: bool) -> int:
+    """Feed the file at path into hash object h; returns the number of bytes hashed."""
+    with path.open("rb", buffering=0) as f:
+        try:
+            file_size = os.fstat(f.fileno()).st_size
+        except OSError:
+            file_size = 0
+
+        if use_mmap and file_size >= _MMAP_MIN_BYTES:
+            with mmap.mmap(f.fileno(), file_size, access=mmap.ACCESS_READ) as mm:
+                if hasattr(mm, "madvise"):
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                h.update(mm)
+            return file_size
+
+        # Adaptive chunk size based on file size for better performance
+        if chunk_size is None:
             if file_size > 50 * 1024 * 1024:  # > 50MB
                 chunk_size = 8 * 1024 * 1024  # 8MB chunks
             elif file_size > 10 * 1024 * 1024:  # > 10MB
                 chunk_size = 4 * 1024 * 1024  # 4MB chunks
             else:
                 chunk_size = 1024 * 1024  # 1MB chunks (default)
-        except OSError:
-            # If we can't stat, use default
-            chunk_size = 1024 * 1024
-    
-    h = hashlib.sha256()
-    size = 0
-    with path.open("rb") as f:
+        else:
+            # Whole blocks per update, so the hash never buffers a partial block mid-file.
+            chunk_size = max(64, (chunk_size + 63) & ~63)
+
+        # Ask for aggressive readahead so the next chunk is in flight while this one
+        # is hashed. No DONTNEED afterwards: the pipeline copies DCIM files right
+        # after hashing them, and that copy should come from the page cache.
+        if hasattr(os, "posix_fadvise"):
+            try:
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+            except OSError:
+                pass
+
+        # Read into one preallocated buffer (like hashlib.file_digest, which needs 3.11
+        # and ignores chunk_size) so no bytes object is allocated per chunk. The file
+        # is opened unbuffered: readinto goes straight from the kernel into buf.
+        size = 0
+        buf = bytearray(chunk_size)
+        view = memoryview(buf)
         while True:
-            chunk = f.read(chunk_size)
-            if not chunk:
+            n = f.readinto(buf)
+            if not n:
                 break
-            size += len(chunk)
-            h.update(chunk)
-    return h.hexdigest(), size
+            size += n
+            h.update(view[:n])
+    return size
 
 
+def _hash_or_none(path: Path, use_mmap: bool, algo: str) -> tuple[str, int] | None:
+    try:
+        return content_hash_file(path, algo=algo, use_mmap=use_mmap)
+    except OSError:
+        return None
+
+
+def sha256_many(
+    paths: list[Path], *, workers: int = 8, use_mmap: bool = False
+) -> list[tuple[str, int] | None]:
+    """
+    sha256_file over many files, results in input order (None for unreadable files).
+
+    hashlib releases the GIL while hashing each (>= 1MB) chunk, so a thread pool
+    overlaps one file's reads with another's hashing. Use workers=1 for a single
+    spinning disk. use_mmap is passed through to sha256_file.
+    """
+    return content_hash_many(paths, algo="sha256", workers=workers, use_mmap=use_mmap)
+
 
+def content_hash_many(
+    paths: list[Path], *, algo: str = "sha256", workers: int = 8, use_mmap: bool = False
+) -> list[tuple[str, int] | None]:
+    """sha256_many for either algorithm (see content_hash_file)."""
+    if not paths:
+        return []
+    workers = max(1, min(workers, len(paths)))
+    if workers == 1:
+        return [_hash_or_none(p, use_mmap, algo) for p in paths]
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        return list(ex.map(_hash_or_none, paths, [use_mmap] * len(paths), [algo] * len(paths)))
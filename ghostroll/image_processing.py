@@ -1,6 +1,10 @@
 from __future__ import annotations
 
+import shutil
+import subprocess
+from collections.abc import Sequence
 from pathlib import Path
+from types import ModuleType
 
 from PIL import Image, ImageOps
 
@@ -9,6 +13,243 @@ class ProcessingError(RuntimeError):
     pass
 
 
+def _default_resampling(max_long_edge: int) -> Image.Resampling:
+    # Faster BILINEAR for small outputs, high-quality LANCZOS for larger
+    if max_long_edge <= 512:
+        return Image.Resampling.BILINEAR  # Faster for thumbnails, minimal quality loss
+    return Image.Resampling.LANCZOS  # High quality for share images
+
+
+def _default_progressive(max_long_edge: int) -> bool:
+    # Progressive scans (which force libjpeg's extra Huffman-optimization pass) cost
+    # ~5x the encode time of a baseline JPEG; for <=512px thumbnails that buys ~4%
+    # in size, so thumbnails get a single-pass baseline encode.
+    return max_long_edge > 512
+
+
+def _default_subsampling(max_long_edge: int) -> int:
+    # Thumbnails are always encoded 4:2:0 (Pillow's subsampling=2): at <=512px the
+    # halved chroma isn't visible and there are half as many blocks to code. -1
+    # leaves larger outputs to the encoder's default for the quality.
+    return 2 if max_long_edge <= 512 else -1
+
+
+def _target_size(size: tuple[int, int], max_long_edge: int) -> tuple[int, int]:
+    w, h = size
+    long_edge = max(w, h)
+    if long_edge <= max_long_edge:
+        return size
+    scale = max_long_edge / float(long_edge)
+    return (max(1, int(w * scale)), max(1, int(h * scale)))
+
+
+# EXIF orientations that swap width and height (transpose/rotate 90/transverse/rotate 270).
+_TRANSPOSED_ORIENTATIONS = frozenset((5, 6, 7, 8))
+
+
+def _decode_oriented(im: Image.Image, max_long_edge: int) -> tuple[Image.Image, tuple[int, int]]:
+    """
+    Auto-orients im (skipped when upright). For JPEGs larger than needed, libjpeg is first asked for a
+    DCT-scaled decode (1/2, 1/4 or 1/8, never smaller than the output), which skips
+    most of the IDCT work. Returns the image and its full-resolution oriented size,
+    which output sizes are computed from so they don't depend on the draft scale.
+    """
+    w, h = im.size
+    if im.format == "JPEG":
+        target = _target_size((w, h), max_long_edge)
+        if target != (w, h):
+            im.draft(None, target)
+    orientation = im.getexif().get(0x0112, 1)
+    if orientation == 1:
+        # exif_transpose would still return a full copy of the pixels
+        return im, (w, h)
+    if orientation in _TRANSPOSED_ORIENTATIONS:
+        w, h = h, w
+    return ImageOps.exif_transpose(im), (w, h)
+
+
+# Resolved jpegtran path: None = not looked up yet, "" = not installed.
+_JPEGTRAN: str | None = None
+
+
+def _get_jpegtran() -> str:
+    global _JPEGTRAN
+    if _JPEGTRAN is None:
+        _JPEGTRAN = shutil.which("jpegtran") or ""
+    return _JPEGTRAN
+
+
+def _can_copy_losslessly(im: Image.Image, max_long_edge: int) -> bool:
+    """
+    True when im (opened, not yet decoded) needs no pixel changes: an upright RGB
+    JPEG already within max_long_edge, where only the metadata has to go. Only for
+    share-sized targets: jpegtran keeps the source's quality and chroma and always
+    writes an optimized progressive file, while thumbnails get their own quality,
+    4:2:0 and a baseline encode.
+    """
+    return (
+        _default_progressive(max_long_edge)
+        and im.format == "JPEG"
+        and im.mode == "RGB"
+        and max(im.size) <= max_long_edge
+        and im.getexif().get(0x0112, 1) == 1
+    )
+
+
+def _lossless_strip(src_path: Path, dst_path: Path) -> bool:
+    """
+    Rewrites src as a metadata-free progressive JPEG by copying the DCT coefficients
+    with jpegtran, skipping the decode/re-encode. Returns False if jpegtran is not
+    installed or fails, so callers fall back to Pillow.
+    """
+    exe = _get_jpegtran()
+    if not exe:
+        return False
+    try:
+        p = subprocess.run(
+            [exe, "-copy", "none", "-optimize", "-progressive", "-outfile", str(dst_path), str(src_path)],
+            capture_output=True,
+            timeout=30,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return p.returncode == 0
+
+
+# pyvips module once imported, False if unavailable (not installed, or libvips missing).
+_PYVIPS: ModuleType | bool | None = None
+
+
+def _get_pyvips() -> ModuleType | None:
+    global _PYVIPS
+    if _PYVIPS is None:
+        try:
+            import pyvips
+        except Exception:
+            _PYVIPS = False
+        else:
+            _PYVIPS = pyvips
+    return _PYVIPS or None
+
+
+def _render_with_vips(vips: ModuleType, src_path: Path, targets: Sequence[tuple[Path, int, int]]) -> None:
+    """
+    libvips version of the Pillow path. thumbnail() does shrink-on-load, auto-rotation
+    and the resize in one streaming pipeline, so the full-size frame is never held in
+    memory. Each target reopens the source: its pipeline is sequential, and the
+    shrink-on-load makes small targets cheap to decode.
+    """
+    for dst_path, max_long_edge, quality in targets:
+        img = vips.Image.thumbnail(str(src_path), max_long_edge, height=max_long_edge, size="down")
+        # Consistent 3-band sRGB output, like the RGB conversion on the Pillow path
+        if img.interpretation != "srgb":
+            img = img.colourspace("srgb")
+        if img.bands > 3:
+            img = img.extract_band(0, n=3)
+        progressive = _default_progressive(max_long_edge)
+        # libvips turns chroma subsampling off from Q=90 up unless told otherwise
+        subsample = {"subsample_mode": "on"} if _default_subsampling(max_long_edge) == 2 else {}
+        img.jpegsave(
+            str(dst_path),
+            Q=int(quality),
+            interlace=progressive,
+            strip=True,
+            optimize_coding=progressive,
+            **subsample,
+        )
+
+
+def _processing_error(src_path: Path, dst_path: Path, e: Exception) -> ProcessingError:
+    error_type = type(e).__name__
+    error_msg = str(e)
+
+    # Provide more specific guidance for common errors
+    if "cannot identify image file" in error_msg.lower() or "cannot open" in error_msg.lower():
+        guidance = (
+            f"  This file may not be a valid image, or the file is corrupted.\n"
+            f"  Try: Verify the source file is a valid image format (JPEG, PNG, etc.)"
+        )
+    elif "permission denied" in error_msg.lower() or "access denied" in error_msg.lower():
+        guidance = (
+            f"  Cannot write to destination directory.\n"
+            f"  Try: Check write permissions for {dst_path.parent}"
+        )
+    elif "no space left" in error_msg.lower() or "disk full" in error_msg.lower():
+        guidance = (
+            f"  Out of disk space.\n"
+            f"  Try: Free up space or change the output directory"
+        )
+    else:
+        guidance = f"  Error type: {error_type}"
+
+    return ProcessingError(
+        f"Failed to process image: {src_path.name}\n"
+        f"  Source: {src_path}\n"
+        f"  Destination: {dst_path}\n"
+        f"{guidance}\n"
+        f"  Original error: {error_msg}"
+    )
+
+
+def render_jpeg_derivatives(
+    src_path: Path,
+    targets: Sequence[tuple[Path, int, int]],
+) -> None:
+    """
+    Renders several JPEG derivatives of src_path from a single decode.
+
+    targets are (dst_path, max_long_edge, quality). The source is decoded and
+    auto-oriented once; derivatives are produced largest first, each resized from
+    the previous one, so a share image + thumbnail costs one full-size decode
+    instead of two. Output sizes are computed from the original dimensions, so
+    they match what render_jpeg_derivative would produce for each target.
+    Targets that need no resize take the same jpegtran fast path, and pyvips is
+    used instead of Pillow when installed.
+    """
+    if not targets:
+        return
+    ordered = sorted(targets, key=lambda t: t[1], reverse=True)
+    for dst_path, _edge, _quality in ordered:
+        dst_path.parent.mkdir(parents=True, exist_ok=True)
+
+    dst_path = ordered[0][0]
+    try:
+        with Image.open(src_path) as im:
+            ordered = [
+                t
+                for t in ordered
+                if not (_can_copy_losslessly(im, t[1]) and _lossless_strip(src_path, t[0]))
+            ]
+            if not ordered:
+                return
+            dst_path = ordered[0][0]
+            vips = _get_pyvips()
+            if vips is not None:
+                _render_with_vips(vips, src_path, ordered)
+                return
+            im, orig_size = _decode_oriented(im, ordered[0][1])
+
+            # Convert to RGB for consistent JPEG output
+            if im.mode != "RGB":
+                im = im.convert("RGB")
+
+            for dst_path, max_long_edge, quality in ordered:
+                new_size = _target_size(orig_size, max_long_edge)
+                if new_size != im.size:
+                    im = im.resize(new_size, _default_resampling(max_long_edge))
+                progressive = _default_progressive(max_long_edge)
+                im.save(
+                    dst_path,
+                    format="JPEG",
+                    quality=int(quality),
+                    optimize=progressive,
+                    progressive=progressive,
+                    subsampling=_default_subsampling(max_long_edge),
+                )
+    except Exception as e:  # noqa: BLE001 - we want a clean error surface
+        raise _processing_error(src_path, dst_path, e) from e
+
+
 def render_jpeg_derivative(
     src_path: Path,
     *,
@@ -16,11 +257,17 @@ def render_jpeg_derivative(
     max_long_edge: int,
     quality: int,
     resampling: Image.Resampling | None = None,
+    progressive: bool | None = None,
 ) -> None:
     """
     - Auto-orient using EXIF orientation
-    - Resize to max long edge (only shrink)
+    - Resize to max long edge (only shrink); JPEG sources use a DCT-scaled decode
+      when the output is at most half the source size
     - Strip metadata (save without EXIF)
+    - Upright RGB JPEGs already within a share-sized (>512px, progressive)
+      max_long_edge are stripped losslessly with jpegtran when it is installed
+      (source quality is kept, quality is ignored)
+    - Uses pyvips when installed (pip install ghostroll[vips]), otherwise Pillow
     
     Args:
         src_path: Source image path
@@ -28,69 +275,43 @@ def render_jpeg_derivative(
         max_long_edge: Maximum long edge in pixels (only shrink, never enlarge)
         quality: JPEG quality (1-100)
         resampling: Resampling algorithm (default: BILINEAR for thumbnails <=512px, LANCZOS for larger)
+        progressive: Progressive JPEG with optimized Huffman tables (default: only for outputs
+            >512px; thumbnails use a single-pass baseline encode, ~5x faster for ~4% more bytes)
     """
     dst_path.parent.mkdir(parents=True, exist_ok=True)
     
-    # Choose resampling algorithm: faster BILINEAR for small outputs, high-quality LANCZOS for larger
+    # The libvips path applies its own defaults, so explicit encode choices keep Pillow
+    vips = _get_pyvips() if resampling is None and progressive is None else None
     if resampling is None:
-        if max_long_edge <= 512:
-            resampling = Image.Resampling.BILINEAR  # Faster for thumbnails, minimal quality loss
-        else:
-            resampling = Image.Resampling.LANCZOS  # High quality for share images
+        resampling = _default_resampling(max_long_edge)
+    if progressive is None:
+        progressive = _default_progressive(max_long_edge)
     
     try:
         with Image.open(src_path) as im:
-            im = ImageOps.exif_transpose(im)
+            if progressive and _can_copy_losslessly(im, max_long_edge) and _lossless_strip(src_path, dst_path):
+                return
+            if vips is not None:
+                _render_with_vips(vips, src_path, [(dst_path, max_long_edge, quality)])
+                return
+
+            im, orig_size = _decode_oriented(im, max_long_edge)
 
             # Convert to RGB for consistent JPEG output
-            if im.mode not in ("RGB", "L"):
-                im = im.convert("RGB")
-            elif im.mode == "L":
+            if im.mode != "RGB":
                 im = im.convert("RGB")
 
-            w, h = im.size
-            long_edge = max(w, h)
-            if long_edge > max_long_edge:
-                scale = max_long_edge / float(long_edge)
-                new_size = (max(1, int(w * scale)), max(1, int(h * scale)))
+            new_size = _target_size(orig_size, max_long_edge)
+            if new_size != im.size:
                 im = im.resize(new_size, resampling)
 
             im.save(
                 dst_path,
                 format="JPEG",
                 quality=int(quality),
-                optimize=True,
-                progressive=True,
+                optimize=progressive,
+                progressive=progressive,
+                subsampling=_default_subsampling(max_long_edge),
             )
     except Exception as e:  # noqa: BLE001 - we want a clean error surface
-        error_type = type(e).__name__
-        error_msg = str(e)
-        
-        # Provide more specific guidance for common errors
-        if "cannot identify image file" in error_msg.lower() or "cannot open" in error_msg.lower():
-            guidance = (
-                f"  This file may not be a valid image, or the file is corrupted.\n"
-                f"  Try: Verify the source file is a valid image format (JPEG, PNG, etc.)"
-            )
-        elif "permission denied" in error_msg.lower() or "access denied" in error_msg.lower():
-            guidance = (
-                f"  Cannot write to destination directory.\n"
-                f"  Try: Check write permissions for {dst_path.parent}"
-            )
-        elif "no space left" in error_msg.lower() or "disk full" in error_msg.lower():
-            guidance = (
-                f"  Out of disk space.\n"
-                f"  Try: Free up space or change the output directory"
-            )
-        else:
-            guidance = f"  Error type: {error_type}"
-        
-        raise ProcessingError(
-            f"Failed to process image: {src_path.name}\n"
-            f"  Source: {src_path}\n"
-            f"  Destination: {dst_path}\n"
-            f"{guidance}\n"
-            f"  Original error: {error_msg}"
-        ) from e
-
-
+        raise _processing_error(src_path, dst_path, e) from e
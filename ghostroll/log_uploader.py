@@ -3,17 +3,36 @@
 from __future__ import annotations
 
 import atexit
+import gzip
 import logging
+import os
 import signal
 import threading
 import time
 from pathlib import Path
 
-from .aws_boto3 import s3_upload_file, AwsBoto3Error
+from .aws_boto3 import S3_MIN_PART_BYTES, s3_append_bytes, s3_put_bytes, s3_upload_file, AwsBoto3Error
 
 
 logger = logging.getLogger("ghostroll")
 
+# Once the remote copy is this large, periodic uploads send only the new tail
+# (the remote prefix is copied server-side) instead of re-sending the whole log.
+# S3 will not accept a smaller non-final part, so this is the earliest point
+# at which appending is possible.
+APPEND_THRESHOLD_BYTES = S3_MIN_PART_BYTES
+
+# While the log isn't growing, the periodic upload interval doubles up to this
+# (seconds); any new output resets it.
+MAX_IDLE_UPLOAD_INTERVAL = 300.0
+
+# Logs are highly repetitive; level 1 already shrinks them several-fold and
+# costs next to nothing per tick.
+_GZIP_LEVEL = 1
+
+# Signals that trigger a final log upload before the process exits
+_HANDLED_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
 
 class LogUploader:
     """Manages automatic and bulletproof log uploads to S3."""
@@ -32,7 +51,8 @@ class LogUploader:
         Args:
             log_file: Path to the local log file
             s3_bucket: S3 bucket name
-            s3_key: S3 key (full path) for the log file
+            s3_key: S3 key (full path) for the log file. A key ending in ".gz" is
+                    stored gzip-compressed, one gzip member per upload
             upload_interval: How often to upload logs during processing (seconds)
         """
         self.log_file = log_file
@@ -40,83 +60,253 @@ class LogUploader:
         self.s3_key = s3_key
         self.upload_interval = upload_interval
         self._upload_lock = threading.Lock()
+        # Thread currently holding _upload_lock, so a signal handler running on
+        # that same thread knows not to wait for it
+        self._upload_owner: int | None = None
         self._upload_thread: threading.Thread | None = None
-        self._stop_event = threading.Event()
+        # Worker wakes on stop, on request_upload(), or when the interval elapses
+        self._cv = threading.Condition()
+        self._stop = False
+        self._wake = False
         self._registered_handlers = False
+        # FileHandlers writing to log_file, found on first flush
+        self._file_handlers: list[logging.FileHandler] = []
         self._last_upload_time = 0.0
         self._upload_count = 0
-    
-    def _upload_log(self, *, force_flush: bool = False) -> bool:
+        # Size of the log as of the last successful upload (0 = nothing uploaded)
+        self._uploaded_size = 0
+        self._compress = s3_key.endswith(".gz")
+        self._content_type = "application/gzip" if self._compress else "text/plain; charset=utf-8"
+        # Size of the remote object, and (compressed, still below the append
+        # threshold) its full contents for the next whole-object PUT
+        self._remote_size = 0
+        self._gz_prefix = b""
+
+    def _upload_log(self, *, force_flush: bool = False, block: bool = True) -> bool:
         """
         Upload log file to S3.
         
         Args:
             force_flush: If True, flush all log handlers before upload
+            block: If False, skip (returning False) when another upload is
+                   already in progress instead of waiting to repeat it
         
         Returns:
-            True if upload succeeded, False otherwise
+            True if upload succeeded or the remote copy is already current,
+            False otherwise (including a missing or empty log file)
         """
-        if not self.log_file.exists():
+        # Flush all log handlers to ensure log file is complete
+        if force_flush:
+            try:
+                self._flush_handlers()
+            except Exception as e:
+                logger.debug(f"Log flush before upload failed: {e}")
+        try:
+            size = os.stat(self.log_file).st_size
+        except OSError:
             return False
+        # Settle the no-op cases without queuing behind an in-flight upload
+        if size == 0:
+            return False
+        if size == self._uploaded_size:
+            # Nothing new since the last upload; the remote copy is current
+            return True
         
-        with self._upload_lock:
-            try:
-                # Flush all log handlers to ensure log file is complete
-                if force_flush:
-                    root_logger = logging.getLogger("ghostroll")
-                    for handler in root_logger.handlers:
-                        handler.flush()
-                    # Also flush root handlers
-                    for handler in logging.root.handlers:
-                        handler.flush()
-                
-                # Upload the log file
-                # s3_upload_file returns None on success, raises AwsBoto3Error on failure
+        if not self._upload_lock.acquire(blocking=block):
+            return False
+        self._upload_owner = threading.get_ident()
+        try:
+            return self._upload_log_locked()
+        finally:
+            self._upload_owner = None
+            self._upload_lock.release()
+    
+    def _upload_log_locked(self) -> bool:
+        try:
+            size = self.log_file.stat().st_size
+            if self._uploaded_size and size == self._uploaded_size:
+                # Nothing new since the last upload; the remote copy is current
+                return True
+            if size < self._uploaded_size:
+                # Log truncated or rotated: rebuild the remote copy from scratch
+                self._reset_remote()
+
+            # Large remote copy: keep its bytes server-side and send just the
+            # new data. If the append is rejected, fall back to a full upload.
+            if self._remote_size >= APPEND_THRESHOLD_BYTES:
+                data = self._encode(self._read_log(self._uploaded_size, size))
                 try:
-                    s3_upload_file(
-                        local_path=self.log_file,
+                    s3_append_bytes(
+                        data,
                         bucket=self.s3_bucket,
                         key=self.s3_key,
+                        offset=self._remote_size,
+                        content_type=self._content_type,
                     )
-                    # Upload succeeded
-                    self._last_upload_time = time.time()
-                    self._upload_count += 1
+                    self._remote_size += len(data)
+                    self._mark_uploaded(size)
                     return True
                 except AwsBoto3Error as e:
-                    logger.debug(f"Log upload failed: {e}")
-                    return False
-            except Exception as e:
-                logger.debug(f"Log upload exception: {e}")
+                    logger.debug(f"Log append failed, re-uploading whole log: {e}")
+                    self._reset_remote()
+
+            # Upload the whole log
+            # s3_upload_file / s3_put_bytes return None on success, raise AwsBoto3Error on failure
+            try:
+                if self._compress:
+                    # Concatenated gzip members form a valid gzip file, so
+                    # earlier output is reused rather than recompressed.
+                    body = self._gz_prefix + self._encode(self._read_log(self._uploaded_size, size))
+                    s3_put_bytes(body, bucket=self.s3_bucket, key=self.s3_key, content_type=self._content_type)
+                    self._remote_size = len(body)
+                    self._gz_prefix = body if len(body) < APPEND_THRESHOLD_BYTES else b""
+                else:
+                    s3_upload_file(
+                        local_path=self.log_file,
+                        bucket=self.s3_bucket,
+                        key=self.s3_key,
+                    )
+                    self._remote_size = size
+                # Upload succeeded
+                self._mark_uploaded(size)
+                return True
+            except AwsBoto3Error as e:
+                self._reset_remote()
+                logger.debug(f"Log upload failed: {e}")
                 return False
+        except Exception as e:
+            logger.debug(f"Log upload exception: {e}")
+            return False
+
+    def _flush_handlers(self) -> None:
+        """Flush the logging handlers that write to log_file."""
+        handlers = self._file_handlers
+        if not handlers:
+            # Look the handlers up once they exist; a session logfile can be
+            # attached after the uploader is created.
+            target = os.path.abspath(self.log_file)
+            handlers = [
+                h
+                for h in (*logging.getLogger("ghostroll").handlers, *logging.root.handlers)
+                if isinstance(h, logging.FileHandler) and h.baseFilename == target
+            ]
+            self._file_handlers = handlers
+        for handler in handlers:
+            handler.flush()
+    
+    def _read_log(self, start: int, end: int) -> bytes:
+        """Read bytes [start, end) of the log file."""
+        with self.log_file.open("rb") as f:
+            f.seek(start)
+            return f.read(end - start)
+    
+    def _encode(self, data: bytes) -> bytes:
+        """Turn new log bytes into what gets appended to the remote object."""
+        if not self._compress:
+            return data
+        return gzip.compress(data, compresslevel=_GZIP_LEVEL, mtime=0)
+    
+    def _mark_uploaded(self, size: int) -> None:
+        self._uploaded_size = size
+        self._last_upload_time = time.time()
+        self._upload_count += 1
+    
+    def _reset_remote(self) -> None:
+        """Forget what the remote copy holds; the next upload sends the whole log."""
+        self._uploaded_size = 0
+        self._remote_size = 0
+        self._gz_prefix = b""
+    
+    def _tick(self) -> bool:
+        """
+        One periodic upload. Returns False (without any S3 request) if the
+        log has nothing new since the last upload.
+        """
+        # Flush first so buffered session log records show up in the size.
+        # A failed flush (disk full, closed stream) must not end the worker.
+        try:
+            self._flush_handlers()
+        except Exception as e:
+            logger.debug(f"Log flush before periodic upload failed: {e}")
+        try:
+            size = os.stat(self.log_file).st_size
+        except OSError:
+            return False
+        if size == self._uploaded_size:
+            return False
+        # (skipped if an upload_now() or signal-driven upload is running)
+        if size > 0:
+            self._upload_log(force_flush=False, block=False)
+        return True
     
     def _periodic_upload_worker(self):
         """Background thread that periodically uploads logs during processing."""
-        while not self._stop_event.is_set():
-            # Wait for the interval, or until stop is signaled
-            if self._stop_event.wait(timeout=self.upload_interval):
-                # Stop was signaled, do one final upload
-                break
+        interval = self.upload_interval
+        max_interval = max(self.upload_interval, MAX_IDLE_UPLOAD_INTERVAL)
+        idle_ticks = 0
+        # Ticks are due on a fixed schedule rather than `interval` after the
+        # previous upload finished, so slow uploads don't stretch the cadence.
+        deadline = time.monotonic() + interval
+        while True:
+            # Wait for the next tick, an upload request, or stop
+            with self._cv:
+                self._cv.wait_for(
+                    lambda: self._stop or self._wake, timeout=max(0.0, deadline - time.monotonic())
+                )
+                if self._stop:
+                    # Stop was signaled, do one final upload
+                    break
+                self._wake = False
+            scheduled = time.monotonic() >= deadline
+            
+            if self._tick():
+                idle_ticks = 0
+                interval = self.upload_interval
+            else:
+                # Back off while the log stays idle
+                idle_ticks += 1
+                if idle_ticks >= 2:
+                    interval = min(interval * 2, max_interval)
             
-            # Periodic upload during processing
-            if self.log_file.exists() and self.log_file.stat().st_size > 0:
-                self._upload_log(force_flush=False)
+            # A missed tick is not made up, the next one is simply an interval
+            # out. An early request_upload() wake keeps the schedule, except
+            # that new output ends an idle backoff right away.
+            now = time.monotonic()
+            if scheduled:
+                deadline += interval
+                if deadline <= now:
+                    deadline = now + interval
+            else:
+                deadline = min(deadline, now + interval)
         
         # Final upload when stopping
         self._upload_log(force_flush=True)
     
     def _signal_handler(self, signum, frame):
         """Handle signals (SIGTERM, SIGINT, etc.) to ensure log upload."""
-        signal_name = signal.Signals(signum).name
-        logger.warning(f"Received signal {signal_name}, uploading log before exit...")
-        
-        # Stop periodic uploads
-        self.stop()
-        
-        # Force upload the log
-        self._upload_log(force_flush=True)
-        
-        # Re-raise the signal to allow normal cleanup
-        signal.signal(signum, signal.SIG_DFL)
+        # Hold off a second SIGTERM/SIGINT until we're done; it would otherwise
+        # re-enter this handler mid-upload. It stays pending and is delivered
+        # with the default action once the mask is restored below.
+        old_mask = None
+        if hasattr(signal, "pthread_sigmask"):
+            old_mask = signal.pthread_sigmask(signal.SIG_BLOCK, _HANDLED_SIGNALS)
+        try:
+            signal_name = signal.Signals(signum).name
+            logger.warning(f"Received signal {signal_name}, uploading log before exit...")
+            
+            # Stop periodic uploads
+            self.stop()
+            
+            # Force upload the log. If the signal interrupted an upload on this
+            # same thread, the lock can never be released while we wait here,
+            # so skip it rather than deadlock.
+            self._upload_log(force_flush=True, block=self._upload_owner != threading.get_ident())
+            
+            # Re-raise the signal to allow normal cleanup
+            signal.signal(signum, signal.SIG_DFL)
+        finally:
+            if old_mask is not None:
+                signal.pthread_sigmask(signal.SIG_SETMASK, old_mask)
         signal.raise_signal(signum)
     
     def _atexit_handler(self):
@@ -131,7 +321,7 @@ class LogUploader:
             return
         
         # Register signal handlers for graceful shutdown
-        for sig in (signal.SIGTERM, signal.SIGINT):
+        for sig in _HANDLED_SIGNALS:
             try:
                 # Save existing handler if any
                 old_handler = signal.signal(sig, self._signal_handler)
@@ -151,7 +341,9 @@ class LogUploader:
         if self._upload_thread is not None and self._upload_thread.is_alive():
             return
         
-        self._stop_event.clear()
+        with self._cv:
+            self._stop = False
+            self._wake = False
         self._upload_thread = threading.Thread(
             target=self._periodic_upload_worker,
             daemon=True,  # Daemon thread so it doesn't prevent program exit
@@ -165,7 +357,9 @@ class LogUploader:
         if self._upload_thread is None:
             return
         
-        self._stop_event.set()
+        with self._cv:
+            self._stop = True
+            self._cv.notify()
         if self._upload_thread.is_alive():
             # Wait for thread to finish (with timeout)
             self._upload_thread.join(timeout=5.0)
@@ -184,6 +378,17 @@ class LogUploader:
         """
         return self._upload_log(force_flush=force_flush)
     
+    def request_upload(self) -> None:
+        """
+        Ask the background worker to upload soon without waiting for it.
+
+        Requests made while an upload is already pending collapse into one.
+        Does nothing if the worker is not running; use upload_now() instead.
+        """
+        with self._cv:
+            self._wake = True
+            self._cv.notify()
+    
     def get_stats(self) -> dict:
         """Get upload statistics."""
         return {
@@ -4,6 +4,38 @@ import logging
 from pathlib import Path
 
 
+class SessionFileHandler(logging.FileHandler):
+    """
+    FileHandler that doesn't flush after every record.
+
+    Records below flush_level stay in the file's write buffer until it fills
+    or flush() is called (the log uploader flushes before each upload, and
+    logging.shutdown() at exit); WARNING and above are written through at
+    once so problems reach disk immediately.
+    """
+
+    def __init__(self, filename: Path, *, flush_level: int = logging.WARNING) -> None:
+        super().__init__(filename)
+        self.flush_level = flush_level
+        self._defer_flush = False
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # Runs under self.lock (taken by Handler.handle)
+        self._defer_flush = record.levelno < self.flush_level
+        try:
+            super().emit(record)
+        finally:
+            self._defer_flush = False
+
+    def flush(self) -> None:
+        # Checked under the lock so an explicit flush() from another thread
+        # waits for an in-flight emit instead of being skipped.
+        with self.lock:
+            if self._defer_flush:
+                return
+            super().flush()
+
+
 def setup_logging(*, session_dir: Path | None = None, verbose: bool = True) -> logging.Logger:
     """
     Set up logging for GhostRoll.
@@ -25,7 +57,7 @@ def setup_logging(*, session_dir: Path | None = None, verbose: bool = True) -> l
 
     if session_dir is not None:
         session_dir.mkdir(parents=True, exist_ok=True)
-        fh = logging.FileHandler(session_dir / "ghostroll.log")
+        fh = SessionFileHandler(session_dir / "ghostroll.log")
         fh.setLevel(logging.DEBUG)
         fh.setFormatter(fmt)
         logger.addHandler(fh)
@@ -45,7 +77,7 @@ def attach_session_logfile(logger: logging.Logger, session_dir: Path) -> None:
             return
 
     fmt = logging.Formatter("%(asctime)s %(levelname)s %(message)s")
-    fh = logging.FileHandler(logfile)
+    fh = SessionFileHandler(logfile)
     fh.setLevel(logging.DEBUG)
     fh.setFormatter(fmt)
     logger.addHandler(fh)
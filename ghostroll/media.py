@@ -1,24 +1,35 @@
 from __future__ import annotations
 
+import os
 from pathlib import Path
 
 
 JPEG_EXTS = {".jpg", ".jpeg"}
 RAW_EXTS = {".arw", ".cr2", ".cr3", ".nef", ".dng", ".raf", ".rw2"}
+_MEDIA_EXTS = frozenset(JPEG_EXTS | RAW_EXTS)
 
 
-def is_jpeg(path: Path) -> bool:
-    return path.suffix.lower() in JPEG_EXTS
+def _suffix(path: Path | str) -> str:
+    """
+    Lower-cased Path(path).suffix, taken straight from the path string.
 
+    Skips building PurePath parts; a dotfile named like an extension (".jpg")
+    has no suffix, same as pathlib.
+    """
+    s = os.fspath(path)
+    i = s.rfind(".")
+    if i <= 0 or s[i - 1] == "/":
+        return ""
+    return s[i:].lower()
 
-def is_raw(path: Path) -> bool:
-    return path.suffix.lower() in RAW_EXTS
 
-
-def is_media(path: Path) -> bool:
-    s = path.suffix.lower()
-    return s in JPEG_EXTS or s in RAW_EXTS
+def is_jpeg(path: Path | str) -> bool:
+    return _suffix(path) in JPEG_EXTS
 
 
+def is_raw(path: Path | str) -> bool:
+    return _suffix(path) in RAW_EXTS
 
 
+def is_media(path: Path | str) -> bool:
+    return _suffix(path) in _MEDIA_EXTS
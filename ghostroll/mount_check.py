@@ -1,25 +1,168 @@
 """
-Bulletproof mount detection using findmnt as the source of truth.
+Bulletproof mount detection using the kernel mount table as the source of truth.
 
 This module provides a single, reliable way to check if a path is a real device mount.
-Uses findmnt (Linux) or mount (macOS) as the authoritative source.
+Reads /proc/self/mountinfo (Linux, with findmnt as a fallback) or mount (macOS).
 """
 
 from __future__ import annotations
 
 import logging
+import os
 import platform
+import re
 import subprocess
+import time
+from functools import lru_cache
 from pathlib import Path
 
 logger = logging.getLogger("ghostroll.mount_check")
 
 
+# The table findmnt itself reads; parsing it in-process avoids a fork/exec per check.
+_MOUNTINFO = "/proc/self/mountinfo"
+_PROC_MOUNTS = "/proc/mounts"
+
+_OCTAL_ESCAPE = re.compile(r"\\([0-7]{3})")
+
+
+def _unescape_mount_field(field: str) -> str:
+    """Decode the octal escapes (\\040 for space, etc.) the kernel uses in mount tables."""
+    if "\\" not in field:
+        return field
+    return _OCTAL_ESCAPE.sub(lambda m: chr(int(m.group(1), 8)), field)
+
+
+def _parse_mountinfo() -> dict[str, tuple[str, str]]:
+    """
+    Parse /proc/self/mountinfo into {mount_point: (fstype, source)}.
+
+    When several mounts are stacked on one mount point (e.g. a device
+    automounted over its autofs trigger), the later, top-most entry wins.
+    Raises OSError if the table can't be read.
+    """
+    mounts: dict[str, tuple[str, str]] = {}
+    with open(_MOUNTINFO, encoding="utf-8", errors="surrogateescape") as f:
+        for line in f:
+            # "<id> <parent> <maj:min> <root> <mount point> <opts> [optional...] - <fstype> <source> <super opts>"
+            left, sep, right = line.partition(" - ")
+            if not sep:
+                continue
+            fields = left.split()
+            tail = right.split()
+            if len(fields) < 5 or not tail:
+                continue
+            mounts[_unescape_mount_field(fields[4])] = (
+                tail[0],
+                _unescape_mount_field(tail[1]) if len(tail) > 1 else "",
+            )
+    return mounts
+
+
+@lru_cache(maxsize=1)
+def _read_mountinfo(bucket: int) -> dict[str, tuple[str, str]]:
+    """
+    _parse_mountinfo(), shared by checks within the same bucket.
+
+    bucket is int(time.monotonic() * 2), so bursts of checks within the same
+    half second share one read.
+    """
+    return _parse_mountinfo()
+
+
+def _trigger_automount(path_str: str, *, timeout: float = 0.5) -> bool:
+    """
+    Access path_str to trigger an automount, then wait (up to timeout) while
+    it is still an unmounted autofs placeholder. Returns False if the
+    directory couldn't be opened.
+    """
+    try:
+        # Opening the directory is enough to trigger the mount; no need to list it
+        os.close(os.open(path_str, os.O_RDONLY | os.O_DIRECTORY))
+    except OSError:
+        return False
+    
+    deadline = time.monotonic() + timeout
+    delay = 0.005
+    while True:
+        try:
+            entry = _parse_mountinfo().get(path_str)
+        except OSError:
+            # Can't watch the mount table; give the automount a fixed head start
+            time.sleep(0.3)
+            return True
+        if entry is None or entry[0] != "autofs" or time.monotonic() >= deadline:
+            return True
+        time.sleep(delay)
+        delay = min(delay * 2, 0.05)
+
+
+def _escape_mount_field(field: str) -> str:
+    """Inverse of _unescape_mount_field for the characters the kernel escapes."""
+    return (
+        field.replace("\\", "\\134").replace(" ", "\\040").replace("\t", "\\011").replace("\n", "\\012")
+    )
+
+
+def _proc_mounts_fstype(path_str: str) -> str | None:
+    """
+    Filesystem type mounted at path_str according to /proc/mounts, or None.
+
+    Searches the raw bytes for the escaped mount point and only splits the
+    lines that contain it. The last match wins, as for stacked mounts it is
+    the top-most one.
+    """
+    fd = os.open(_PROC_MOUNTS, os.O_RDONLY)
+    try:
+        chunks = []
+        while chunk := os.read(fd, 65536):
+            chunks.append(chunk)
+    finally:
+        os.close(fd)
+    data = b"".join(chunks)
+    # "<source> <mount point> <fstype> <options> <dump> <pass>"
+    needle = b" " + os.fsencode(_escape_mount_field(path_str)) + b" "
+    fstype = None
+    i = data.find(needle)
+    while i != -1:
+        start = data.rfind(b"\n", 0, i) + 1
+        end = data.find(b"\n", i)
+        fields = data[start : end if end != -1 else len(data)].split()
+        if len(fields) >= 3 and start + len(fields[0]) == i:
+            fstype = fields[2].decode("ascii", "replace")
+        i = data.find(needle, i + 1)
+    return fstype
+
+
+@lru_cache(maxsize=1)
+def _mount_output(bucket: int) -> str:
+    """stdout of macOS `mount`, shared by checks within the same second (bucket)."""
+    return subprocess.run(["mount"], capture_output=True, text=True, timeout=2).stdout
+
+
+@lru_cache(maxsize=64)
+def _findmnt(path_str: str, bucket: int) -> tuple[int, str]:
+    """
+    Run findmnt for path_str, returning (returncode, stdout).
+
+    bucket is int(time.monotonic()), so callers polling the same path within
+    the same second share one subprocess instead of spawning one each.
+    """
+    result = subprocess.run(
+        ["findmnt", "-n", "-o", "FSTYPE,SOURCE", path_str],
+        capture_output=True,
+        text=True,
+        timeout=2
+    )
+    return result.returncode, result.stdout
+
+
 def is_real_device_mount(mount_path: Path, *, trigger_automount: bool = False) -> bool:
     """
     Check if a path is a real device mount (not just a directory or autofs placeholder).
     
-    This is the bulletproof method - uses findmnt/mount as the source of truth.
+    This is the bulletproof method - uses the kernel mount table (falling back to
+    findmnt) or mount as the source of truth.
     
     Args:
         mount_path: Path to check (e.g., /mnt/auto-import)
@@ -29,8 +172,9 @@ def is_real_device_mount(mount_path: Path, *, trigger_automount: bool = False) -
         True if there's a real device mounted at this path, False otherwise.
     
     Strategy:
-        1. For /mnt paths on Linux: trigger automount if requested, then check findmnt
-        2. Use findmnt to get mount source and filesystem type
+        1. For /mnt paths on Linux: trigger automount if requested, then check the mount table
+           (paths that aren't mount points at all are rejected with a stat first)
+        2. Look up mount source and filesystem type in /proc/self/mountinfo (or findmnt)
         3. Reject autofs filesystem type
         4. Reject systemd-1 or autofs sources
         5. For /dev/ devices, verify device file exists
@@ -45,10 +189,7 @@ def is_real_device_mount(mount_path: Path, *, trigger_automount: bool = False) -
             # /Volumes is always mounts on macOS
             return True
         try:
-            result = subprocess.run(
-                ["mount"], capture_output=True, text=True, timeout=2
-            )
-            return path_str in result.stdout
+            return path_str in _mount_output(int(time.monotonic()))
         except Exception:
             return False
     
@@ -58,42 +199,54 @@ def is_real_device_mount(mount_path: Path, *, trigger_automount: bool = False) -
         if path_str.startswith("/media/") or path_str.startswith("/run/media/"):
             return True
         
-        # For /mnt and other paths, use findmnt
+        # For /mnt and other paths, consult the mount table
+        triggered = False
         if path_str.startswith("/mnt/") and trigger_automount:
-            # Try to trigger automount by accessing the directory
-            try:
-                list(mount_path.iterdir())
-                import time
-                time.sleep(0.3)  # Give automount time to complete
-            except (OSError, IOError):
-                # Can't access - probably not mounted
-                pass
+            # Can't access - probably not mounted (the lookup below will say so)
+            triggered = _trigger_automount(path_str)
+        
+        # Cheap pre-filter: a plain directory is not a mount point at all.
+        # (An autofs placeholder is, so the table lookup below still decides.)
+        if not os.path.ismount(path_str):
+            return False
         
         try:
-            # Use findmnt to get mount information
-            result = subprocess.run(
-                ["findmnt", "-n", "-o", "FSTYPE,SOURCE", path_str],
-                capture_output=True,
-                text=True,
-                timeout=2
-            )
-            
-            if result.returncode != 0:
-                # Not mounted
-                return False
-            
-            output = result.stdout.strip()
-            if not output:
-                # Empty output = not mounted
-                return False
-            
-            # Parse: "FSTYPE SOURCE"
-            parts = output.split(None, 1)
-            if len(parts) < 1:
-                return False
+            # A just-triggered automount may have changed the answer, so don't
+            # reuse a cached table then.
+            if triggered:
+                _read_mountinfo.cache_clear()
+                _findmnt.cache_clear()
+            try:
+                mounts: dict[str, tuple[str, str]] | None = _read_mountinfo(int(time.monotonic() * 2))
+            except OSError:
+                mounts = None
             
-            fstype = parts[0]
-            source = parts[1] if len(parts) > 1 else ""
+            if mounts is not None:
+                entry = mounts.get(path_str)
+                if entry is None:
+                    # Not mounted
+                    return False
+                fstype, source = entry
+            else:
+                # No mountinfo (unusual /proc setup): ask findmnt instead
+                returncode, stdout = _findmnt(path_str, int(time.monotonic()))
+                
+                if returncode != 0:
+                    # Not mounted
+                    return False
+                
+                output = stdout.strip()
+                if not output:
+                    # Empty output = not mounted
+                    return False
+                
+                # Parse: "FSTYPE SOURCE"
+                parts = output.split(None, 1)
+                if len(parts) < 1:
+                    return False
+                
+                fstype = parts[0]
+                source = parts[1] if len(parts) > 1 else ""
             
             # Reject autofs filesystem type
             if fstype == "autofs":
@@ -107,7 +260,7 @@ def is_real_device_mount(mount_path: Path, *, trigger_automount: bool = False) -
             
             # For /dev/ devices, verify device file exists (catches stale mounts)
             if source.startswith("/dev/"):
-                if not Path(source).exists():
+                if not os.path.exists(source):
                     logger.debug(f"{mount_path} device {source} does not exist - stale mount")
                     return False
             
@@ -119,19 +272,10 @@ def is_real_device_mount(mount_path: Path, *, trigger_automount: bool = False) -
             # findmnt not available, fall back to /proc/mounts
             logger.debug("findmnt not available, falling back to /proc/mounts")
             try:
-                with open("/proc/mounts", "r") as f:
-                    for line in f:
-                        parts = line.split()
-                        if len(parts) >= 2:
-                            mount_point = parts[1].replace("\\040", " ")
-                            if mount_point == path_str:
-                                fstype = parts[2] if len(parts) > 2 else ""
-                                if fstype == "autofs":
-                                    return False
-                                return True
-                return False
+                fstype = _proc_mounts_fstype(path_str)
             except Exception:
                 return False
+            return fstype is not None and fstype != "autofs"
         except Exception as e:
             logger.debug(f"Error checking mount status: {e}")
             return False
@@ -1,32 +1,44 @@
 from __future__ import annotations
 
-import json
+import errno
+import gzip
+import logging
 import os
-import queue
 import shutil
 import sqlite3
 import stat
-import subprocess
+import tempfile
 import threading
 import time
 import zipfile
+from collections.abc import Iterable
 from dataclasses import dataclass
 from datetime import datetime, timezone
+from operator import itemgetter
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait
 
 from . import media
-from .aws_boto3 import AwsBoto3Error, s3_upload_file, s3_presign_url, s3_object_exists
+from .aws_boto3 import AwsBoto3Error, s3_list_keys, s3_put_bytes, s3_upload_file, s3_presign_url, s3_object_exists
 from .config import Config
 from .db import connect
 from .exif_utils import extract_basic_exif
 from .gallery import build_index_html_from_items, build_index_html_loading, build_index_html_presigned
-from .hashing import sha256_file
-from .image_processing import ProcessingError, render_jpeg_derivative
+from .hashing import (
+    BLAKE3_PREFIX,
+    blake3_available,
+    content_hash_file,
+    content_hash_many,
+    hash_and_copy_file,
+    hash_algo_of,
+    sha256_file,
+    sha256_many,
+)
+from .image_processing import ProcessingError, render_jpeg_derivatives
 from .logging_utils import attach_session_logfile
 from .log_uploader import ensure_log_upload, LogUploader
 from .qr import QrError, render_qr_ascii, write_qr_png
-from .status import Status, StatusWriter
+from .status import AsyncStatusWriter, Status, StatusWriter, dumps_json_bytes
 
 
 class PipelineError(RuntimeError):
@@ -62,23 +74,109 @@ def _safe_rel_under(root: Path, path: Path) -> Path:
     return rel
 
 
+def _path_sort_key(p: Path) -> str:
+    """
+    String sort key that orders paths like Path.__lt__ (component by component):
+    "\0" sorts below every filename character. Comparing one str per path is much
+    cheaper than Path's per-comparison parts tuples.
+    """
+    return str(p).replace(os.sep, "\0")
+
+
+# copy_file_range errors meaning "not between these files/filesystems"
+_CFR_UNSUPPORTED = frozenset(
+    {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF, errno.ETXTBSY}
+)
+
+
+def _copy_file_range(src: Path, dst: Path) -> bool:
+    """
+    Copy src's data to dst in the kernel with os.copy_file_range (a reflink on
+    Btrfs/XFS, a server-side copy on NFS). Returns False, before writing
+    anything, if the kernel can't do it for this pair of files.
+    """
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        infd, outfd = fsrc.fileno(), fdst.fileno()
+        copied = 0
+        while True:
+            try:
+                n = os.copy_file_range(infd, outfd, 1 << 30)
+            except OSError as e:
+                if copied == 0 and e.errno in _CFR_UNSUPPORTED:
+                    return False
+                raise
+            if n == 0:
+                # 0 on the first call can also mean "unsupported here" (e.g. procfs)
+                return copied > 0 or os.fstat(infd).st_size == 0
+            copied += n
+
+
+# Per-run staging dirs (see run_pipeline) older than this are from a run that was
+# killed before its cleanup ran; no run hashes a card for this long.
+_STALE_STAGING_S = 24 * 3600
+
+
+def _remove_stale_staging(sessions_dir: Path) -> None:
+    """Delete staging dirs left by killed runs, leaving those of concurrent runs alone."""
+    cutoff = time.time() - _STALE_STAGING_S
+    for d in sessions_dir.glob(".incoming*"):
+        try:
+            if d.stat().st_mtime < cutoff:
+                shutil.rmtree(d, ignore_errors=True)
+        except OSError:
+            pass
+
+
+def _adopt_staged(staged: set[Path], *, staging_dcim: Path, originals_dcim: Path, dcim_dir: Path) -> set[Path]:
+    """
+    Move copies made while hashing (staging_dcim/<rel>) to originals_dcim/<rel>.
+    Returns the card paths whose copy is now in place; the rest are left to the
+    copy stage. The staging dir is removed afterwards.
+    """
+    adopted: set[Path] = set()
+    for src in staged:
+        rel = _safe_rel_under(dcim_dir, src)
+        dst = originals_dcim / rel
+        try:
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            if dst.exists():
+                continue
+            os.replace(staging_dcim / rel, dst)
+        except OSError:
+            continue
+        adopted.add(src)
+    shutil.rmtree(staging_dcim.parent, ignore_errors=True)
+    return adopted
+
+
 def _copy2_ignore_existing(src: Path, dst: Path) -> bool:
     dst.parent.mkdir(parents=True, exist_ok=True)
     if dst.exists():
         return False
+    if hasattr(os, "copy_file_range") and _copy_file_range(src, dst):
+        shutil.copystat(src, dst)
+        return True
+    # shutil.copy2 uses sendfile on Linux, so the data still never passes
+    # through a Python buffer
     shutil.copy2(src, dst)
     return True
 
 
+# Already-compressed formats; deflating them burns CPU for next to no size gain.
+_ZIP_STORED_SUFFIXES = frozenset({".jpg", ".jpeg", ".png", ".heic", ".mp4", ".mov"})
+
+
 def _build_share_zip(*, share_dir: Path, out_zip: Path) -> None:
     """
     Creates a zip file containing the share/ directory contents.
+    Images and videos are stored as-is; anything else is deflated.
     """
     out_zip.parent.mkdir(parents=True, exist_ok=True)
     with zipfile.ZipFile(out_zip, "w", compression=zipfile.ZIP_DEFLATED) as zf:
-        for p in sorted([p for p in share_dir.rglob("*") if p.is_file()]):
+        for p in sorted([p for p in share_dir.rglob("*") if p.is_file()], key=_path_sort_key):
             rel = p.relative_to(share_dir)
-            zf.write(p, arcname=str(Path("share") / rel))
+            compress_type = zipfile.ZIP_STORED if p.suffix.lower() in _ZIP_STORED_SUFFIXES else zipfile.ZIP_DEFLATED
+            zf.write(p, arcname=str(Path("share") / rel), compress_type=compress_type)
 
 
 def _build_raw_zip(*, originals_dir: Path, out_zip: Path, logger=None, progress_callback=None, raw_files_list: list[Path] | None = None) -> int:
@@ -112,9 +210,9 @@ def _build_raw_zip(*, originals_dir: Path, out_zip: Path, logger=None, progress_
     
     # Use provided list or collect RAW files (more efficient than checking during iteration)
     if raw_files_list is not None:
-        raw_files = sorted(raw_files_list)
+        raw_files = sorted(raw_files_list, key=_path_sort_key)
     else:
-        raw_files = sorted([p for p in dcim_dir.rglob("*") if p.is_file() and media.is_raw(p)])
+        raw_files = sorted([p for p in dcim_dir.rglob("*") if p.is_file() and media.is_raw(p)], key=_path_sort_key)
     
     if not raw_files:
         return 0
@@ -147,49 +245,71 @@ def _db_has_ingested(conn: sqlite3.Connection, sha256: str) -> bool:
     return row is not None
 
 
-def _db_get_known_sizes(conn: sqlite3.Connection) -> set[int]:
-    """Get all known file sizes from database for fast pre-filtering."""
-    rows = conn.execute("SELECT DISTINCT size_bytes FROM ingested_files").fetchall()
-    return {row["size_bytes"] for row in rows}
+def _db_probe(conn: sqlite3.Connection, sql: str, values) -> list[sqlite3.Row]:
+    """
+    Load values into the connection's TEMP probe table (column v) and run sql against it.
 
+    Lookups join probe against an indexed column with fixed SQL, instead of
+    building an IN (?, ?, ...) list that changes shape per call and is capped at
+    SQLite's host-parameter limit.
+    """
+    owned = not conn.in_transaction
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS probe(v PRIMARY KEY) WITHOUT ROWID")
+    conn.execute("DELETE FROM temp.probe")
+    conn.executemany("INSERT OR IGNORE INTO temp.probe(v) VALUES(?)", ((v,) for v in values))
+    rows = conn.execute(sql).fetchall()
+    if owned:
+        # The temp-table writes opened a transaction; end it so this connection
+        # doesn't carry a stale read snapshot into its next write.
+        conn.commit()
+    return rows
+
+
+def _db_get_known_sizes(conn: sqlite3.Connection, sizes) -> set[int]:
+    """Which of sizes already occur in ingested_files (for pre-filtering before hashing)."""
+    rows = _db_probe(
+        conn, "SELECT v FROM temp.probe WHERE EXISTS (SELECT 1 FROM ingested_files WHERE size_bytes = v)", sizes
+    )
+    return {row[0] for row in rows}
 
-def _db_get_failed_files(conn: sqlite3.Connection, *, dcim_dir: Path) -> set[Path]:
-    """Get set of file paths that have consistently failed to hash."""
-    # Get failed files that match files in this DCIM directory
-    failed_rows = conn.execute(
-        "SELECT file_path FROM failed_files WHERE failure_count >= 2"
-    ).fetchall()
-    failed_paths = set()
-    for row in failed_rows:
-        file_path_str = row["file_path"]
-        # Try to match against current DCIM structure
-        # file_path might be absolute or relative - try both
-        try:
-            p = Path(file_path_str)
-            if p.is_absolute():
-                # Check if it's under the current dcim_dir
-                try:
-                    rel = p.relative_to(dcim_dir)
-                    if (dcim_dir / rel).exists():
-                        failed_paths.add(dcim_dir / rel)
-                except ValueError:
-                    # Not under dcim_dir, skip
-                    pass
-            else:
-                # Relative path, try under dcim_dir
-                candidate = dcim_dir / p
-                if candidate.exists():
-                    failed_paths.add(candidate)
-        except Exception:
-            # Invalid path, skip
-            pass
-    return failed_paths
+
+def _db_get_existing_shas(conn: sqlite3.Connection, shas) -> set[str]:
+    """Which of shas are already in ingested_files."""
+    rows = _db_probe(
+        conn, "SELECT v FROM temp.probe WHERE EXISTS (SELECT 1 FROM ingested_files WHERE sha256 = v)", shas
+    )
+    return {row[0] for row in rows}
+
+
+# Formatted once at import rather than on every call
+_SQL_LEGACY_SIZES = (
+    "SELECT v FROM temp.probe WHERE EXISTS "
+    f"(SELECT 1 FROM ingested_files WHERE size_bytes = v AND sha256 NOT LIKE '{BLAKE3_PREFIX}%')"
+)
+
+
+def _db_get_legacy_sizes(conn: sqlite3.Connection, sizes) -> set[int]:
+    """Which of sizes occur in ingested_files rows identified by SHA-256 (not BLAKE3)."""
+    rows = _db_probe(conn, _SQL_LEGACY_SIZES, sizes)
+    return {row[0] for row in rows}
+
+
+def _db_get_failed_files(conn: sqlite3.Connection, *, dcim_dir: Path, paths: list[Path]) -> set[Path]:
+    """Which of paths (files under dcim_dir) have consistently failed to hash."""
+    # _db_mark_failed_file stores paths relative to dcim_dir
+    by_rel = {os.path.relpath(p, dcim_dir): p for p in paths}
+    rows = _db_probe(
+        conn,
+        "SELECT f.file_path FROM temp.probe JOIN failed_files f ON f.file_path = v WHERE f.failure_count >= 2",
+        by_rel,
+    )
+    return {by_rel[row[0]] for row in rows}
 
 
 def _db_mark_failed_file(
-    conn: sqlite3.Connection, *, file_path: Path, size_bytes: int, dcim_dir: Path
+    conn: sqlite3.Connection, *, file_path: Path, size_bytes: int, dcim_dir: Path, now: str | None = None
 ) -> None:
-    """Mark a file as failed to hash, or increment failure count."""
+    """Mark a file as failed to hash, or increment failure count (now: timestamp shared by a batch)."""
     # Store relative path for portability
     try:
         rel_path = str(file_path.relative_to(dcim_dir))
@@ -197,7 +317,8 @@ def _db_mark_failed_file(
         # If not under dcim_dir, store absolute path
         rel_path = str(file_path)
     
-    now = _utc_now()
+    if now is None:
+        now = _utc_now()
     conn.execute(
         "INSERT INTO failed_files(file_path, size_bytes, first_failed_utc, last_failed_utc, failure_count) "
         "VALUES(?, ?, ?, ?, 1) "
@@ -207,17 +328,6 @@ def _db_mark_failed_file(
     )
 
 
-def _db_mark_ingested(
-    conn: sqlite3.Connection, *, sha256: str, size_bytes: int, source_hint: str
-) -> None:
-    """Mark a single file as ingested (for individual inserts)."""
-    conn.execute(
-        "INSERT OR IGNORE INTO ingested_files(sha256,size_bytes,first_seen_utc,source_hint) "
-        "VALUES(?,?,?,?)",
-        (sha256, size_bytes, _utc_now(), source_hint),
-    )
-
-
 def _db_mark_ingested_batch(
     conn: sqlite3.Connection, *, items: list[tuple[str, int, str]]
 ) -> None:
@@ -238,174 +348,253 @@ def _db_mark_ingested_batch(
     )
 
 
-def _db_uploaded_sha(conn: sqlite3.Connection, *, s3_key: str) -> str | None:
-    row = conn.execute(
-        "SELECT local_sha256 FROM uploads WHERE s3_key = ?", (s3_key,)
-    ).fetchone()
-    return row["local_sha256"] if row is not None else None
+# Uploads recorded per DB transaction (see _flush_upload_marks in run_pipeline)
+_UPLOAD_MARK_BATCH = 64
 
 
-def _db_mark_uploaded(
-    conn: sqlite3.Connection, *, s3_key: str, local_sha256: str, size_bytes: int
+def _db_get_uploaded(conn: sqlite3.Connection, *, prefix: str) -> dict[str, str]:
+    """s3_key -> local_sha256 for everything already uploaded under prefix/."""
+    # Range scan on the primary key; "0" is the character right after "/"
+    rows = conn.execute(
+        "SELECT s3_key, local_sha256 FROM uploads WHERE s3_key >= ? AND s3_key < ?",
+        (prefix + "/", prefix + "0"),
+    ).fetchall()
+    return {row["s3_key"]: row["local_sha256"] for row in rows}
+
+
+def _db_mark_uploaded_batch(
+    conn: sqlite3.Connection, *, items: list[tuple[str, str, int]]
 ) -> None:
-    conn.execute(
+    """Record uploads in one statement; items are (s3_key, local_sha256, size_bytes)."""
+    if not items:
+        return
+    now = _utc_now()
+    conn.executemany(
         "INSERT OR REPLACE INTO uploads(s3_key,local_sha256,size_bytes,uploaded_utc) VALUES(?,?,?,?)",
-        (s3_key, local_sha256, size_bytes, _utc_now()),
+        [(key, sha, size, now) for key, sha, size in items],
+    )
+
+
+# (dev, ino) -> (mtime_ns, size_bytes, sha256), as loaded from file_hashes
+FileHashCache = dict[tuple[int, int], tuple[int, int, str]]
+
+
+def _db_get_file_hashes(conn: sqlite3.Connection, *, dev: int) -> FileHashCache:
+    """file_hashes rows for one filesystem (the sessions dir's), loaded once per run."""
+    rows = conn.execute(
+        "SELECT ino, mtime_ns, size_bytes, sha256 FROM file_hashes WHERE dev = ?", (dev,)
+    ).fetchall()
+    return {(dev, row["ino"]): (row["mtime_ns"], row["size_bytes"], row["sha256"]) for row in rows}
+
+
+def _db_store_sha_batch(conn: sqlite3.Connection, *, items: list[tuple[os.stat_result, str]]) -> None:
+    conn.executemany(
+        "INSERT OR REPLACE INTO file_hashes(dev,ino,mtime_ns,size_bytes,sha256) VALUES(?,?,?,?,?)",
+        [(st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size, sha256) for st, sha256 in items],
     )
 
-def _db_with_retry(db_path: Path, fn, *, retries: int = 10, backoff: float = 0.05):
+
+def _db_forget_file_hashes(conn: sqlite3.Connection, *, keys: Iterable[tuple[int, int]]) -> None:
+    """Drop the file_hashes rows for the given (dev, ino) keys."""
+    conn.executemany("DELETE FROM file_hashes WHERE dev = ? AND ino = ?", list(keys))
+
+
+def _sha256_local_cached(
+    cache: FileHashCache,
+    path: Path,
+    *,
+    pending: list[tuple[os.stat_result, str]],
+    seen: set[tuple[int, int]] | None = None,
+) -> tuple[str, int]:
     """
-    SQLite can briefly lock under concurrent writes. This helper retries a small number of times.
+    sha256_file for files on local disk, memoized by (dev, ino) and validated against
+    mtime_ns + size. Not for SD card files: FAT/exFAT inode numbers are synthesized
+    per mount, so the key isn't stable there. New entries go into cache and onto
+    pending, for the caller to write with _db_store_sha_batch; seen collects every
+    key looked up, hit or miss.
     """
-    last_exc = None
-    for i in range(retries):
-        try:
-            conn = connect(db_path)
-            try:
-                return fn(conn)
-            finally:
-                conn.close()
-        except sqlite3.OperationalError as e:
-            last_exc = e
-            time.sleep(backoff * (i + 1))
-    raise last_exc  # type: ignore[misc]
+    st = path.stat()
+    if seen is not None:
+        seen.add((st.st_dev, st.st_ino))
+    hit = cache.get((st.st_dev, st.st_ino))
+    if hit is not None and hit[0] == st.st_mtime_ns and hit[1] == st.st_size:
+        return hit[2], st.st_size
+    sha, size = sha256_file(path, use_mmap=True)
+    # Stat taken before hashing: if the file changed meanwhile, its mtime no longer
+    # matches and the next lookup misses.
+    cache[(st.st_dev, st.st_ino)] = (st.st_mtime_ns, st.st_size, sha)
+    pending.append((st, sha))
+    return sha, size
+
+
+def _db_run(db_path: Path, fn):
+    """
+    Run fn on a short-lived connection (for worker threads; sqlite3 connections
+    are bound to the thread that made them). Lock waits are handled inside SQLite
+    by connect()'s busy timeout, so fn runs exactly once.
+    """
+    conn = connect(db_path)
+    try:
+        return fn(conn)
+    finally:
+        conn.close()
 
 
-def _iter_media_files(dcim_dir: Path, logger=None) -> list[Path]:
+# Extended attribute on copied originals: "<sha256> <size> <mtime_ns>"
+_SHA_XATTR = "user.ghostroll.sha256"
+
+
+def _store_sha_xattr(path: Path, *, sha256: str, size_bytes: int) -> None:
     """
-    Recursively find all media files in the DCIM directory.
-    Uses subprocess find command to bypass any Python filesystem caching.
-    
-    After remount, filesystems may have stale directory entries. This function
-    uses os.stat() directly with retry logic to ensure all files are detected.
+    Record the card file's SHA-256 on its fresh copy, so crash recovery can verify
+    the copy without re-reading it. Unlike file_hashes rows, the attribute is on
+    disk as soon as the copy is, before the ingest commit. Best effort: skipped
+    on filesystems without user xattrs.
     """
-    out: list[Path] = []
-    all_files_count = 0
-    
-    # Force a directory refresh by accessing the directory first
-    # This helps clear any stale directory entries after remount
+    if not hasattr(os, "setxattr"):
+        return
     try:
-        list(dcim_dir.iterdir())
-    except (OSError, IOError):
-        pass  # If we can't list, continue anyway - find will handle it
-    
+        st = os.stat(path)
+        if st.st_size != size_bytes:
+            return
+        os.setxattr(path, _SHA_XATTR, f"{sha256} {st.st_size} {st.st_mtime_ns}".encode("ascii"))
+    except OSError:
+        pass
+
+
+def _read_sha_xattr(path: Path, *, st: os.stat_result) -> str | None:
+    """The SHA-256 stored by _store_sha_xattr, if the file's size and mtime still match."""
+    if not hasattr(os, "getxattr"):
+        return None
     try:
-        # Use subprocess find to bypass any Python filesystem caching
-        # This should give us a fresh view of the filesystem
-        result = subprocess.run(
-            ["find", str(dcim_dir), "-type", "f"],
-            capture_output=True,
-            text=True,
-            timeout=60,
-        )
-        if result.returncode != 0:
+        sha, size, mtime_ns = os.getxattr(path, _SHA_XATTR).decode("ascii").split()
+    except (OSError, ValueError):
+        return None
+    if size != str(st.st_size) or mtime_ns != str(st.st_mtime_ns):
+        return None
+    return sha
+
+
+def _scan_files(directory: str, logger=None):
+    """
+    Yield a DirEntry for every non-directory entry under directory, recursively.
+
+    Symlinked directories are not followed. The caller filters on entry.is_file(),
+    which raises if the type can't be determined yet (right after a remount).
+    """
+    try:
+        it = os.scandir(directory)
+    except OSError as e:
+        if logger:
+            logger.debug(f"Cannot scan directory {directory}: {e}")
+        return
+    with it:
+        for entry in it:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from _scan_files(entry.path, logger)
+                    continue
+            except OSError:
+                pass
+            yield entry
+
+
+def _scan_session_originals(
+    session_dir: Path, *, dcim_dir: Path, card_files: set[Path], logger=None
+) -> dict[Path, Path]:
+    """
+    Map card files (members of card_files) to their copies under session_dir/originals/DCIM.
+    """
+    originals = os.path.join(session_dir, "originals", "DCIM")
+    found: dict[Path, Path] = {}
+    if not os.path.isdir(originals):
+        return found
+    if logger:
+        logger.debug(f"Checking {session_dir.name} for already-copied files...")
+    cut = len(originals) + 1
+    dcim_str = str(dcim_dir)
+    for entry in _scan_files(originals, logger):
+        try:
+            if not entry.is_file(follow_symlinks=False):
+                continue
+        except OSError:
+            continue
+        # Reconstruct the SD card path from the originals path
+        sd_card_path = Path(dcim_str + os.sep + entry.path[cut:])
+        if sd_card_path in card_files:
+            found[sd_card_path] = Path(entry.path)
+    return found
+
+
+def _iter_media_files(dcim_dir: Path, logger=None) -> list[tuple[Path, int]]:
+    """
+    Recursively find all media files in the DCIM directory, as (path, size) sorted by path.
+
+    Walks the tree with os.scandir, which reads each directory fresh from the
+    kernel and gets the file type from the directory entry itself. Only media
+    files are stat'ed, once, for their size. After remount, filesystems may have
+    stale directory entries; files that can't be stat'ed yet are retried once
+    after a short delay.
+    """
+    out: list[tuple[Path, int]] = []
+    all_files_count = 0
+
+    # Track files that fail initial check for retry
+    failed_files: list[str] = []
+
+    for entry in _scan_files(str(dcim_dir), logger):
+        try:
+            if not entry.is_file(follow_symlinks=False):
+                continue
+        except OSError as e:
+            if entry.name.startswith("._"):
+                continue
+            # File might not be accessible yet (filesystem still syncing after remount)
+            failed_files.append(entry.path)
             if logger:
-                logger.warning(f"find command failed with return code {result.returncode}: {result.stderr}")
-            # Fallback to os.walk if find fails
-            for root, dirs, files in os.walk(str(dcim_dir)):
-                root_path = Path(root)
-                for filename in files:
-                    all_files_count += 1
-                    # Skip macOS metadata files (resource forks) - they start with ._
-                    if filename.startswith("._"):
-                        continue
-                    file_path = root_path / filename
-                    try:
-                        if media.is_media(file_path):
-                            out.append(file_path)
-                    except (OSError, IOError):
-                        continue
-        else:
-            # Process find output
-            all_find_files = result.stdout.splitlines()
-            all_files_count = len([f for f in all_find_files if f.strip()])
+                logger.debug(f"File not accessible yet (will retry): {entry.name}: {e}")
+            continue
+        all_files_count += 1
+        # Skip macOS metadata files (resource forks) - they start with ._
+        if entry.name.startswith("._"):
+            continue
+        if not media.is_media(entry.name):
+            continue
+        try:
+            size = entry.stat(follow_symlinks=False).st_size
+        except OSError as e:
+            failed_files.append(entry.path)
             if logger:
-                logger.debug(f"find command found {all_files_count} total files in {dcim_dir}")
-            
-            # Track files that fail initial check for retry
-            failed_files: list[Path] = []
-            
-            for line in all_find_files:
-                if not line.strip():
-                    continue
-                file_path = Path(line.strip())
-                try:
-                    # Skip macOS metadata files (resource forks) - they start with ._
-                    if file_path.name.startswith("._"):
-                        continue
-                    
-                    # Use os.stat() directly instead of pathlib's is_file() to avoid caching issues
-                    # This is more reliable after remount when directory entries might be stale
-                    try:
-                        stat_result = os.stat(file_path)
-                        if not stat.S_ISREG(stat_result.st_mode):
-                            # Not a regular file, skip
-                            continue
-                    except (OSError, IOError) as e:
-                        # File might not be accessible yet (filesystem still syncing after remount)
-                        # Collect for retry
-                        failed_files.append(file_path)
-                        if logger:
-                            logger.debug(f"File not accessible yet (will retry): {file_path.name}: {e}")
-                        continue
-                    
-                    # Check if it's a media file
-                    try:
-                        if media.is_media(file_path):
-                            out.append(file_path)
-                    except (OSError, IOError) as e:
-                        if logger:
-                            logger.debug(f"Error checking if media file: {file_path.name}: {e}")
-                        continue
-                except (OSError, IOError) as e:
-                    # File became inaccessible, skip it
-                    if logger:
-                        logger.debug(f"File became inaccessible: {line.strip()}: {e}")
-                    continue
-            
-            # Retry failed files after a short delay (filesystem might still be syncing)
-            if failed_files and logger:
-                logger.debug(f"Retrying {len(failed_files)} files that weren't accessible initially...")
-            for file_path in failed_files:
-                try:
-                    # Retry with a small delay to allow filesystem to sync
-                    time.sleep(0.01)  # Small delay between retries
-                    stat_result = os.stat(file_path)
-                    if not stat.S_ISREG(stat_result.st_mode):
-                        continue
-                    if media.is_media(file_path):
-                        out.append(file_path)
-                        if logger:
-                            logger.debug(f"Successfully retried file: {file_path.name}")
-                except (OSError, IOError):
-                    # Still not accessible, skip it
-                    if logger:
-                        logger.debug(f"File still not accessible after retry: {file_path.name}")
-                    continue
-    except (OSError, IOError, subprocess.TimeoutExpired) as e:
-        if logger:
-            logger.warning(f"find command exception: {e}")
-        # Fallback to os.walk if find fails or times out
+                logger.debug(f"File not accessible yet (will retry): {entry.name}: {e}")
+            continue
+        out.append((Path(entry.path), size))
+
+    # Retry failed files after a short delay (filesystem might still be syncing)
+    if failed_files and logger:
+        logger.debug(f"Retrying {len(failed_files)} files that weren't accessible initially...")
+    for path_str in failed_files:
         try:
-            for root, dirs, files in os.walk(str(dcim_dir)):
-                root_path = Path(root)
-                for filename in files:
-                    all_files_count += 1
-                    # Skip macOS metadata files (resource forks) - they start with ._
-                    if filename.startswith("._"):
-                        continue
-                    file_path = root_path / filename
-                    try:
-                        if media.is_media(file_path):
-                            out.append(file_path)
-                    except (OSError, IOError):
-                        continue
-        except (OSError, IOError):
-            pass
-    
+            # Retry with a small delay to allow filesystem to sync
+            time.sleep(0.01)  # Small delay between retries
+            stat_result = os.stat(path_str, follow_symlinks=False)
+            if not stat.S_ISREG(stat_result.st_mode):
+                continue
+            if media.is_media(path_str):
+                out.append((Path(path_str), stat_result.st_size))
+                if logger:
+                    logger.debug(f"Successfully retried file: {os.path.basename(path_str)}")
+        except OSError:
+            # Still not accessible, skip it
+            if logger:
+                logger.debug(f"File still not accessible after retry: {os.path.basename(path_str)}")
+            continue
+
     if logger:
         logger.debug(f"Found {len(out)} media files out of {all_files_count} total files")
-    return sorted(out)
+    # Keep a deterministic path order (hash batches, logs, tests) but sort on one
+    # str per file rather than comparing Path objects
+    out.sort(key=lambda item: _path_sort_key(item[0]))
+    return out
 
 
 def _pair_prefer_jpeg(files: list[Path]) -> tuple[list[Path], list[Path]]:
@@ -413,18 +602,15 @@ def _pair_prefer_jpeg(files: list[Path]) -> tuple[list[Path], list[Path]]:
     Returns (jpeg_sources_for_derivatives, raw_sources_to_ingest_only).
     If RAW+JPEG exist for same stem in same folder, prefer JPEG for derivatives.
     """
-    by_key: dict[tuple[Path, str], list[Path]] = {}
-    for p in files:
-        by_key.setdefault((p.parent, p.stem.lower()), []).append(p)
-
+    # RAWs are never derivative sources, so "prefer the JPEG of a RAW+JPEG pair"
+    # reduces to classifying each file once; no (parent, stem) grouping needed.
     jpegs: list[Path] = []
     raws: list[Path] = []
-    for (_parent, _stem), group in by_key.items():
-        group_j = [p for p in group if media.is_jpeg(p)]
-        group_r = [p for p in group if media.is_raw(p)]
-        if group_j:
-            jpegs.extend(group_j)
-        raws.extend(group_r)
+    for p in files:
+        if media.is_jpeg(p):
+            jpegs.append(p)
+        elif media.is_raw(p):
+            raws.append(p)
     return sorted(set(jpegs)), sorted(set(raws))
 
 
@@ -433,7 +619,7 @@ def run_pipeline(
     cfg: Config,
     volume_path: Path,
     logger,
-    status: StatusWriter | None = None,
+    status: StatusWriter | AsyncStatusWriter | None = None,
     always_create_session: bool = False,
     session_id: str | None = None,
 ) -> tuple[SessionPaths | None, str | None]:
@@ -481,18 +667,38 @@ def run_pipeline(
             )
         )
 
+    # Upload records and new file hashes waiting for _flush_upload_marks, which the
+    # finally below also runs so a failed run keeps what it did upload.
+    upload_marks_lock = threading.Lock()
+    pending_uploads: dict[str, tuple[str, int]] = {}  # s3_key -> (sha, size)
+    pending_hashes: list[tuple[os.stat_result, str]] = []
+
+    def _flush_upload_marks() -> None:
+        with upload_marks_lock:
+            uploads = [(key, sha, size) for key, (sha, size) in pending_uploads.items()]
+            hashes = list(pending_hashes)
+            pending_uploads.clear()
+            pending_hashes.clear()
+        if not uploads and not hashes:
+            return
+
+        def write(conn2: sqlite3.Connection) -> None:
+            with conn2:
+                _db_store_sha_batch(conn2, items=hashes)
+                _db_mark_uploaded_batch(conn2, items=uploads)
+
+        try:
+            _db_run(cfg.db_path, write)
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to record {len(uploads)} uploads in the database: {e}")
+
+    staging_root: Path | None = None
     conn = connect(cfg.db_path)
     try:
         # Reconnect to the mount by accessing it (wakes up automount if needed)
         # This is important because we may have unmounted the volume earlier
         try:
             logger.debug(f"Reconnecting to mount point: {volume_path}")
-            # Sync filesystem to ensure we see all files (flush kernel buffers)
-            try:
-                subprocess.run(["sync", str(volume_path)], timeout=5, check=False)
-            except (subprocess.TimeoutExpired, FileNotFoundError):
-                # sync command not available or timed out, continue anyway
-                pass
             # Access the volume root to trigger automount refresh
             _ = volume_path.stat()
             # Access the DCIM directory to ensure it's accessible
@@ -523,7 +729,9 @@ def run_pipeline(
                 ) from e
         
         logger.debug(f"Scanning DCIM directory: {dcim_dir}")
-        all_media = _iter_media_files(dcim_dir, logger=logger)
+        # Sizes come from the scan itself, so no second stat per file
+        files_with_sizes = _iter_media_files(dcim_dir, logger=logger)
+        all_media = [p for p, _ in files_with_sizes]
         logger.info(f"Discovered {len(all_media)} media files in {dcim_dir}")
         if len(all_media) == 0:
             logger.warning(f"No media files found in {dcim_dir} - is the directory accessible?")
@@ -534,21 +742,13 @@ def run_pipeline(
         jpeg_sources, raw_sources = _pair_prefer_jpeg(all_media)
         logger.info(f"File breakdown: {len(jpeg_sources)} JPEG candidates, {len(raw_sources)} RAW files")
 
-        # Get file sizes and check database first to avoid unnecessary hashing
-        files_with_sizes: list[tuple[Path, int]] = []
-        for p in all_media:
-            try:
-                size = p.stat().st_size
-                files_with_sizes.append((p, size))
-            except OSError:
-                # File might have been deleted, skip it
-                logger.debug(f"  Skipped (cannot stat): {p.name}")
-                continue
-        
         # Pre-filter: check database for files we already know about (by size)
         # Also check for files that have consistently failed to hash (skip them)
-        known_sizes = _db_get_known_sizes(conn)
-        failed_files = _db_get_failed_files(conn, dcim_dir=dcim_dir)
+        known_sizes = _db_get_known_sizes(conn, (size for _, size in files_with_sizes))
+        # With an empty DB every file goes through the full check (including
+        # crash recovery against local originals), as before
+        has_ingested = conn.execute("SELECT 1 FROM ingested_files LIMIT 1").fetchone() is not None
+        failed_files = _db_get_failed_files(conn, dcim_dir=dcim_dir, paths=all_media)
         
         # Filter out files that have consistently failed to hash
         # Also optimize: if a file size is NOT in the database, we know it's definitely new
@@ -557,26 +757,32 @@ def run_pipeline(
         files_known_new: list[tuple[Path, int]] = []  # Files with sizes not in DB (definitely new)
         failed_count = 0
         size_filtered_count = 0
-        for p, size in files_with_sizes:
-            if p in failed_files:
+        # Per-file debug lines are formatted only when they'll be emitted; on a
+        # large card the f-strings cost more than the filtering itself.
+        debug = logger.isEnabledFor(logging.DEBUG)
+        for item in files_with_sizes:
+            p, size = item
+            if failed_files and p in failed_files:
                 failed_count += 1
-                logger.debug(f"  Skipping file that consistently fails to hash: {p.name}")
+                if debug:
+                    logger.debug(f"  Skipping file that consistently fails to hash: {p.name}")
                 continue
             # If size is not in known_sizes, the file is definitely new (no need to check for duplicates)
             # But we still need to hash it to store the hash in the DB
-            if known_sizes and size not in known_sizes:
-                files_known_new.append((p, size))
+            if has_ingested and size not in known_sizes:
+                files_known_new.append(item)
                 size_filtered_count += 1
-                logger.debug(f"  File size not in DB (definitely new, skipping duplicate check): {p.name} ({size:,} bytes)")
+                if debug:
+                    logger.debug(f"  File size not in DB (definitely new, skipping duplicate check): {p.name} ({size:,} bytes)")
             else:
                 # Size might match a known file - need to hash to check for duplicates
-                files_to_check.append((p, size))
+                files_to_check.append(item)
         
         if failed_count > 0:
             logger.info(f"Skipping {failed_count} files that consistently fail to hash (marked in database)")
         
-        if known_sizes:
-            logger.debug(f"Database contains {len(known_sizes)} unique file sizes")
+        if has_ingested:
+            logger.debug(f"{len(known_sizes)} distinct file sizes on the card are already in the database")
             if size_filtered_count > 0:
                 logger.info(f"Pre-filtered {size_filtered_count} files as definitely new (size not in DB) - will hash but skip duplicate check")
         
@@ -590,27 +796,43 @@ def run_pipeline(
         existing_originals: dict[Path, Path] = {}  # Maps SD card path -> local originals path
         try:
             session_dirs = sorted(cfg.sessions_dir.glob("shoot-*"), key=lambda p: p.stat().st_mtime, reverse=True)
-            for recent_session_dir in session_dirs[:5]:  # Check last 5 sessions
-                recent_originals = recent_session_dir / "originals" / "DCIM"
-                if recent_originals.exists():
-                    logger.debug(f"Checking {recent_session_dir.name} for already-copied files...")
-                    try:
-                        for orig_file in recent_originals.rglob("*"):
-                            if orig_file.is_file():
-                                # Reconstruct the SD card path from the originals path
-                                rel_path = orig_file.relative_to(recent_originals)
-                                sd_card_path = dcim_dir / rel_path
-                                if sd_card_path.exists() and sd_card_path not in existing_originals:
-                                    existing_originals[sd_card_path] = orig_file
-                    except Exception as e:
-                        logger.debug(f"Error checking {recent_session_dir.name}: {e}")
-                        continue
+            recent = session_dirs[:5]  # Check last 5 sessions
+            if recent:
+                card_files = set(all_media)
+                # Walk the sessions in parallel (the sessions dir may be on slow
+                # storage); newer sessions still take precedence when merging.
+                with ThreadPoolExecutor(max_workers=len(recent)) as ex:
+                    scans = list(
+                        ex.map(
+                            lambda d: _scan_session_originals(d, dcim_dir=dcim_dir, card_files=card_files, logger=logger),
+                            recent,
+                        )
+                    )
+                for found in scans:
+                    for sd_card_path, orig_file in found.items():
+                        existing_originals.setdefault(sd_card_path, orig_file)
             if existing_originals:
                 logger.info(f"Found {len(existing_originals)} files already copied in recent sessions - will hash from local copies (faster)")
         except Exception as e:
             logger.debug(f"Error checking for existing originals: {e}")
         
+        hash_algo = cfg.hash_algo
+        if hash_algo == "blake3" and not blake3_available():
+            logger.warning("GHOSTROLL_HASH_ALGO=blake3 but the blake3 package is not installed; hashing with sha256")
+            hash_algo = "sha256"
         logger.info(f"Hashing {len(all_files_to_hash)} files ({len(files_to_check)} need duplicate check, {len(files_known_new)} known new)...")
+
+        # Known-new files will be copied anyway, so they are hashed while being copied
+        # into a staging dir beside the sessions: one read from the card instead of
+        # two. They move into the session's originals/ once it exists. The dir is
+        # private to this run (a watch ingest and a manual run can overlap) and is
+        # removed in the finally below whatever happens.
+        cfg.sessions_dir.mkdir(parents=True, exist_ok=True)
+        _remove_stale_staging(cfg.sessions_dir)
+        staging_root = Path(tempfile.mkdtemp(dir=cfg.sessions_dir, prefix=".incoming-"))
+        staging_dcim = staging_root / "DCIM"
+        known_new_set = set(files_known_new)
+        staged: set[Path] = set()
         
         # Hash all files to check for duplicates (parallelized)
         # Always hash from SD card to ensure we detect new/changed files correctly
@@ -622,7 +844,22 @@ def run_pipeline(
             # Note: We could optimize by checking if local copy SHA matches SD card,
             # but for correctness, we always hash from SD card to detect changes
             try:
-                sha, _ = sha256_file(p)
+                if item in known_new_set:
+                    staged_copy = staging_dcim / _safe_rel_under(dcim_dir, p)
+                    try:
+                        staged_copy.parent.mkdir(parents=True, exist_ok=True)
+                        sha, _ = hash_and_copy_file(p, staged_copy, algo=hash_algo)
+                        shutil.copystat(p, staged_copy)
+                    except OSError:
+                        # Could be the staging disk rather than the card: hash on its
+                        # own, and let the copy stage copy it as usual
+                        staged_copy.unlink(missing_ok=True)
+                        sha, _ = content_hash_file(p, algo=hash_algo)
+                    else:
+                        _store_sha_xattr(staged_copy, sha256=sha, size_bytes=size)
+                        staged.add(p)
+                else:
+                    sha, _ = content_hash_file(p, algo=hash_algo)
                 return (p, sha, size)
             except (OSError, IOError) as e:
                 # File/volume became inaccessible (e.g., SD card removed or corrupted file)
@@ -640,19 +877,40 @@ def run_pipeline(
         
         # Track which files need duplicate checking
         files_to_check_set = {(p, size) for p, size in files_to_check}
+        # Order in which hashing finished, for ordering the copy stage
+        hash_order: dict[Path, int] = {}
         
+        def _hash_batch(batch: list[tuple[Path, int]]) -> list[tuple[tuple[Path, int], tuple[Path, str, int] | None]]:
+            return [(item, _hash_one(item)) for item in batch]
+
+        # Submit files in small batches of neighbouring DCIM entries rather than one
+        # future per file: a card holds thousands of files, and each worker then
+        # reads a run of files back to back. Batches stay small enough that every
+        # worker still gets several of them.
+        batch_size = max(1, min(8, len(all_files_to_hash) // (hash_workers * 4)))
+        batches = [all_files_to_hash[j : j + batch_size] for j in range(0, len(all_files_to_hash), batch_size)]
+
+        i = 0
         with ThreadPoolExecutor(max_workers=hash_workers) as ex:
-            futures = {ex.submit(_hash_one, item): item for item in all_files_to_hash}
-            for i, fut in enumerate(as_completed(futures), 1):
+            futures = {ex.submit(_hash_batch, batch): batch for batch in batches}
+            for fut in as_completed(futures):
                 try:
-                    result = fut.result()
+                    batch_results = fut.result()
+                except Exception as e:
+                    # Handle any unexpected errors from the future
+                    for item in futures[fut]:
+                        logger.debug(f"  Skipped (error hashing): {item[0].name}: {e}")
+                        failed_files.append((item[0], item[1]))
+                    i += len(futures[fut])
+                    continue
+                for item, result in batch_results:
+                    i += 1
                     if result is None:
                         # File became inaccessible - collect for marking as failed
-                        item = futures[fut]
                         failed_files.append((item[0], item[1]))
                         continue
                     p, sha, size = result
-                    item = futures[fut]
+                    hash_order[p] = i
                     # Separate files that need duplicate checking from known-new files
                     if (p, size) in files_to_check_set:
                         logger.debug(f"Hashing [{i}/{len(all_files_to_hash)}]: {p.name} (checking for duplicates)")
@@ -660,20 +918,6 @@ def run_pipeline(
                     else:
                         logger.debug(f"Hashing [{i}/{len(all_files_to_hash)}]: {p.name} (known new, no duplicate check needed)")
                         hashed_known_new.append((p, sha, size))
-                except Exception as e:
-                    # Handle any unexpected errors from the future
-                    item = futures[fut]
-                    logger.debug(f"  Skipped (error hashing): {item[0].name}: {e}")
-                    failed_files.append((item[0], item[1]))
-                    continue
-        
-        # Mark failed files in database (in main thread, not in worker threads)
-        # SQLite connections are not thread-safe and must be used in the thread where created
-        if failed_files:
-            for p, size in failed_files:
-                _db_mark_failed_file(conn, file_path=p, size_bytes=size, dcim_dir=dcim_dir)
-            conn.commit()
-            logger.info(f"Marked {len(failed_files)} files as failed in DB (will skip in future runs)")
         
         # Batch check database for duplicates (only for files that might be duplicates)
         # Files in hashed_known_new are already known to be new (by size), so skip duplicate check
@@ -681,18 +925,32 @@ def run_pipeline(
         existing_shas: set[str] = set()
         if all_shas:
             logger.debug(f"Checking database for {len(all_shas)} hashes (files that might be duplicates)...")
-            placeholders = ",".join("?" * len(all_shas))
-            existing_rows = conn.execute(
-                f"SELECT sha256 FROM ingested_files WHERE sha256 IN ({placeholders})",
-                tuple(all_shas)
-            ).fetchall()
-            existing_shas = {row["sha256"] for row in existing_rows}
+            existing_shas = _db_get_existing_shas(conn, all_shas)
             if existing_shas:
                 logger.info(f"Found {len(existing_shas)} files already in database (will skip)")
             else:
                 logger.debug(f"No files found in database (all {len(all_shas)} checked files are new)")
         else:
             logger.debug("No files to check for duplicates (all files were pre-filtered as new)")
+
+        # Rows ingested before switching to BLAKE3 are keyed by SHA-256. Unmatched
+        # files whose size matches such a row also get a SHA-256 so they are still
+        # recognized; the BLAKE3 digest is then recorded too, so the next run
+        # matches directly.
+        legacy_aliases: list[tuple[str, int, str]] = []
+        if hash_algo == "blake3" and all_shas:
+            unmatched = [item for item in hashed_files if item[1] not in existing_shas]
+            legacy_sizes = _db_get_legacy_sizes(conn, (size for _, _, size in unmatched))
+            candidates = [item for item in unmatched if item[2] in legacy_sizes]
+            if candidates:
+                legacy = sha256_many([p for p, _, _ in candidates], workers=hash_workers)
+                legacy_found = _db_get_existing_shas(conn, {res[0] for res in legacy if res is not None})
+                for (p, sha, size), res in zip(candidates, legacy):
+                    if res is not None and res[0] in legacy_found:
+                        existing_shas.add(sha)
+                        legacy_aliases.append((sha, size, str(p)))
+                if legacy_aliases:
+                    logger.info(f"Found {len(legacy_aliases)} files already in database under their SHA-256 (will skip)")
         
         # Collect new files: all files that aren't duplicates
         # Start with known-new files (already determined to be new by size check)
@@ -703,6 +961,32 @@ def run_pipeline(
         # Also handle crash recovery: if files were already copied to originals but not yet in DB,
         # mark them in DB immediately to prevent re-hashing on next run
         crash_recovery_items: list[tuple[str, int, str]] = []
+
+        # Local copies with a matching size need their SHA verified. Copies carry the
+        # SHA recorded when they were written; the rest are hashed up front in
+        # parallel instead of one by one inside the loop below.
+        local_sizes: dict[Path, int] = {}
+        local_shas: dict[Path, str] = {}
+        to_verify: list[Path] = []
+        for p, sha, size in hashed_files:
+            local_copy = existing_originals.get(p)
+            if sha in existing_shas or local_copy is None:
+                continue
+            try:
+                local_st = local_copy.stat()
+            except OSError:
+                continue
+            local_sizes[local_copy] = local_st.st_size
+            if local_st.st_size == size:
+                recorded = _read_sha_xattr(local_copy, st=local_st)
+                if recorded is not None and hash_algo_of(recorded) == hash_algo:
+                    local_shas[local_copy] = recorded
+                else:
+                    to_verify.append(local_copy)
+        for local_copy, res in zip(to_verify, content_hash_many(to_verify, algo=hash_algo, workers=cfg.hash_workers, use_mmap=True)):
+            if res is not None:
+                local_shas[local_copy] = res[0]
+
         for p, sha, size in hashed_files:
             if sha in existing_shas:
                 skipped += 1
@@ -712,43 +996,43 @@ def run_pipeline(
             # Check if file was already copied to originals but not in DB (crash recovery scenario)
             # Smart optimization: if file exists in originals, check DB first before re-hashing
             # This avoids unnecessary re-hashing when we can determine status from DB
-            if p in existing_originals:
-                local_copy = existing_originals[p]
-                # Optimization: Check if we can determine status without re-hashing
-                # If SHA is already in DB, we know the file was processed - no need to re-hash local copy
-                # (Note: we already checked sha in existing_shas above, so if we reach here, sha is NOT in DB)
-                # However, we still need to verify the local copy matches the SD card SHA
-                # But we can optimize: if the local file size matches, we can be more confident
-                # For now, we still hash to verify, but we could add size check first as future optimization
-                try:
-                    # Check local file size first (fast check)
-                    local_size = local_copy.stat().st_size
-                    if local_size != size:
-                        # Size mismatch - treat as new file, skip re-hash
-                        logger.debug(f"  File in originals but size differs ({local_size} vs {size}) - treating SD card file as new: {p.name}")
-                    else:
-                        # Size matches - verify SHA (this is the expensive operation we're optimizing)
-                        local_sha, _ = sha256_file(local_copy)
-                        if local_sha == sha:
-                            # Local copy matches SD card - this is crash recovery
-                            logger.info(f"  File already copied but not in DB - marking as ingested (crash recovery): {p.name}")
-                            crash_recovery_items.append((sha, size, str(p)))
-                            # Still add to new_files so it gets processed/uploaded
-                            # (the file exists in originals but may not be processed/uploaded yet)
-                        else:
-                            # Local copy differs from SD card - SD card file is new/changed
-                            logger.debug(f"  File in originals but SHA differs - treating SD card file as new: {p.name}")
-                except (OSError, IOError):
+            local_copy = existing_originals.get(p)
+            if local_copy is not None:
+                # SHA is not in DB (checked above), so verify the local copy matches the SD card.
+                # Size and SHA of the local copy were gathered in the parallel pass above.
+                local_size = local_sizes.get(local_copy)
+                local_sha = local_shas.get(local_copy)
+                if local_size is None or (local_size == size and local_sha is None):
                     # Can't access local copy - treat SD card file as new
                     logger.debug(f"  Cannot access local copy - treating SD card file as new: {p.name}")
+                elif local_size != size:
+                    # Size mismatch - treat as new file, skip re-hash
+                    logger.debug(f"  File in originals but size differs ({local_size} vs {size}) - treating SD card file as new: {p.name}")
+                elif local_sha == sha:
+                    # Local copy matches SD card - this is crash recovery
+                    logger.info(f"  File already copied but not in DB - marking as ingested (crash recovery): {p.name}")
+                    crash_recovery_items.append((sha, size, str(p)))
+                    # Still add to new_files so it gets processed/uploaded
+                    # (the file exists in originals but may not be processed/uploaded yet)
+                else:
+                    # Local copy differs from SD card - SD card file is new/changed
+                    logger.debug(f"  File in originals but SHA differs - treating SD card file as new: {p.name}")
             
             new_files.append((p, sha, size))
             logger.info(f"  New file (not in DB): {p.name} ({size:,} bytes, SHA256: {sha[:16]}...)")
         
-        # Batch commit crash recovery marks
+        # Record hash failures and crash recovery marks in one transaction (one WAL
+        # sync). This runs in the main thread: SQLite connections are not thread-safe
+        # and must be used in the thread where created.
+        if failed_files or crash_recovery_items or legacy_aliases:
+            now = _utc_now()
+            with conn:
+                for p, size in failed_files:
+                    _db_mark_failed_file(conn, file_path=p, size_bytes=size, dcim_dir=dcim_dir, now=now)
+                _db_mark_ingested_batch(conn, items=crash_recovery_items + legacy_aliases)
+        if failed_files:
+            logger.info(f"Marked {len(failed_files)} files as failed in DB (will skip in future runs)")
         if crash_recovery_items:
-            _db_mark_ingested_batch(conn, items=crash_recovery_items)
-            conn.commit()
             logger.info(f"Marked {len(crash_recovery_items)} files as ingested in DB (crash recovery - prevents re-hashing on next run)")
 
         logger.info(f"Duplicate check complete: {len(new_files)} new files, {skipped} skipped (already in DB)")
@@ -800,6 +1084,9 @@ def run_pipeline(
         session_dir.mkdir(parents=True, exist_ok=True)
         attach_session_logfile(logger, session_dir)
         originals_dir.mkdir(parents=True, exist_ok=True)
+        adopted = _adopt_staged(
+            staged, staging_dcim=staging_dcim, originals_dcim=originals_dir / "DCIM", dcim_dir=dcim_dir
+        )
         derived_share_dir.mkdir(parents=True, exist_ok=True)
         derived_thumbs_dir.mkdir(parents=True, exist_ok=True)
         
@@ -810,7 +1097,8 @@ def run_pipeline(
         
         # Set up bulletproof log uploader (uploads periodically and on crash/exit)
         log_file = session_dir / "ghostroll.log"
-        log_key = f"{prefix}/logs/ghostroll.log"
+        # Stored gzip-compressed (the uploader compresses keys ending in .gz)
+        log_key = f"{prefix}/logs/ghostroll.log.gz"
         log_uploader: LogUploader | None = None
         if log_file.exists():
             try:
@@ -830,26 +1118,43 @@ def run_pipeline(
         upload_failures: list[str] = []
         url: str | None = None
 
+        # What's already in S3 for this session, and the hashes of local files on
+        # the sessions filesystem, loaded once. Uploads are checked against these and
+        # recorded here, then written to the DB in batches by _flush_upload_marks
+        # rather than with a commit per object; anything not yet flushed when a run
+        # dies is simply uploaded again next time.
+        uploaded_shas = _db_get_uploaded(conn, prefix=prefix)
+        local_hashes = _db_get_file_hashes(conn, dev=session_dir.stat().st_dev)
+        # file_hashes keys this run looked up or added (pruned once the run completes)
+        run_hash_keys: set[tuple[int, int]] = set()
+
         def _upload_one(task: tuple[Path, str]) -> tuple[bool, str | None]:
             local, key = task
-            file_size = local.stat().st_size if local.exists() else 0
-            logger.debug(f"Uploading: {local.name} -> s3://{cfg.s3_bucket}/{key} ({file_size:,} bytes)")
-
-            def do(conn2: sqlite3.Connection):
-                sha, size = sha256_file(local)
-                prev_sha = _db_uploaded_sha(conn2, s3_key=key)
-                if prev_sha == sha:
-                    logger.debug(f"  Skipped (already uploaded): {local.name}")
-                    return ("skipped", None)
+
+            def do():
+                new_hashes: list[tuple[os.stat_result, str]] = []
+                # Hashing stats the file anyway; its size is reused for the log and the PUT
+                # (single dict get/set per call, so the workers can share local_hashes)
+                sha, size = _sha256_local_cached(local_hashes, local, pending=new_hashes, seen=run_hash_keys)
+                logger.debug(f"Uploading: {local.name} -> s3://{cfg.s3_bucket}/{key} ({size:,} bytes)")
+                with upload_marks_lock:
+                    pending_hashes.extend(new_hashes)
+                    if uploaded_shas.get(key) == sha:
+                        logger.debug(f"  Skipped (already uploaded): {local.name}")
+                        return ("skipped", None)
                 logger.debug(f"  Uploading {local.name} to s3://{cfg.s3_bucket}/{key}...")
-                s3_upload_file(local, bucket=cfg.s3_bucket, key=key, retries=3)
-                _db_mark_uploaded(conn2, s3_key=key, local_sha256=sha, size_bytes=size)
-                conn2.commit()
+                s3_upload_file(local, bucket=cfg.s3_bucket, key=key, retries=3, size_bytes=size)
+                with upload_marks_lock:
+                    uploaded_shas[key] = sha
+                    pending_uploads[key] = (sha, size)
+                    flush = len(pending_uploads) >= _UPLOAD_MARK_BATCH
+                if flush:
+                    _flush_upload_marks()
                 logger.debug(f"  Uploaded: {local.name}")
                 return ("uploaded", None)
 
             try:
-                outcome, _ = _db_with_retry(cfg.db_path, do)
+                outcome, _ = do()
                 return (outcome == "uploaded", None)
             except AwsBoto3Error as e:
                 # AwsBoto3Error already includes actionable guidance
@@ -867,47 +1172,59 @@ def run_pipeline(
 
         logger.info(f"Publishing initial gallery link (loading page)...")
         s3_status_local = session_dir / "status.s3.json"
-        s3_status_local.write_text(
-            json.dumps(
+        s3_status_local.write_bytes(
+            dumps_json_bytes(
                 {
                     "uploading": True,
                     "message": "Upload in progress…",
                     "session_id": session_id,
                 }
             )
-            + "\n",
-            encoding="utf-8",
+            + b"\n"
         )
+        # status.json and the loading page are independent PUTs; send status.json
+        # on its own thread while the page is built and uploaded here.
         logger.debug(f"Uploading status.json: {status_key}")
-        uploaded, err = _upload_one((s3_status_local, status_key))
-        if uploaded:
-            uploaded_ok += 1
-            logger.debug(f"Status.json uploaded successfully")
-        if err:
-            upload_failures.append(err)
-
-        logger.debug(f"Generating presigned URL for status.json...")
-        status_url = s3_presign_url(
-            bucket=cfg.s3_bucket,
-            key=status_key,
-            expires_in_seconds=cfg.presign_expiry_seconds,
+        status_put: list[tuple[bool, str | None]] = []
+        status_put_thread = threading.Thread(
+            target=lambda: status_put.append(_upload_one((s3_status_local, status_key))),
+            name="ghostroll-status-put",
         )
-        logger.debug(f"Status URL: {status_url[:80]}...")
+        status_put_thread.start()
 
-        index_loading = session_dir / "index.loading.s3.html"
-        logger.debug(f"Building loading page HTML...")
-        build_index_html_loading(
-            session_id=session_id,
-            status_json_url=status_url,
-            poll_seconds=cfg.poll_seconds,
-            out_path=index_loading,
-        )
-        logger.debug(f"Uploading loading page: {s3_index_key}")
-        uploaded, err = _upload_one((index_loading, s3_index_key))
-        if uploaded:
-            uploaded_ok += 1
-        if err:
-            upload_failures.append(err)
+        try:
+            logger.debug(f"Generating presigned URL for status.json...")
+            status_url = s3_presign_url(
+                bucket=cfg.s3_bucket,
+                key=status_key,
+                expires_in_seconds=cfg.presign_expiry_seconds,
+            )
+            logger.debug(f"Status URL: {status_url[:80]}...")
+
+            index_loading = session_dir / "index.loading.s3.html"
+            logger.debug(f"Building loading page HTML...")
+            build_index_html_loading(
+                session_id=session_id,
+                status_json_url=status_url,
+                poll_seconds=cfg.poll_seconds,
+                out_path=index_loading,
+            )
+            logger.debug(f"Uploading loading page: {s3_index_key}")
+            uploaded, err = _upload_one((index_loading, s3_index_key))
+            if uploaded:
+                uploaded_ok += 1
+            if err:
+                upload_failures.append(err)
+        finally:
+            # Joined even if the loading page step raised, so a status.json
+            # failure is still recorded (_upload_one returns errors, never raises)
+            status_put_thread.join()
+            uploaded, err = status_put[0]
+            if uploaded:
+                uploaded_ok += 1
+                logger.debug(f"Status.json uploaded successfully")
+            if err:
+                upload_failures.append(err)
 
         if upload_failures:
             logger.error("Upload failures:\n" + "\n".join(upload_failures))
@@ -957,6 +1274,9 @@ def run_pipeline(
                 qr_png = None
         except QrError as e:
             logger.warning(str(e))
+            qr_png = None
+        # The QR file doesn't change after this point, so resolve the status path once
+        qr_path_str: str | None = str(qr_png) if qr_png is not None else None
 
         # Update status immediately with URL and QR path so QR code is available in status system right away.
         # This ensures the QR code shows up on the e-ink display as soon as it's generated.
@@ -970,7 +1290,7 @@ def run_pipeline(
                     volume=str(volume_path),
                     counts={"discovered": len(all_media), "new": len(new_files), "skipped": skipped},
                     url=url,
-                    qr_path=str(qr_png) if qr_png and qr_png.exists() and qr_png.stat().st_size > 0 else None,
+                    qr_path=qr_path_str,
                 )
             )
 
@@ -985,11 +1305,11 @@ def run_pipeline(
                     volume=str(volume_path),
                     counts={"discovered": len(all_media), "new": len(new_files), "skipped": skipped},
                     url=url,  # Include URL so QR code remains visible
-                    qr_path=str(qr_png) if qr_png and qr_png.exists() and qr_png.stat().st_size > 0 else None,  # Include QR path so QR code remains visible
+                    qr_path=qr_path_str,  # Include QR path so QR code remains visible
                 )
             )
         copied = 0
-        total_size = sum(size for (_, _, size) in new_files)
+        total_size = sum(map(itemgetter(2), new_files))
         copied_size = 0
         logger.info(f"Copying {len(new_files)} files ({total_size:,} bytes total) to {originals_dir}...")
         
@@ -999,9 +1319,13 @@ def run_pipeline(
             rel = _safe_rel_under(dcim_dir, src)
             dst = originals_dir / "DCIM" / rel
             
+            if src in adopted:
+                # Copied while hashing
+                return (True, size, src, sha)
             try:
-                # Hash is already computed (size-based pre-filtering disabled)
                 copied_file = _copy2_ignore_existing(src, dst)
+                if copied_file:
+                    _store_sha_xattr(dst, sha256=sha, size_bytes=size)
                 return (copied_file, size if copied_file else 0, src, sha)
             except (OSError, IOError) as e:
                 error_code = getattr(e, 'errno', None)
@@ -1032,9 +1356,15 @@ def run_pipeline(
         copy_workers = min(cfg.copy_workers, max(1, len(new_files) // 3))
         db_inserts: list[tuple[str, int, str]] = []  # (sha, size, source_hint)
         
+        # Copy the most recently hashed files first: their pages are the ones still
+        # in the page cache, so they copy without a second read from the card.
+        # (Copying in hash order would evict each file just before it's needed
+        # once the card holds more than fits in RAM.)
+        copy_order = sorted(new_files, key=lambda item: hash_order.get(item[0], 0), reverse=True)
+
         try:
             with ThreadPoolExecutor(max_workers=copy_workers) as ex:
-                futures = {ex.submit(_copy_one, item): item for item in new_files}
+                futures = {ex.submit(_copy_one, item): item for item in copy_order}
                 for i, fut in enumerate(as_completed(futures), 1):
                     try:
                         item = futures[fut]
@@ -1061,9 +1391,8 @@ def run_pipeline(
             # Device removal - commit what we have so far and re-raise
             if db_inserts:
                 logger.warning(f"Device removed during copy - marking {len(db_inserts)} already-copied files in DB...")
-                for sha, size, source_hint in db_inserts:
-                    _db_mark_ingested(conn, sha256=sha, size_bytes=size, source_hint=source_hint)
-                conn.commit()
+                with conn:
+                    _db_mark_ingested_batch(conn, items=db_inserts)
             raise
         
         # All files are already hashed (no deferred hashing)
@@ -1087,75 +1416,70 @@ def run_pipeline(
                     volume=str(volume_path),
                     counts={"new": len(new_files_with_hashes), "skipped": skipped, "processed_done": 0, "processed_total": 0},
                     url=url,  # Include URL so QR code remains visible
-                    qr_path=str(qr_png) if qr_png and qr_png.exists() and qr_png.stat().st_size > 0 else None,  # Include QR path so QR code remains visible
+                    qr_path=qr_path_str,  # Include QR path so QR code remains visible
                 )
             )
-        new_sha_set = {sha for (_p, sha, _s) in new_files_with_hashes}
-
-        # Map from DCIM source path to sha for quick membership
-        src_sha: dict[Path, str] = {p: sha for (p, sha, _s) in new_files_with_hashes}
+        # Derivative sources ingested this run. Walk the new files (few, on an
+        # incremental ingest) rather than every JPEG on the card, keeping card order.
+        jpeg_source_set = set(jpeg_sources)
+        new_jpeg_sources = sorted(
+            (p for (p, _sha, _s) in new_files_with_hashes if p in jpeg_source_set), key=_path_sort_key
+        )
 
         # Derived outputs mirror DCIM relpath and normalize to .jpg
         processed = 0
         proc_tasks: list[tuple[Path, Path, Path, Path]] = []
-        for src in jpeg_sources:
-            sha = src_sha.get(src)
-            if sha is None or sha not in new_sha_set:
-                continue
+        for src in new_jpeg_sources:
             rel = _safe_rel_under(dcim_dir, src).with_suffix(".jpg")
             proc_tasks.append((src, rel, derived_share_dir / rel, derived_thumbs_dir / rel))
 
         # PARALLEL PROCESSING + UPLOADING: Process and upload images in parallel
         # Upload workers start uploading as soon as images are processed (upload-as-ready)
         
-        # Prepare upload queue and tracking
-        upload_queue: queue.Queue[tuple[Path, str] | None] = queue.Queue()  # None signals end of uploads
+        # Upload tracking (updated only from this thread, as upload futures are collected)
         uploaded_keys: set[str] = set()
-        uploaded_keys_lock = threading.Lock()
-        processed_count = 0
-        processed_count_lock = threading.Lock()
-        uploaded_count_lock = threading.Lock()  # Separate lock for uploaded_ok counter
         
         # Map gallery items to their S3 keys for progressive updates (built as we process)
         gallery_to_s3_keys: dict[tuple[str, str, str, str, float], tuple[str, str]] = {}
         
+        # Asset URLs signed once per run. Uploaded derivatives are signed as their
+        # uploads are collected, so the signing overlaps the rest of the uploads and
+        # the partial and final galleries only look the URLs up.
+        presigned_urls: dict[str, str] = {}
+
+        def _presign(key: str) -> str:
+            url = presigned_urls.get(key)
+            if url is None:
+                url = s3_presign_url(bucket=cfg.s3_bucket, key=key, expires_in_seconds=cfg.presign_expiry_seconds)
+                presigned_urls[key] = url
+            return url
+
+        def _presign_early(key: str) -> None:
+            try:
+                _presign(key)
+            except Exception as e:
+                # The gallery passes sign it again and report the failure there
+                logger.debug(f"Could not presign {key} yet: {e}")
+
         def _process_one(task: tuple[Path, Path, Path, Path]) -> tuple[str, float, str, str]:
             src, rel, share_out, thumb_out = task
             logger.debug(f"Processing image: {src.name}")
             
-            # Generate share and thumb in parallel for better performance
-            def gen_share():
-                if not share_out.exists():
-                    logger.debug(f"  Generating share image: {share_out.name} (max {cfg.share_max_long_edge}px, quality {cfg.share_quality})")
-                    render_jpeg_derivative(
-                        src,
-                        dst_path=share_out,
-                        max_long_edge=cfg.share_max_long_edge,
-                        quality=cfg.share_quality,
-                    )
-                else:
-                    logger.debug(f"  Share image exists, skipping: {share_out.name}")
-            
-            def gen_thumb():
-                if not thumb_out.exists():
-                    logger.debug(f"  Generating thumbnail: {thumb_out.name} (max {cfg.thumb_max_long_edge}px, quality {cfg.thumb_quality})")
-                    render_jpeg_derivative(
-                        src,
-                        dst_path=thumb_out,
-                        max_long_edge=cfg.thumb_max_long_edge,
-                        quality=cfg.thumb_quality,
-                    )
-                else:
-                    logger.debug(f"  Thumbnail exists, skipping: {thumb_out.name}")
-            
-            # Generate both in parallel (2 workers for share + thumb)
+            # Render whichever of share/thumb is missing from a single decode of src
+            targets: list[tuple[Path, int, int]] = []
+            if not share_out.exists():
+                logger.debug(f"  Generating share image: {share_out.name} (max {cfg.share_max_long_edge}px, quality {cfg.share_quality})")
+                targets.append((share_out, cfg.share_max_long_edge, cfg.share_quality))
+            else:
+                logger.debug(f"  Share image exists, skipping: {share_out.name}")
+            if not thumb_out.exists():
+                logger.debug(f"  Generating thumbnail: {thumb_out.name} (max {cfg.thumb_max_long_edge}px, quality {cfg.thumb_quality})")
+                targets.append((thumb_out, cfg.thumb_max_long_edge, cfg.thumb_quality))
+            else:
+                logger.debug(f"  Thumbnail exists, skipping: {thumb_out.name}")
+
             try:
-                with ThreadPoolExecutor(max_workers=2) as inner_ex:
-                    share_future = inner_ex.submit(gen_share)
-                    thumb_future = inner_ex.submit(gen_thumb)
-                    # Wait for both to complete
-                    share_future.result()
-                    thumb_future.result()
+                render_jpeg_derivatives(src, targets)
             except Exception as e:
                 # Log the specific error for debugging
                 logger.error(f"Failed to generate derivatives for {src.name}: {type(e).__name__}: {e}")
@@ -1174,28 +1498,12 @@ def run_pipeline(
             subtitle = " · ".join(parts)
             rel_posix = rel.as_posix()
             
-            # As soon as processing is complete, queue the upload tasks
-            thumb_rel = rel_posix
-            share_rel = rel_posix
-            thumb_path = derived_thumbs_dir / thumb_rel
-            share_path = derived_share_dir / share_rel
-            thumb_key = f"{prefix}/thumbs/{thumb_rel}"
-            share_key = f"{prefix}/share/{share_rel}"
-            
-            # Queue upload tasks immediately (upload workers are waiting)
-            # Only queue if files exist (double-check)
-            if thumb_path.exists() and share_path.exists():
-                upload_queue.put((thumb_path, thumb_key))
-                upload_queue.put((share_path, share_key))
-                logger.debug(f"  Processed and queued for upload: {src.name} -> {rel_posix}")
-            else:
-                raise ProcessingError(
-                    f"Processed files do not exist: thumb={thumb_path.exists()}, share={share_path.exists()}"
-                )
-            
+            logger.debug(f"  Processed: {src.name} -> {rel_posix}")
             return (rel_posix, sort_ts, title, subtitle)
 
         gallery_items_local: list[tuple[str, str, str, str, float]] = []
+        # share.zip build running alongside the last derivative uploads, if started
+        share_zip_fut: Future | None = None
         
         if proc_tasks:
             logger.info(f"Processing and uploading {len(proc_tasks)} new JPEGs in parallel ({cfg.process_workers} process workers, {cfg.upload_workers} upload workers)...")
@@ -1209,77 +1517,41 @@ def run_pipeline(
                         volume=str(volume_path),
                         counts={"new": len(new_files_with_hashes), "skipped": skipped, "processed_done": 0, "processed_total": len(proc_tasks), "uploaded_done": uploaded_ok},
                         url=url,
-                        qr_path=str(qr_png) if qr_png and qr_png.exists() and qr_png.stat().st_size > 0 else None,
+                        qr_path=qr_path_str,
                     )
                 )
             
-            # Start upload workers in parallel (they wait on the queue)
-            upload_workers_finished = threading.Event()
+            # Uploads go to their own pool as soon as each image is processed
+            # (upload-as-ready); results are collected on this thread.
+            upload_ex = ThreadPoolExecutor(max_workers=max(1, cfg.upload_workers))
+            upload_futs: dict[Future, tuple[Path, str]] = {}
             upload_errors: list[str] = []
-            
-            def upload_worker():
-                """Worker thread that consumes upload tasks from the queue."""
+            uploads_hung = False
+
+            def _upload_ready(task: tuple[Path, str]) -> tuple[bool, str | None]:
+                local_path, s3_key = task
+                upload_start = time.time()
+                uploaded, err = _upload_one(task)
+                if uploaded:
+                    logger.info(f"Uploaded: {local_path.name} -> {s3_key} ({time.time() - upload_start:.1f}s)")
+                return (uploaded, err)
+
+            def _collect_uploads(done) -> None:
                 nonlocal uploaded_ok
-                worker_id = threading.current_thread().name
-                logger.debug(f"Upload worker {worker_id} started")
-                try:
-                    while True:
-                        try:
-                            # Use timeout to detect if queue is stuck (no new tasks for 60s)
-                            task = upload_queue.get(timeout=60)
-                        except queue.Empty:
-                            logger.warning(f"Upload worker {worker_id} timed out waiting for task")
-                            # Continue waiting - will be stopped by sentinel
-                            continue
-                        
-                        if task is None:  # Sentinel: end of uploads
-                            upload_queue.task_done()
-                            logger.debug(f"Upload worker {worker_id} received stop signal")
-                            break
-                        
-                        local_path, s3_key = task
-                        upload_start = time.time()
-                        logger.debug(f"Upload worker {worker_id} starting upload: {local_path.name} -> {s3_key}")
-                        try:
-                            # Verify file exists before attempting upload
-                            if not local_path.exists():
-                                error_msg = f"File does not exist: {local_path}"
-                                upload_errors.append(error_msg)
-                                logger.error(f"Upload skipped (file missing): {local_path.name} -> {s3_key}")
-                                upload_queue.task_done()
-                                continue
-                            
-                            uploaded, err = _upload_one((local_path, s3_key))
-                            upload_elapsed = time.time() - upload_start
-                            if uploaded:
-                                with uploaded_keys_lock:
-                                    uploaded_keys.add(s3_key)
-                                with uploaded_count_lock:
-                                    uploaded_ok += 1
-                                logger.info(f"Uploaded: {local_path.name} -> {s3_key} ({upload_elapsed:.1f}s)")
-                            if err:
-                                upload_errors.append(err)
-                                logger.error(f"Upload failed: {local_path.name} -> {s3_key}: {err}")
-                        except Exception as e:
-                            error_msg = f"{local_path.name} -> {s3_key}: {type(e).__name__}: {e}"
-                            upload_errors.append(error_msg)
-                            logger.error(f"Upload error: {error_msg}")
-                        finally:
-                            upload_queue.task_done()
-                except Exception as e:
-                    logger.error(f"Upload worker {worker_id} crashed: {type(e).__name__}: {e}")
-                    upload_errors.append(f"Upload worker {worker_id} crashed: {e}")
-                finally:
-                    logger.debug(f"Upload worker {worker_id} finished")
-                    upload_workers_finished.set()
-            
-            # Start upload worker threads
-            upload_threads = []
-            for _ in range(max(1, cfg.upload_workers)):
-                thread = threading.Thread(target=upload_worker, daemon=False)
-                thread.start()
-                upload_threads.append(thread)
-            
+                for fut in done:
+                    local_path, s3_key = upload_futs.pop(fut)
+                    try:
+                        uploaded, err = fut.result()
+                    except Exception as e:
+                        uploaded, err = False, f"{local_path.name} -> {s3_key}: {type(e).__name__}: {e}"
+                    if uploaded:
+                        uploaded_keys.add(s3_key)
+                        uploaded_ok += 1
+                        _presign_early(s3_key)
+                    if err:
+                        upload_errors.append(err)
+                        logger.error(f"Upload failed: {local_path.name} -> {s3_key}: {err}")
+
             try:
                 # Start processing in parallel
                 with ThreadPoolExecutor(max_workers=max(1, cfg.process_workers)) as process_ex:
@@ -1298,20 +1570,20 @@ def run_pipeline(
                                 completed_futures.add(fut)
                                 thumb_href = f"derived/thumbs/{rel_posix}"
                                 share_href = f"derived/share/{rel_posix}"
+                                thumb_key = f"{prefix}/thumbs/{rel_posix}"
+                                share_key = f"{prefix}/share/{rel_posix}"
+                                
+                                # Upload both derivatives right away
+                                for task in ((derived_thumbs_dir / rel_posix, thumb_key), (derived_share_dir / rel_posix, share_key)):
+                                    upload_futs[upload_ex.submit(_upload_ready, task)] = task
                                 
                                 # Track gallery items
                                 gallery_items_local.append((thumb_href, share_href, title, subtitle, sort_ts))
                                 
                                 # Map to S3 keys for progressive gallery updates
-                                thumb_rel = thumb_href.replace("derived/thumbs/", "")
-                                share_rel = share_href.replace("derived/share/", "")
-                                gallery_to_s3_keys[(thumb_href, share_href, title, subtitle, sort_ts)] = (
-                                    f"{prefix}/thumbs/{thumb_rel}",
-                                    f"{prefix}/share/{share_rel}",
-                                )
+                                gallery_to_s3_keys[(thumb_href, share_href, title, subtitle, sort_ts)] = (thumb_key, share_key)
                                 
-                                with processed_count_lock:
-                                    processed += 1
+                                processed += 1
                                 logger.debug(f"Processed [{processed}/{len(proc_tasks)}]: {rel_posix}")
                             except TimeoutError as e:
                                 # Handle timeout for individual image processing
@@ -1326,8 +1598,7 @@ def run_pipeline(
                                 continue
                             if status is not None and (time.time() - last_ui) > 0.75:
                                 last_ui = time.time()
-                                with uploaded_count_lock:
-                                    current_uploaded = uploaded_ok
+                                _collect_uploads([f for f in upload_futs if f.done()])
                                 status.write(
                                     Status(
                                         state="running",
@@ -1340,10 +1611,10 @@ def run_pipeline(
                                             "skipped": skipped,
                                             "processed_done": processed,
                                             "processed_total": len(proc_tasks),
-                                            "uploaded_done": current_uploaded,
+                                            "uploaded_done": uploaded_ok,
                                         },
                                         url=url,
-                                        qr_path=str(qr_png) if qr_png and qr_png.exists() and qr_png.stat().st_size > 0 else None,
+                                        qr_path=qr_path_str,
                                     )
                                 )
                     except TimeoutError:
@@ -1360,67 +1631,44 @@ def run_pipeline(
                 
                 logger.info(f"Processing complete: {processed}/{len(proc_tasks)} images processed")
                 
-                # Check if any uploads were queued
-                queue_size = upload_queue.qsize()
-                if queue_size == 0 and processed == 0:
+                # Every share image exists now, so build share.zip (local disk work)
+                # on its own thread while the uploads (network) drain.
+                logger.info(f"Building share.zip from {derived_share_dir}...")
+                share_zip_ex = ThreadPoolExecutor(max_workers=1)
+                share_zip_fut = share_zip_ex.submit(_build_share_zip, share_dir=derived_share_dir, out_zip=share_zip)
+                share_zip_ex.shutdown(wait=False)
+                
+                if not upload_futs and processed == 0:
                     logger.warning("No images were successfully processed, so no uploads were queued")
-                elif queue_size == 0 and processed > 0:
-                    logger.warning(f"Processed {processed} images but no uploads were queued - this may indicate a bug")
-                else:
-                    logger.info(f"Waiting for {queue_size} upload tasks to complete...")
+                elif upload_futs:
+                    logger.info(f"Waiting for {len(upload_futs)} upload tasks to complete...")
+                # The zip's URL doesn't depend on the object, sign it while the uploads drain
+                _presign_early(f"{prefix}/share.zip")
                 
-                # Wait for all upload tasks in queue to be processed with timeout
-                # queue.join() doesn't have a timeout, so we implement one by checking unfinished_tasks
                 upload_join_timeout = 3600  # 1 hour max for all uploads
-                upload_join_start = time.time()
-                
-                try:
-                    # Wait for queue to empty, but check periodically for timeout
-                    while upload_queue.unfinished_tasks > 0:
-                        elapsed = time.time() - upload_join_start
-                        if elapsed > upload_join_timeout:
-                            logger.error(f"Upload queue join timeout after {upload_join_timeout}s - {upload_queue.unfinished_tasks} tasks still unfinished")
-                            logger.error(f"Upload workers may be hung or crashed. Uploaded {uploaded_ok} so far.")
-                            break
-                        # Log progress every 30 seconds
-                        if int(elapsed) % 30 == 0 and elapsed > 0:
-                            logger.debug(f"Waiting for {upload_queue.unfinished_tasks} upload tasks to complete... ({int(elapsed)}s elapsed)")
-                        time.sleep(1)
-                    
-                    # Final join call - if there are still tasks, something is wrong
-                    if upload_queue.unfinished_tasks > 0:
-                        logger.warning(f"Upload queue still has {upload_queue.unfinished_tasks} unfinished tasks after timeout")
-                    else:
-                        upload_queue.join()  # Wait for any remaining tasks
-                except Exception as e:
-                    logger.warning(f"Exception waiting for upload queue: {e}")
-                
-                logger.info("All upload tasks queued, waiting for upload workers to complete...")
+                done, not_done = wait(list(upload_futs), timeout=upload_join_timeout)
+                _collect_uploads(done)
+                if not_done:
+                    uploads_hung = True
+                    logger.error(f"Upload timeout after {upload_join_timeout}s - {len(not_done)} tasks still unfinished")
+                    logger.error(f"Upload workers may be hung or crashed. Uploaded {uploaded_ok} so far.")
             finally:
-                # Always ensure upload workers are signaled to stop, even if processing fails
-                logger.debug("Signaling upload workers to stop...")
-                # Signal upload workers to stop (send sentinel for each worker)
-                for _ in range(len(upload_threads)):
-                    try:
-                        upload_queue.put(None)
-                    except Exception as e:
-                        logger.warning(f"Failed to signal upload worker: {e}")
-                
-                # Wait for all upload workers to finish
-                for thread in upload_threads:
-                    thread.join(timeout=300)  # 5 minute timeout per thread
-                    if thread.is_alive():
-                        logger.warning(f"Upload worker thread did not finish within timeout")
+                # Drop uploads that never started; wait for running ones unless they're stuck
+                upload_ex.shutdown(wait=not uploads_hung, cancel_futures=True)
             
             # Collect upload failures
             if upload_errors:
                 upload_failures.extend(upload_errors)
             
             logger.info(f"Upload complete: {uploaded_ok} objects uploaded")
+            _flush_upload_marks()
         
-        # Build a downloadable zip of share images (after all processing/uploads complete)
-        logger.info(f"Building share.zip from {derived_share_dir}...")
-        _build_share_zip(share_dir=derived_share_dir, out_zip=share_zip)
+        # Build a downloadable zip of share images (after all processing completes)
+        if share_zip_fut is not None:
+            share_zip_fut.result()
+        else:
+            logger.info(f"Building share.zip from {derived_share_dir}...")
+            _build_share_zip(share_dir=derived_share_dir, out_zip=share_zip)
         zip_size = share_zip.stat().st_size if share_zip.exists() else 0
         logger.info(f"Created share.zip: {share_zip} ({zip_size:,} bytes)")
         
@@ -1436,8 +1684,8 @@ def run_pipeline(
             logger.error(f"Failed to upload share.zip: {err}")
 
         # Gallery (local): sort by capture time (if available) then filename.
-        gallery_items_local.sort(key=lambda x: (x[4], x[2]))
-        local_items = [(a, b, c, d) for (a, b, c, d, _ts) in gallery_items_local]
+        gallery_items_local.sort(key=itemgetter(4, 2))
+        local_items = [item[:4] for item in gallery_items_local]
         build_index_html_from_items(
             session_id=session_id,
             items=local_items,
@@ -1446,6 +1694,19 @@ def run_pipeline(
         )
         logger.info(f"Generated gallery: {index_html}")
 
+        def _list_enhanced_keys() -> set[str] | None:
+            """Keys under enhanced/ from one listing; None means fall back to a HEAD per key."""
+            try:
+                return s3_list_keys(bucket=cfg.s3_bucket, prefix=f"{prefix}/enhanced/")
+            except Exception as e:
+                logger.debug(f"Could not list enhanced images, checking one by one: {e}")
+                return None
+
+        def _has_enhanced(enhanced_key: str, listed: set[str] | None) -> bool:
+            if listed is not None:
+                return enhanced_key in listed
+            return s3_object_exists(bucket=cfg.s3_bucket, key=enhanced_key)
+
         # Progressive gallery refresh function (uses uploaded_keys from parallel upload)
         def _refresh_gallery_progressively(keys: set[str]) -> None:
             """Build and upload a partial gallery with only images that have both thumb and share uploaded."""
@@ -1469,29 +1730,18 @@ def run_pipeline(
 
             # Presign URLs for ready images
             presigned_ready: list[tuple[str, str, str, str, str | None]] = []
+            enhanced_keys = _list_enhanced_keys()
             for thumb_rel, share_rel, title, subtitle in ready_rel_paths:
                 thumb_key = f"{prefix}/thumbs/{thumb_rel}"
                 share_key = f"{prefix}/share/{share_rel}"
                 enhanced_key = f"{prefix}/enhanced/{share_rel}"
                 try:
-                    thumb_url = s3_presign_url(
-                        bucket=cfg.s3_bucket,
-                        key=thumb_key,
-                        expires_in_seconds=cfg.presign_expiry_seconds,
-                    )
-                    share_url = s3_presign_url(
-                        bucket=cfg.s3_bucket,
-                        key=share_key,
-                        expires_in_seconds=cfg.presign_expiry_seconds,
-                    )
+                    thumb_url = _presign(thumb_key)
+                    share_url = _presign(share_key)
                     # Check for enhanced version
                     enhanced_url = None
-                    if s3_object_exists(bucket=cfg.s3_bucket, key=enhanced_key):
-                        enhanced_url = s3_presign_url(
-                            bucket=cfg.s3_bucket,
-                            key=enhanced_key,
-                            expires_in_seconds=cfg.presign_expiry_seconds,
-                        )
+                    if _has_enhanced(enhanced_key, enhanced_keys):
+                        enhanced_url = _presign(enhanced_key)
                     presigned_ready.append((thumb_url, share_url, title, subtitle, enhanced_url))
                 except Exception as e:
                     logger.warning(f"Failed to presign {thumb_key}: {e}")
@@ -1504,11 +1754,7 @@ def run_pipeline(
             download_href = None
             if f"{prefix}/share.zip" in keys:
                 try:
-                    download_href = s3_presign_url(
-                        bucket=cfg.s3_bucket,
-                        key=f"{prefix}/share.zip",
-                        expires_in_seconds=cfg.presign_expiry_seconds,
-                    )
+                    download_href = _presign(f"{prefix}/share.zip")
                 except Exception as e:
                     logger.warning(f"Failed to presign share.zip: {e}")
 
@@ -1563,7 +1809,7 @@ def run_pipeline(
         # Build an S3-shareable gallery that embeds presigned URLs for assets (bucket remains private).
         # We keep the local index.html (relative paths) for offline/local browsing.
         presigned_items: list[tuple[str, str, str, str]] = []
-        thumb_files = sorted([p for p in derived_thumbs_dir.rglob("*") if p.is_file()])
+        thumb_files = sorted([p for p in derived_thumbs_dir.rglob("*") if p.is_file()], key=_path_sort_key)
         logger.info(f"Generating presigned asset URLs for {len(thumb_files)} images with {cfg.presign_workers} workers...")
         if status is not None:
             status.write(
@@ -1575,10 +1821,12 @@ def run_pipeline(
                     volume=str(volume_path),
                     counts={"presigned_done": 0, "presigned_total": len(thumb_files) + 1},  # +1 for share.zip
                     url=url,  # Include URL so QR code remains visible
-                    qr_path=str(qr_png) if qr_png and qr_png.exists() and qr_png.stat().st_size > 0 else None,  # Include QR path so QR code remains visible
+                    qr_path=qr_path_str,  # Include QR path so QR code remains visible
                 )
             )
 
+        enhanced_keys = _list_enhanced_keys() if thumb_files else None
+
         def _presign_one(t: Path) -> tuple[str, str, str, str, float, str | None]:
             rel = t.relative_to(derived_thumbs_dir)
             thumb_key = f"{prefix}/thumbs/{rel.as_posix()}"
@@ -1588,24 +1836,12 @@ def run_pipeline(
             
             # Check if enhanced version exists
             enhanced_url = None
-            if s3_object_exists(bucket=cfg.s3_bucket, key=enhanced_key):
-                enhanced_url = s3_presign_url(
-                    bucket=cfg.s3_bucket,
-                    key=enhanced_key,
-                    expires_in_seconds=cfg.presign_expiry_seconds,
-                )
+            if _has_enhanced(enhanced_key, enhanced_keys):
+                enhanced_url = _presign(enhanced_key)
                 logger.debug(f"  Enhanced version available: {rel.as_posix()}")
             
-            thumb_url = s3_presign_url(
-                bucket=cfg.s3_bucket,
-                key=thumb_key,
-                expires_in_seconds=cfg.presign_expiry_seconds,
-            )
-            share_url = s3_presign_url(
-                bucket=cfg.s3_bucket,
-                key=share_key,
-                expires_in_seconds=cfg.presign_expiry_seconds,
-            )
+            thumb_url = _presign(thumb_key)
+            share_url = _presign(share_key)
             title = rel.as_posix()
             return (thumb_url, share_url, title, "", 9e18, enhanced_url)
 
@@ -1630,17 +1866,13 @@ def run_pipeline(
                                 volume=str(volume_path),
                                 counts={"presigned_done": done, "presigned_total": len(thumb_files) + 1},
                                 url=url,  # Include URL so QR code remains visible
-                                qr_path=str(qr_png) if qr_png and qr_png.exists() and qr_png.stat().st_size > 0 else None,  # Include QR path so QR code remains visible
+                                qr_path=qr_path_str,  # Include QR path so QR code remains visible
                             )
                         )
 
         # Presign the download zip
         logger.debug(f"Presigning share.zip...")
-        download_zip_url = s3_presign_url(
-            bucket=cfg.s3_bucket,
-            key=f"{prefix}/share.zip",
-            expires_in_seconds=cfg.presign_expiry_seconds,
-        )
+        download_zip_url = _presign(f"{prefix}/share.zip")
         logger.debug(f"Presigned share.zip URL")
         if status is not None:
             status.write(
@@ -1652,7 +1884,7 @@ def run_pipeline(
                     volume=str(volume_path),
                     counts={"presigned_done": len(thumb_files) + 1, "presigned_total": len(thumb_files) + 1},
                     url=url,  # Include URL so QR code remains visible
-                    qr_path=str(qr_png) if qr_png and qr_png.exists() and qr_png.stat().st_size > 0 else None,  # Include QR path so QR code remains visible
+                    qr_path=qr_path_str,  # Include QR path so QR code remains visible
                 )
             )
 
@@ -1701,16 +1933,15 @@ def run_pipeline(
 
         # Mark S3 status as complete so the early "loading" page auto-refreshes into the final gallery.
         logger.info("Marking upload as complete in status.json...")
-        s3_status_local.write_text(
-            json.dumps(
+        s3_status_local.write_bytes(
+            dumps_json_bytes(
                 {
                     "uploading": False,
                     "message": "Upload complete.",
                     "session_id": session_id,
                 }
             )
-            + "\n",
-            encoding="utf-8",
+            + b"\n"
         )
         uploaded, err = _upload_one((s3_status_local, status_key))
         if uploaded:
@@ -1730,21 +1961,24 @@ def run_pipeline(
             except Exception as e:
                 logger.warning(f"Error during final log upload: {e}")
         
-        # Fallback: upload log manually if uploader wasn't started or failed
+        # Fallback: upload the log manually if the uploader wasn't started or failed.
+        # Same gzip object at the same key as the uploader's, so the log is in one
+        # place in S3 either way.
         log_file = session_dir / "ghostroll.log"
         if log_file.exists() and (log_uploader is None or log_uploader.get_stats()["upload_count"] == 0):
-            log_key = f"{prefix}/logs/ghostroll.log"
             logger.info(f"Uploading session log to s3://{cfg.s3_bucket}/{log_key}...")
             # Flush all log handlers to ensure log file is complete before upload
             for handler in logger.handlers:
                 handler.flush()
             try:
-                uploaded, err = _upload_one((log_file, log_key))
-                if uploaded:
-                    uploaded_ok += 1
-                    logger.info(f"Session log uploaded: {log_key}")
-                if err:
-                    logger.warning(f"Failed to upload session log: {err}")
+                s3_put_bytes(
+                    gzip.compress(log_file.read_bytes(), mtime=0),
+                    bucket=cfg.s3_bucket,
+                    key=log_key,
+                    content_type="application/gzip",
+                )
+                uploaded_ok += 1
+                logger.info(f"Session log uploaded: {log_key}")
             except Exception as e:
                 logger.warning(f"Failed to upload session log: {e}")
 
@@ -1759,7 +1993,7 @@ def run_pipeline(
                 dcim_dir = originals_dir / "DCIM"
                 raw_files_list = []
                 if dcim_dir.exists():
-                    raw_files_list = sorted([p for p in dcim_dir.rglob("*") if p.is_file() and media.is_raw(p)])
+                    raw_files_list = sorted([p for p in dcim_dir.rglob("*") if p.is_file() and media.is_raw(p)], key=_path_sort_key)
                 
                 # Update status with RAW compression start
                 if status is not None and raw_files_list:
@@ -1780,7 +2014,7 @@ def run_pipeline(
                                 "raw_files_total": len(raw_files_list),
                             },
                             url=url,
-                            qr_path=str(qr_png) if qr_png and qr_png.exists() and qr_png.stat().st_size > 0 else None,
+                            qr_path=qr_path_str,
                         )
                     )
                 
@@ -1809,7 +2043,7 @@ def run_pipeline(
                                     "raw_files_total": total,
                                 },
                                 url=url,
-                                qr_path=str(qr_png) if qr_png and qr_png.exists() and qr_png.stat().st_size > 0 else None,
+                                qr_path=qr_path_str,
                             )
                         )
                 
@@ -1844,7 +2078,7 @@ def run_pipeline(
                                     "raw_zip_size_bytes": zip_size,
                                 },
                                 url=url,
-                                qr_path=str(qr_png) if qr_png and qr_png.exists() and qr_png.stat().st_size > 0 else None,
+                                qr_path=qr_path_str,
                             )
                         )
                     
@@ -1875,7 +2109,7 @@ def run_pipeline(
                                         "raw_uploaded": 1,
                                     },
                                     url=url,
-                                    qr_path=str(qr_png) if qr_png and qr_png.exists() and qr_png.stat().st_size > 0 else None,
+                                    qr_path=qr_path_str,
                                 )
                             )
                     if err:
@@ -1903,10 +2137,27 @@ def run_pipeline(
                                 "raw_upload_error": 1,
                             },
                             url=url,
-                            qr_path=str(qr_png) if qr_png and qr_png.exists() and qr_png.stat().st_size > 0 else None,
+                            qr_path=qr_path_str,
                         )
                     )
 
+        # Hashes are only reused when an unfinished run is retried; once a run
+        # completes, its files aren't uploaded again. Keep file_hashes from growing
+        # by dropping the rows for this run's files (other unfinished sessions keep
+        # theirs) rather than storing new ones.
+        with upload_marks_lock:
+            pending_hashes.clear()
+        _flush_upload_marks()
+
+        def forget_hashes(conn2: sqlite3.Connection) -> None:
+            with conn2:
+                _db_forget_file_hashes(conn2, keys=run_hash_keys)
+
+        try:
+            _db_run(cfg.db_path, forget_hashes)
+        except (OSError, sqlite3.Error) as e:
+            logger.debug(f"Could not prune cached file hashes: {e}")
+
         if status is not None:
             # Ensure QR code path is valid for done state
             # Re-verify the QR code file exists and is readable
@@ -1952,6 +2203,9 @@ def run_pipeline(
 
         return sp, url
     finally:
+        _flush_upload_marks()
+        if staging_root is not None:
+            shutil.rmtree(staging_root, ignore_errors=True)
         # Ensure log is uploaded even if pipeline crashes
         if 'log_uploader' in locals() and log_uploader is not None:
             try:
@@ -1,13 +1,46 @@
 from __future__ import annotations
 
 import json
+import logging
 import os
 import platform
+import queue
 import socket
 import subprocess
+import threading
 import time
 from dataclasses import dataclass
 from pathlib import Path
+from types import ModuleType
+
+
+logger = logging.getLogger("ghostroll.status")
+
+
+# orjson module once imported, False if unavailable (optional dependency).
+_ORJSON: ModuleType | bool | None = None
+
+
+def _get_orjson() -> ModuleType | None:
+    global _ORJSON
+    if _ORJSON is None:
+        try:
+            import orjson
+        except Exception:
+            _ORJSON = False
+        else:
+            _ORJSON = orjson
+    return _ORJSON or None
+
+
+def dumps_json_bytes(payload: dict, *, pretty: bool = False) -> bytes:
+    """UTF-8 JSON for payload via orjson when installed, else the stdlib (same output either way)."""
+    oj = _get_orjson()
+    if oj is not None:
+        return oj.dumps(payload, option=(oj.OPT_INDENT_2 | oj.OPT_SORT_KEYS) if pretty else 0)
+    if pretty:
+        return json.dumps(payload, indent=2, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
 
 
 def get_hostname() -> str:
@@ -401,7 +434,7 @@ class StatusWriter:
     def _atomic_write_json(path: Path, payload: dict) -> None:
         path.parent.mkdir(parents=True, exist_ok=True)
         tmp = path.with_suffix(path.suffix + ".tmp")
-        tmp.write_text(json.dumps(payload, indent=2, sort_keys=True) + os.linesep, encoding="utf-8")
+        tmp.write_bytes(dumps_json_bytes(payload, pretty=True) + os.linesep.encode())
         tmp.replace(path)
 
     def _write_status_image(self, payload: dict) -> None:
@@ -1039,3 +1072,84 @@ class StatusWriter:
             pass
 
 
+class AsyncStatusWriter:
+    """
+    Hands status updates to a background thread so the pipeline never waits on
+    the battery probe, JSON write or e-ink render.
+
+    Only the latest state matters to the UI: when the queue is full the oldest
+    update is dropped, and consecutive updates for the same (state, step) are
+    collapsed into the newest one. close() stops the thread and then writes the
+    last update synchronously if the thread didn't, so the final done/error state
+    always reaches disk; updates after close() are written synchronously too.
+    """
+
+    _STOP = object()
+
+    def __init__(self, writer: StatusWriter, *, maxsize: int = 8) -> None:
+        self.writer = writer
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._closed = False
+        # Newest update handed to write(), and the newest one the thread wrote
+        self._last: Status | None = None
+        self._last_written: Status | None = None
+        self._thread = threading.Thread(target=self._drain, name="ghostroll-status", daemon=True)
+        self._thread.start()
+
+    def write(self, status: Status) -> None:
+        if self._closed:
+            self._write_now(status)
+            return
+        self._last = status
+        while True:
+            try:
+                self._queue.put_nowait(status)
+                return
+            except queue.Full:
+                try:
+                    dropped = self._queue.get_nowait()
+                except queue.Empty:
+                    continue
+                logger.debug(f"Status queue full, dropping {dropped.state}/{dropped.step} update")
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+        last = self._last
+        if last is not None and last is not self._last_written:
+            self._write_now(last)
+
+    def _write_now(self, status: Status) -> None:
+        try:
+            self.writer.write(status)
+        except Exception as e:
+            # Status output is best-effort
+            logger.debug(f"Status write failed: {e}")
+
+    def _drain(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(item is self._STOP for item in batch)
+            pending = [item for item in batch if item is not self._STOP]
+            for i, status in enumerate(pending):
+                nxt = pending[i + 1] if i + 1 < len(pending) else None
+                if nxt is not None and (nxt.state, nxt.step) == (status.state, status.step):
+                    continue
+                try:
+                    self.writer.write(status)
+                except Exception as e:
+                    # Status output is best-effort; keep draining (close() retries the last one).
+                    logger.debug(f"Status write failed: {e}")
+                else:
+                    self._last_written = status
+            if stop:
+                return
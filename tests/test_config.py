@@ -218,3 +218,15 @@ def test_web_interface_env_file_fallback(tmp_path: Path, monkeypatch: pytest.Mon
     # Default behavior: enabled=True when not explicitly set
     assert cfg.web_enabled is True
 
+
+
+def test_hash_algo_config(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("GHOSTROLL_BASE_DIR", str(tmp_path))
+    monkeypatch.delenv("GHOSTROLL_HASH_ALGO", raising=False)
+    assert load_config().hash_algo == "sha256"
+
+    monkeypatch.setenv("GHOSTROLL_HASH_ALGO", "BLAKE3")
+    assert load_config().hash_algo == "blake3"
+
+    with pytest.raises(ValueError, match="md5"):
+        load_config(hash_algo="md5")
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import threading
+import time
 from pathlib import Path
 
 import pytest
@@ -118,3 +120,47 @@ def test_db_batch_insert(tmp_path: Path):
     
     conn.close()
 
+
+
+def test_db_connect_waits_for_writer(tmp_path: Path):
+    db_path = tmp_path / "test.db"
+    a = connect(db_path)
+    b = connect(db_path)
+    assert a.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert b.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+    assert b.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+
+    a.execute("INSERT INTO ingested_files(sha256,size_bytes,first_seen_utc) VALUES('aa', 1, 'x')")
+    # WAL: a reader is not blocked by the open write transaction
+    assert b.execute("SELECT COUNT(*) FROM ingested_files").fetchone()[0] == 0
+    a.commit()
+    assert b.execute("SELECT COUNT(*) FROM ingested_files").fetchone()[0] == 1
+
+    # A writer waits out another connection's write lock instead of failing
+    # with "database is locked". sqlite3 connections are bound to their thread,
+    # so the lock holder opens, locks and releases its own.
+    locked = threading.Event()
+
+    def hold_write_lock() -> None:
+        holder = connect(db_path)
+        holder.execute("BEGIN IMMEDIATE")
+        holder.execute("INSERT INTO ingested_files(sha256,size_bytes,first_seen_utc) VALUES('bb', 2, 'x')")
+        locked.set()
+        time.sleep(0.3)
+        holder.commit()
+        holder.close()
+
+    t = threading.Thread(target=hold_write_lock)
+    t.start()
+    try:
+        assert locked.wait(timeout=5)
+        start = time.monotonic()
+        with a:
+            a.execute("INSERT INTO ingested_files(sha256,size_bytes,first_seen_utc) VALUES('cc', 3, 'x')")
+        waited = time.monotonic() - start
+    finally:
+        t.join()
+    assert waited >= 0.2
+    assert a.execute("SELECT COUNT(*) FROM ingested_files").fetchone()[0] == 3
+    a.close()
+    b.close()
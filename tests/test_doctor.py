@@ -16,6 +16,7 @@ from ghostroll.doctor import (
     _check_aws_cli,
     _check_aws_identity,
     _check_disk_space,
+    _check_hash_backend,
     _check_mount_roots,
     _check_s3_access,
     _check_sd_detection,
@@ -247,6 +248,20 @@ def test_run_doctor_fatal_error(tmp_path: Path, monkeypatch: pytest.MonkeyPatch)
         assert rc == 2  # Fatal error should return 2
 
 
+def test_check_hash_backend_reports_cpu_sha(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    cpuinfo = tmp_path / "cpuinfo"
+    cpuinfo.write_text("processor\t: 0\nflags\t\t: fpu sse2 avx2 sha_ni\n", encoding="utf-8")
+    monkeypatch.setattr("ghostroll.doctor._CPUINFO", cpuinfo)
+    result = _check_hash_backend()
+    assert result.ok
+    assert "sha_ni" in result.message
+
+    cpuinfo.write_text("processor\t: 0\nflags\t\t: fpu sse2\n", encoding="utf-8")
+    result = _check_hash_backend()
+    assert result.ok
+    assert "software-only" in result.message
+
+
 def test_format_results():
     results = [
         CheckResult("test1", True, "OK"),
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
 import pytest
@@ -17,6 +17,23 @@ def test_parse_exif_datetime():
     assert _parse_exif_datetime("") is None
     assert _parse_exif_datetime("invalid") is None
     assert _parse_exif_datetime("2024-01-15 14:30:00") is None  # Wrong format
+    assert _parse_exif_datetime("2024:13:15 14:30:00") is None  # Out-of-range month
+    assert _parse_exif_datetime("0000:00:00 00:00:00") is None  # Camera "unset" placeholder
+    assert _parse_exif_datetime("2024:01:15 14:30:00 junk") is None
+
+
+def test_parse_exif_datetime_with_offset():
+    parsed = _parse_exif_datetime("2024:01:15 14:30:00+0200")
+    assert parsed == datetime(2024, 1, 15, 14, 30, 0, tzinfo=timezone(timedelta(hours=2)))
+    parsed = _parse_exif_datetime("2024:01:15 14:30:00-05:30")
+    assert parsed is not None
+    assert parsed.utcoffset() == -timedelta(hours=5, minutes=30)
+
+    # Malformed offsets are rejected, not raised
+    assert _parse_exif_datetime("2024:01:15 14:30:00+02\u00b30") is None  # superscript digit
+    assert _parse_exif_datetime("2024:01:15 14:30:00+\u0661\u066200") is None  # Arabic-Indic digits
+    assert _parse_exif_datetime("2024:01:15 14:30:00+9900") is None  # over 24 hours
+    assert _parse_exif_datetime("2024:01:\u0661\u0665 14:30:00") is None
 
 
 def test_extract_basic_exif_no_exif(tmp_path: Path):
@@ -51,6 +68,17 @@ def test_extract_basic_exif_with_exif(tmp_path: Path):
     assert isinstance(exif, BasicExif)
 
 
+def test_extract_basic_exif_non_jpeg(tmp_path: Path):
+    # PNG with EXIF-like metadata is skipped by the JPEG signature check
+    img = Image.new("RGB", (16, 16), (0, 0, 0))
+    exif = img.getexif()
+    exif[271] = "Canon"
+    png_path = tmp_path / "test.png"
+    img.save(png_path, format="PNG", exif=exif)
+
+    assert extract_basic_exif(png_path) == BasicExif(captured_at=None, captured_at_display=None, camera=None)
+
+
 def test_extract_basic_exif_missing_file(tmp_path: Path):
     missing_path = tmp_path / "nonexistent.jpg"
     exif = extract_basic_exif(missing_path)
@@ -58,4 +86,3 @@ def test_extract_basic_exif_missing_file(tmp_path: Path):
     assert exif.captured_at is None
     assert exif.captured_at_display is None
     assert exif.camera is None
-
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import gzip
+import os
 from pathlib import Path
 
 import pytest
@@ -108,13 +110,29 @@ def test_build_index_html_from_thumbs_dir(tmp_path: Path):
     assert out_path.exists()
     content = out_path.read_text("utf-8")
     assert "test-session" in content
-    # The function uses _posix which converts Path to forward-slash separated string
+    # Hrefs are built from the forward-slash path relative to thumbs_dir
     # Since thumbs_dir is "thumbs/subdir", rel for "img1.jpg" is just "img1.jpg" (relative to thumbs_dir)
     # So hrefs are "thumbs/img1.jpg" and "share/img1.jpg"
     assert "thumbs/img1.jpg" in content
     assert "share/img1.jpg" in content
 
 
+def test_build_index_html_from_thumbs_dir_nested_order(tmp_path: Path):
+    thumbs_dir = tmp_path / "thumbs"
+    (thumbs_dir / "a").mkdir(parents=True)
+    (thumbs_dir / "a" / "b.jpg").write_text("fake")
+    (thumbs_dir / "a-c.jpg").write_text("fake")
+    (thumbs_dir / "0.jpg").write_text("fake")
+
+    out_path = tmp_path / "index.html"
+    build_index_html(session_id="test-session", thumbs_dir=thumbs_dir, out_path=out_path)
+
+    content = out_path.read_text("utf-8")
+    # Directory components sort before siblings that merely share a prefix.
+    assert content.index("thumbs/0.jpg") < content.index("thumbs/a/b.jpg") < content.index("thumbs/a-c.jpg")
+    assert "3 images" in content
+
+
 def test_build_index_html_loading(tmp_path: Path):
     out_path = tmp_path / "index.html"
     status_url = "https://example.com/status.json"
@@ -169,3 +187,101 @@ def test_build_index_html_html_escaping(tmp_path: Path):
     # But user-provided content in title/caption should be escaped
     assert "Image &lt;script&gt;" in content
 
+
+def test_build_index_html_escapes_presigned_urls(tmp_path: Path):
+    out_path = tmp_path / "index.html"
+    items = [
+        (
+            "https://b.s3.amazonaws.com/t.jpg?X-Amz-Expires=60&X-Amz-Signature=ab",
+            "https://b.s3.amazonaws.com/s.jpg?X-Amz-Expires=60&X-Amz-Signature=cd",
+            "Sam's photo",
+            "Camera: Canon",
+        )
+    ]
+
+    build_index_html_presigned(
+        session_id="shoot-2024",
+        items=items,
+        download_href="https://b.s3.amazonaws.com/s.zip?a=1&b=2",
+        out_path=out_path,
+    )
+
+    content = out_path.read_text("utf-8")
+    assert "X-Amz-Expires=60&amp;X-Amz-Signature=ab" in content
+    assert "s.zip?a=1&amp;b=2" in content
+    assert 'data-cap="Sam&#x27;s photo"' in content
+    # Values without metacharacters pass through untouched.
+    assert 'data-sub="Camera: Canon"' in content
+    assert "<title>shoot-2024</title>" in content
+
+
+def test_gallery_write_replaces_existing_without_leftovers(tmp_path: Path):
+    out_path = tmp_path / "index.html"
+    out_path.write_text("stale page that is much longer than nothing " * 100, encoding="utf-8")
+
+    build_index_html_from_items(
+        session_id="test-session",
+        items=[],
+        download_href=None,
+        out_path=out_path,
+    )
+
+    content = out_path.read_text("utf-8")
+    assert "stale page" not in content
+    assert content.rstrip().endswith("</html>")
+    assert [p.name for p in tmp_path.iterdir()] == ["index.html"]
+
+
+def test_gallery_write_failure_cleans_up_temp_file(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    out_path = tmp_path / "index.html"
+
+    def boom(src, dst):
+        raise OSError("rename failed")
+
+    monkeypatch.setattr("ghostroll.gallery.os.replace", boom)
+    with pytest.raises(OSError):
+        build_index_html_from_items(
+            session_id="test-session",
+            items=[],
+            download_href=None,
+            out_path=out_path,
+        )
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_build_index_html_gzip_output(tmp_path: Path):
+    out_path = tmp_path / "index.html.gz"
+    items = [("thumbs/img1.jpg", "share/img1.jpg", "Image 1", "")]
+
+    build_index_html_from_items(
+        session_id="test-session",
+        items=items,
+        download_href=None,
+        out_path=out_path,
+    )
+
+    content = gzip.decompress(out_path.read_bytes()).decode("utf-8")
+    assert content.startswith("<!doctype html>")
+    assert "thumbs/img1.jpg" in content
+
+
+def test_gallery_pages_written_in_one_write(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    writes: list[int] = []
+    real_write = os.write
+
+    def counting_write(fd, data):
+        writes.append(len(data))
+        return real_write(fd, data)
+
+    monkeypatch.setattr("ghostroll.gallery.os.write", counting_write)
+    items = [(f"thumbs/{i}.jpg", f"share/{i}.jpg", f"{i}.jpg", "") for i in range(200)]
+    build_index_html_from_items(
+        session_id="test-session", items=items, download_href=None, out_path=tmp_path / "index.html"
+    )
+    assert len(writes) == 1
+    build_index_html_loading(
+        session_id="test-session",
+        status_json_url="https://example.com/status.json",
+        out_path=tmp_path / "loading.html",
+    )
+    assert len(writes) == 2
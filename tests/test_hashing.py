@@ -1,10 +1,11 @@
 from __future__ import annotations
 
+import hashlib
 from pathlib import Path
 
 import pytest
 
-from ghostroll.hashing import sha256_file
+from ghostroll.hashing import content_hash_many, hash_algo_of, hash_and_copy_file, sha256_file, sha256_many
 
 
 def test_sha256_file(tmp_path: Path):
@@ -84,3 +85,64 @@ def test_sha256_file_adaptive_chunk_size(tmp_path: Path):
     hash3_explicit, _ = sha256_file(large_file, chunk_size=8 * 1024 * 1024)
     assert hash3 == hash3_explicit
 
+
+
+def test_sha256_file_matches_hashlib_with_partial_last_chunk(tmp_path: Path):
+    data = bytes(range(256)) * 1000 + b"tail"
+    test_file = tmp_path / "odd.bin"
+    test_file.write_bytes(data)
+
+    hash_hex, size = sha256_file(test_file, chunk_size=4096)
+    assert hash_hex == hashlib.sha256(data).hexdigest()
+    assert size == len(data)
+
+
+def test_sha256_many_preserves_order_and_flags_missing(tmp_path: Path):
+    paths = []
+    for i in range(12):
+        p = tmp_path / f"f{i}.bin"
+        p.write_bytes(bytes([i]) * (i * 1000))
+        paths.append(p)
+    paths.insert(5, tmp_path / "missing.bin")
+
+    results = sha256_many(paths, workers=4)
+
+    assert results[5] is None
+    for p, res in zip(paths, results):
+        if p.exists():
+            assert res == sha256_file(p)
+
+
+def test_sha256_file_mmap_matches_streaming(tmp_path: Path):
+    test_file = tmp_path / "big.bin"
+    data = bytes(range(256)) * (33 * 4096) + b"tail"  # just over 33MB
+    test_file.write_bytes(data)
+
+    streamed = sha256_file(test_file)
+    mapped = sha256_file(test_file, use_mmap=True)
+    assert mapped == streamed == (hashlib.sha256(data).hexdigest(), len(data))
+    assert sha256_many([test_file], use_mmap=True) == [streamed]
+
+
+def test_blake3_digests_are_prefixed(tmp_path: Path):
+    blake3 = pytest.importorskip("blake3")
+    test_file = tmp_path / "big.bin"
+    data = bytes(range(256)) * (33 * 4096)
+    test_file.write_bytes(data)
+
+    expected = "b3:" + blake3.blake3(data).hexdigest()
+    results = content_hash_many([test_file, test_file], algo="blake3", workers=2, use_mmap=True)
+    assert results == [(expected, len(data))] * 2
+    assert hash_algo_of(expected) == "blake3"
+    assert hash_algo_of(sha256_file(test_file)[0]) == "sha256"
+
+
+def test_hash_and_copy_file_matches_sha256_file(tmp_path: Path):
+    src = tmp_path / "big.bin"
+    data = bytes(range(256)) * (12 * 4096) + b"tail"  # > 10MB: 4MB buffer, partial last read
+    src.write_bytes(data)
+    dst = tmp_path / "copy.bin"
+    dst.write_bytes(b"x" * (len(data) + 10))  # truncated on open
+
+    assert hash_and_copy_file(src, dst) == sha256_file(src)
+    assert dst.read_bytes() == data
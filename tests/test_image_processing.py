@@ -5,7 +5,11 @@ from pathlib import Path
 import pytest
 from PIL import Image
 
-from ghostroll.image_processing import ProcessingError, render_jpeg_derivative
+from ghostroll.image_processing import (
+    ProcessingError,
+    render_jpeg_derivative,
+    render_jpeg_derivatives,
+)
 
 
 def test_render_jpeg_derivative_basic(tmp_path: Path):
@@ -136,3 +140,169 @@ def test_render_jpeg_derivative_explicit_resampling(tmp_path: Path):
     with Image.open(dst) as result:
         assert max(result.size) <= 512
 
+
+
+def test_render_jpeg_derivatives_single_decode_matches_sizes(tmp_path: Path):
+    src = tmp_path / "src.jpg"
+    Image.new("RGB", (4000, 2999), (120, 160, 200)).save(src, format="JPEG", quality=92)
+
+    share = tmp_path / "share" / "a.jpg"
+    thumb = tmp_path / "thumbs" / "a.jpg"
+    # Order of targets doesn't matter; larger outputs are rendered first.
+    render_jpeg_derivatives(src, [(thumb, 512, 80), (share, 2048, 90)])
+
+    ref = tmp_path / "ref.jpg"
+    render_jpeg_derivative(src, dst_path=ref, max_long_edge=512, quality=80)
+    with Image.open(thumb) as t, Image.open(ref) as r:
+        assert t.size == r.size
+    with Image.open(share) as s:
+        assert s.size == (2048, 1535)
+
+
+def test_render_jpeg_derivatives_error_on_missing_file(tmp_path: Path):
+    with pytest.raises(ProcessingError):
+        render_jpeg_derivatives(tmp_path / "nonexistent.jpg", [(tmp_path / "dst.jpg", 512, 80)])
+
+
+def test_render_jpeg_derivative_rotated_jpeg_uses_original_geometry(tmp_path: Path):
+    src = tmp_path / "src.jpg"
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotate 90 CW on display
+    Image.new("RGB", (4000, 3000), (120, 160, 200)).save(src, format="JPEG", quality=92, exif=exif)
+
+    thumb = tmp_path / "thumb.jpg"
+    render_jpeg_derivative(src, dst_path=thumb, max_long_edge=512, quality=85)
+    with Image.open(thumb) as result:
+        assert result.size == (384, 512)
+
+    share = tmp_path / "share.jpg"
+    thumb2 = tmp_path / "thumb2.jpg"
+    render_jpeg_derivatives(src, [(share, 2048, 90), (thumb2, 512, 85)])
+    with Image.open(share) as s, Image.open(thumb2) as t:
+        assert s.size == (1536, 2048)
+        assert t.size == (384, 512)
+
+
+@pytest.fixture
+def fake_jpegtran(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    # Args: -copy none -optimize -progressive -outfile DST SRC
+    exe = tmp_path / "jpegtran"
+    exe.write_text('#!/bin/sh\ncp "$7" "$6"\n')
+    exe.chmod(0o755)
+    monkeypatch.setattr("ghostroll.image_processing._JPEGTRAN", str(exe))
+    return exe
+
+
+def test_render_jpeg_derivative_lossless_when_already_small(tmp_path: Path, fake_jpegtran: Path):
+    src = tmp_path / "src.jpg"
+    Image.new("RGB", (800, 600), (120, 160, 200)).save(src, format="JPEG", quality=92)
+    dst = tmp_path / "dst.jpg"
+
+    render_jpeg_derivative(src, dst_path=dst, max_long_edge=2048, quality=50)
+
+    assert dst.read_bytes() == src.read_bytes()
+
+
+def test_render_jpeg_derivative_reencodes_when_resize_or_rotation_needed(
+    tmp_path: Path, fake_jpegtran: Path
+):
+    src = tmp_path / "src.jpg"
+    Image.new("RGB", (800, 600), (120, 160, 200)).save(src, format="JPEG", quality=92)
+    rotated = tmp_path / "rotated.jpg"
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    Image.new("RGB", (800, 600), (120, 160, 200)).save(rotated, format="JPEG", quality=92, exif=exif)
+
+    thumb = tmp_path / "thumb.jpg"
+    render_jpeg_derivative(src, dst_path=thumb, max_long_edge=512, quality=85)
+    upright = tmp_path / "upright.jpg"
+    render_jpeg_derivative(rotated, dst_path=upright, max_long_edge=2048, quality=85)
+
+    with Image.open(thumb) as t, Image.open(upright) as u:
+        assert t.size == (512, 384)
+        assert u.size == (600, 800)
+
+
+def test_render_jpeg_derivatives_mixes_lossless_and_resized(tmp_path: Path, fake_jpegtran: Path):
+    src = tmp_path / "src.jpg"
+    Image.new("RGB", (800, 600), (120, 160, 200)).save(src, format="JPEG", quality=92)
+    share = tmp_path / "share.jpg"
+    thumb = tmp_path / "thumb.jpg"
+
+    render_jpeg_derivatives(src, [(share, 2048, 90), (thumb, 512, 85)])
+
+    assert share.read_bytes() == src.read_bytes()
+    with Image.open(thumb) as t:
+        assert t.size == (512, 384)
+
+
+def test_small_source_thumbnail_is_reencoded_not_copied(tmp_path: Path, fake_jpegtran: Path):
+    from PIL import JpegImagePlugin
+
+    # Already within the thumbnail size, but progressive 4:4:4 at quality 95
+    src = tmp_path / "src.jpg"
+    Image.new("RGB", (400, 300), (120, 160, 200)).save(
+        src, format="JPEG", quality=95, subsampling=0, progressive=True
+    )
+    thumb = tmp_path / "thumb.jpg"
+    single = tmp_path / "single.jpg"
+
+    render_jpeg_derivatives(src, [(thumb, 512, 85)])
+    render_jpeg_derivative(src, dst_path=single, max_long_edge=512, quality=85)
+
+    for out in (thumb, single):
+        assert out.read_bytes() != src.read_bytes()
+        with Image.open(out) as t:
+            assert t.size == (400, 300)
+            assert not t.info.get("progressive")
+            assert JpegImagePlugin.get_sampling(t) == 2
+
+
+def test_render_jpeg_derivatives_with_pyvips(tmp_path: Path):
+    pytest.importorskip("pyvips")
+
+    src = tmp_path / "src.jpg"
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    Image.new("L", (4000, 3000), 128).save(src, format="JPEG", quality=92, exif=exif)
+    share = tmp_path / "share.jpg"
+    thumb = tmp_path / "thumb.jpg"
+
+    render_jpeg_derivatives(src, [(thumb, 512, 85), (share, 2048, 90)])
+
+    with Image.open(share) as s, Image.open(thumb) as t:
+        assert s.mode == t.mode == "RGB"
+        assert max(s.size) == 2048 and s.size[0] < s.size[1]
+        assert max(t.size) == 512 and t.size[0] < t.size[1]
+        assert not s.getexif()
+
+
+def test_render_jpeg_derivative_progressive_only_above_thumbnail_size(tmp_path: Path):
+    src = tmp_path / "src.jpg"
+    Image.new("RGB", (4000, 3000), (120, 160, 200)).save(src, format="JPEG", quality=92)
+    thumb = tmp_path / "thumb.jpg"
+    share = tmp_path / "share.jpg"
+    forced = tmp_path / "forced.jpg"
+
+    render_jpeg_derivative(src, dst_path=thumb, max_long_edge=512, quality=85)
+    render_jpeg_derivative(src, dst_path=share, max_long_edge=2048, quality=90)
+    render_jpeg_derivative(src, dst_path=forced, max_long_edge=512, quality=85, progressive=True)
+
+    with Image.open(thumb) as t, Image.open(share) as s, Image.open(forced) as f:
+        assert not t.info.get("progressive")
+        assert s.info.get("progressive")
+        assert f.info.get("progressive")
+
+
+def test_render_jpeg_derivatives_thumbnail_is_420_at_high_quality(tmp_path: Path):
+    from PIL import JpegImagePlugin
+
+    src = tmp_path / "src.jpg"
+    Image.new("RGB", (4000, 3000), (120, 160, 200)).save(src, format="JPEG", quality=92)
+    thumb = tmp_path / "thumb.jpg"
+    share = tmp_path / "share.jpg"
+
+    render_jpeg_derivatives(src, [(thumb, 512, 95), (share, 2048, 95)])
+
+    with Image.open(thumb) as t:
+        assert JpegImagePlugin.get_sampling(t) == 2  # 4:2:0
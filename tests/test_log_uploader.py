@@ -0,0 +1,402 @@
+from __future__ import annotations
+
+import gzip
+import logging
+import signal
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from ghostroll import aws_boto3
+from ghostroll.aws_boto3 import AwsBoto3Error, s3_append_bytes
+from ghostroll.log_uploader import APPEND_THRESHOLD_BYTES, LogUploader
+
+
+def _uploader(tmp_path: Path) -> LogUploader:
+    return LogUploader(log_file=tmp_path / "ghostroll.log", s3_bucket="b", s3_key="logs/ghostroll.log")
+
+
+def test_large_log_sends_only_new_tail(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    calls: list[tuple[str, int]] = []
+    monkeypatch.setattr(
+        "ghostroll.log_uploader.s3_upload_file", lambda **kw: calls.append(("put", 0))
+    )
+    monkeypatch.setattr(
+        "ghostroll.log_uploader.s3_append_bytes",
+        lambda data, *, bucket, key, offset, content_type: calls.append(("append", offset)),
+    )
+    up = _uploader(tmp_path)
+    up.log_file.write_bytes(b"x" * APPEND_THRESHOLD_BYTES)
+
+    assert up.upload_now(force_flush=False)
+    # Unchanged log: nothing to send.
+    assert up.upload_now(force_flush=False)
+    with up.log_file.open("ab") as f:
+        f.write(b"new line\n")
+    assert up.upload_now(force_flush=False)
+
+    assert calls == [("put", 0), ("append", APPEND_THRESHOLD_BYTES)]
+    assert up.get_stats()["upload_count"] == 2
+
+
+def test_small_or_truncated_log_uses_full_upload(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    calls: list[str] = []
+    monkeypatch.setattr("ghostroll.log_uploader.s3_upload_file", lambda **kw: calls.append("put"))
+    monkeypatch.setattr(
+        "ghostroll.log_uploader.s3_append_bytes", lambda *a, **kw: calls.append("append")
+    )
+    up = _uploader(tmp_path)
+    up.log_file.write_bytes(b"small\n")
+    assert up.upload_now(force_flush=False)
+    up.log_file.write_bytes(b"small\nmore\n")
+    assert up.upload_now(force_flush=False)
+    assert calls == ["put", "put"]
+
+
+def test_failed_append_falls_back_to_full_upload(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    calls: list[str] = []
+
+    def failing_append(*a, **kw):
+        calls.append("append")
+        raise AwsBoto3Error("boom")
+
+    monkeypatch.setattr("ghostroll.log_uploader.s3_upload_file", lambda **kw: calls.append("put"))
+    monkeypatch.setattr("ghostroll.log_uploader.s3_append_bytes", failing_append)
+    up = _uploader(tmp_path)
+    up.log_file.write_bytes(b"x" * APPEND_THRESHOLD_BYTES)
+    assert up.upload_now(force_flush=False)
+    with up.log_file.open("ab") as f:
+        f.write(b"tail")
+    assert up.upload_now(force_flush=False)
+    assert calls == ["put", "append", "put"]
+
+
+def test_gz_key_uploads_gzip_members(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    remote: dict[str, bytes] = {}
+
+    def fake_put(data, *, bucket, key, content_type):
+        assert content_type == "application/gzip"
+        remote[key] = data
+
+    def fake_append(data, *, bucket, key, offset, content_type):
+        remote[key] = remote[key][:offset] + data
+
+    monkeypatch.setattr("ghostroll.log_uploader.s3_put_bytes", fake_put)
+    monkeypatch.setattr("ghostroll.log_uploader.s3_append_bytes", fake_append)
+    up = LogUploader(log_file=tmp_path / "ghostroll.log", s3_bucket="b", s3_key="logs/ghostroll.log.gz")
+
+    lines = b"".join(b"2024-01-01 12:00:%02d INFO processed IMG_%04d.JPG\n" % (i % 60, i) for i in range(500))
+    up.log_file.write_bytes(lines)
+    assert up.upload_now(force_flush=False)
+    assert len(remote["logs/ghostroll.log.gz"]) < len(lines) // 4
+
+    with up.log_file.open("ab") as f:
+        f.write(b"second batch\n")
+    assert up.upload_now(force_flush=False)
+    assert gzip.decompress(remote["logs/ghostroll.log.gz"]) == lines + b"second batch\n"
+
+    # Past the append threshold only the new member is sent.
+    monkeypatch.setattr("ghostroll.log_uploader.APPEND_THRESHOLD_BYTES", 1)
+    before = remote["logs/ghostroll.log.gz"]
+    with up.log_file.open("ab") as f:
+        f.write(b"third batch\n")
+    assert up.upload_now(force_flush=False)
+    assert remote["logs/ghostroll.log.gz"].startswith(before)
+    assert gzip.decompress(remote["logs/ghostroll.log.gz"]) == lines + b"second batch\nthird batch\n"
+
+
+def test_request_upload_wakes_worker_before_interval(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    uploaded = threading.Event()
+    monkeypatch.setattr("ghostroll.log_uploader.s3_upload_file", lambda **kw: uploaded.set())
+    up = LogUploader(
+        log_file=tmp_path / "ghostroll.log", s3_bucket="b", s3_key="k", upload_interval=3600.0
+    )
+    up.log_file.write_bytes(b"line\n")
+    up.start()
+    try:
+        up.request_upload()
+        assert uploaded.wait(timeout=5.0)
+    finally:
+        up.stop()
+    assert not up.get_stats()["is_running"]
+
+
+def test_non_blocking_upload_skips_while_another_is_running(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    calls: list[str] = []
+    monkeypatch.setattr("ghostroll.log_uploader.s3_upload_file", lambda **kw: calls.append("put"))
+    up = _uploader(tmp_path)
+    up.log_file.write_bytes(b"line\n")
+    with up._upload_lock:
+        assert up._upload_log(block=False) is False
+    assert calls == []
+    assert up._upload_log(block=False) is True
+    assert calls == ["put"]
+
+
+def test_signal_during_upload_on_same_thread_does_not_deadlock(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    up = _uploader(tmp_path)
+    up.log_file.write_bytes(b"line\n")
+    raised: list[int] = []
+    monkeypatch.setattr(signal, "signal", lambda signum, handler: None)
+    monkeypatch.setattr(signal, "raise_signal", raised.append)
+
+    def upload_interrupted_by_signal(**kw):
+        # Simulate SIGTERM arriving on this thread while it holds the upload lock
+        if not raised:
+            up._signal_handler(signal.SIGTERM, None)
+
+    monkeypatch.setattr("ghostroll.log_uploader.s3_upload_file", upload_interrupted_by_signal)
+    worker = threading.Thread(target=up.upload_now, daemon=True)
+    worker.start()
+    worker.join(timeout=5.0)
+    assert not worker.is_alive()
+    assert raised == [signal.SIGTERM]
+
+
+def test_idle_worker_backs_off_and_resets_on_new_output(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr("ghostroll.log_uploader.MAX_IDLE_UPLOAD_INTERVAL", 0.04)
+    uploads: list[int] = []
+    up = LogUploader(log_file=tmp_path / "ghostroll.log", s3_bucket="b", s3_key="k", upload_interval=0.01)
+    monkeypatch.setattr(
+        "ghostroll.log_uploader.s3_upload_file", lambda **kw: uploads.append(up.log_file.stat().st_size)
+    )
+    up.log_file.write_bytes(b"line\n")
+
+    # Fake clock: each wait "sleeps" for its full timeout instantly
+    now = [0.0]
+    monkeypatch.setattr(
+        "ghostroll.log_uploader.time", SimpleNamespace(monotonic=lambda: now[0], time=time.time)
+    )
+    timeouts: list[float] = []
+    real_wait_for = up._cv.wait_for
+
+    def recording_wait_for(predicate, timeout=None):
+        timeouts.append(timeout)
+        now[0] += timeout
+        if len(timeouts) == 7:
+            with up.log_file.open("ab") as f:
+                f.write(b"more\n")
+        if len(timeouts) == 9:
+            up._stop = True
+        return real_wait_for(predicate, timeout=0)
+
+    up._cv.wait_for = recording_wait_for
+    up._periodic_upload_worker()
+
+    # upload, idle, then doubling up to the cap; new output resets the interval
+    assert timeouts == pytest.approx([0.01, 0.01, 0.01, 0.02, 0.04, 0.04, 0.04, 0.01, 0.01])
+    assert uploads == [5, 10]
+
+
+def test_force_flush_flushes_only_the_log_files_handler(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr("ghostroll.log_uploader.s3_upload_file", lambda **kw: None)
+    log = logging.getLogger("ghostroll")
+    up = _uploader(tmp_path)
+    own = logging.FileHandler(up.log_file)
+    other = logging.FileHandler(tmp_path / "other.log")
+    flushed: list[logging.Handler] = []
+    for h in (own, other):
+        monkeypatch.setattr(h, "flush", lambda h=h: flushed.append(h))
+        log.addHandler(h)
+    try:
+        up.upload_now(force_flush=True)
+        up.upload_now(force_flush=True)
+        assert flushed == [own, own]
+    finally:
+        for h in (own, other):
+            log.removeHandler(h)
+            h.close()
+
+
+def test_worker_ticks_on_a_fixed_schedule(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    now = [0.0]
+    monkeypatch.setattr(
+        "ghostroll.log_uploader.time", SimpleNamespace(monotonic=lambda: now[0], time=time.time)
+    )
+    up = LogUploader(log_file=tmp_path / "ghostroll.log", s3_bucket="b", s3_key="k", upload_interval=30.0)
+
+    def slow_upload(**kw):
+        now[0] += 12.0
+
+    monkeypatch.setattr("ghostroll.log_uploader.s3_upload_file", slow_upload)
+    timeouts: list[float] = []
+    real_wait_for = up._cv.wait_for
+
+    def recording_wait_for(predicate, timeout=None):
+        timeouts.append(timeout)
+        now[0] += timeout
+        with up.log_file.open("ab") as f:
+            f.write(b"line\n")
+        if len(timeouts) == 3:
+            up._stop = True
+        return real_wait_for(predicate, timeout=0)
+
+    up._cv.wait_for = recording_wait_for
+    up._periodic_upload_worker()
+
+    # A 12s upload shortens the following wait instead of delaying every tick.
+    assert timeouts == pytest.approx([30.0, 18.0, 18.0])
+
+
+def test_tick_survives_a_failing_flush(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    calls: list[str] = []
+    monkeypatch.setattr("ghostroll.log_uploader.s3_upload_file", lambda **kw: calls.append("put"))
+    up = _uploader(tmp_path)
+    up.log_file.write_bytes(b"line\n")
+
+    def full_disk() -> None:
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(up, "_flush_handlers", full_disk)
+    assert up._tick() is True
+    assert calls == ["put"]
+
+
+def test_no_op_uploads_settle_without_the_lock(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    calls: list[str] = []
+    monkeypatch.setattr("ghostroll.log_uploader.s3_upload_file", lambda **kw: calls.append("put"))
+    up = _uploader(tmp_path)
+    assert up.upload_now() is False  # missing
+    up.log_file.write_bytes(b"")
+    assert up.upload_now() is False  # empty
+    up.log_file.write_bytes(b"line\n")
+    assert up.upload_now() is True
+    # An in-flight upload doesn't make an unchanged log wait for the lock.
+    with up._upload_lock:
+        assert up.upload_now() is True
+    assert calls == ["put"]
+
+
+class _FakeS3:
+    def __init__(self, *, fail_part: bool = False):
+        self.fail_part = fail_part
+        self.calls: list[tuple[str, dict]] = []
+
+    def create_multipart_upload(self, **kw):
+        self.calls.append(("create", kw))
+        return {"UploadId": "u1"}
+
+    def upload_part_copy(self, **kw):
+        self.calls.append(("copy", kw))
+        return {"CopyPartResult": {"ETag": "e1"}}
+
+    def upload_part(self, **kw):
+        self.calls.append(("part", kw))
+        if self.fail_part:
+            raise RuntimeError("network down")
+        return {"ETag": "e2"}
+
+    def complete_multipart_upload(self, **kw):
+        self.calls.append(("complete", kw))
+
+    def abort_multipart_upload(self, **kw):
+        self.calls.append(("abort", kw))
+
+
+def test_s3_append_bytes_copies_prefix_and_uploads_tail(monkeypatch: pytest.MonkeyPatch):
+    offset = aws_boto3.S3_MIN_PART_BYTES
+    fake = _FakeS3()
+    monkeypatch.setattr(aws_boto3, "_get_s3_client", lambda: fake)
+
+    s3_append_bytes(b"tail", bucket="b", key="k", offset=offset)
+
+    ops = {name: kw for name, kw in fake.calls}
+    assert [name for name, _ in fake.calls] == ["create", "copy", "part", "complete"]
+    assert ops["copy"]["CopySourceRange"] == f"bytes=0-{offset - 1}"
+    assert ops["part"]["Body"] == b"tail"
+    assert ops["complete"]["MultipartUpload"]["Parts"] == [
+        {"PartNumber": 1, "ETag": "e1"},
+        {"PartNumber": 2, "ETag": "e2"},
+    ]
+
+
+def test_s3_append_bytes_aborts_on_failure(monkeypatch: pytest.MonkeyPatch):
+    offset = aws_boto3.S3_MIN_PART_BYTES
+    fake = _FakeS3(fail_part=True)
+    monkeypatch.setattr(aws_boto3, "_get_s3_client", lambda: fake)
+
+    with pytest.raises(AwsBoto3Error):
+        s3_append_bytes(b"tail", bucket="b", key="k", offset=offset)
+    assert fake.calls[-1][0] == "abort"
+
+
+def test_s3_append_bytes_rejects_small_prefix():
+    with pytest.raises(AwsBoto3Error):
+        s3_append_bytes(b"more", bucket="b", key="k", offset=5)
+
+
+def test_s3_upload_file_reuses_transfer_manager(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    pytest.importorskip("boto3")
+    uploads: list[tuple] = []
+    created: list[object] = []
+
+    class _Manager:
+        def upload(self, fileobj, bucket, key, extra_args=None):
+            uploads.append((fileobj, bucket, key, extra_args))
+            return SimpleNamespace(result=lambda: None)
+
+    def create(client, config):
+        created.append(client)
+        return _Manager()
+
+    client = object()
+    monkeypatch.setattr(aws_boto3, "_get_s3_client", lambda: client)
+    monkeypatch.setattr(aws_boto3.boto3.s3.transfer, "create_transfer_manager", create)
+    monkeypatch.setattr(aws_boto3, "_transfer_managers", {})
+
+    for name in ("a.jpg", "b.html"):
+        (tmp_path / name).write_bytes(b"x")
+        aws_boto3.s3_upload_file(tmp_path / name, bucket="b", key=f"s/{name}")
+
+    assert created == [client]
+    assert [(key, extra["ContentType"]) for _, _, key, extra in uploads] == [
+        ("s/a.jpg", "image/jpeg"),
+        ("s/b.html", "text/html; charset=utf-8"),
+    ]
+
+
+def test_s3_client_created_once_across_threads(monkeypatch: pytest.MonkeyPatch):
+    created: list[object] = []
+
+    def make_client(service, **kw):
+        time.sleep(0.01)  # widen the race window
+        created.append(object())
+        return created[-1]
+
+    monkeypatch.setattr(aws_boto3, "BOTO3_AVAILABLE", True)
+    monkeypatch.setattr(aws_boto3, "boto3", SimpleNamespace(client=make_client))
+    monkeypatch.setattr(aws_boto3, "Config", lambda **kw: None)
+    monkeypatch.setattr(aws_boto3, "_s3_client", None)
+
+    got: list[object] = []
+    threads = [threading.Thread(target=lambda: got.append(aws_boto3._get_s3_client())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(created) == 1
+    assert got == created * 8
+
+
+def test_s3_list_keys_collects_all_pages(monkeypatch: pytest.MonkeyPatch):
+    pages = [{"Contents": [{"Key": "p/enhanced/a.jpg"}, {"Key": "p/enhanced/b.jpg"}]}, {"Contents": [{"Key": "p/enhanced/c.jpg"}]}, {}]
+    requests: list[dict] = []
+
+    class _Paginator:
+        def paginate(self, **kw):
+            requests.append(kw)
+            return iter(pages)
+
+    fake = SimpleNamespace(get_paginator=lambda name: _Paginator())
+    monkeypatch.setattr(aws_boto3, "_get_s3_client", lambda: fake)
+
+    assert aws_boto3.s3_list_keys(bucket="b", prefix="p/enhanced/") == {
+        "p/enhanced/a.jpg",
+        "p/enhanced/b.jpg",
+        "p/enhanced/c.jpg",
+    }
+    assert requests == [{"Bucket": "b", "Prefix": "p/enhanced/"}]
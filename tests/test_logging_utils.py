@@ -5,7 +5,7 @@ from pathlib import Path
 
 import pytest
 
-from ghostroll.logging_utils import attach_session_logfile, setup_logging
+from ghostroll.logging_utils import SessionFileHandler, attach_session_logfile, setup_logging
 
 
 def test_setup_logging_default():
@@ -63,3 +63,22 @@ def test_attach_session_logfile_creates_dir(tmp_path: Path):
     # Directory should be created
     assert session_dir.exists()
 
+
+
+def test_session_logfile_buffers_until_warning_or_flush(tmp_path: Path):
+    logger = setup_logging(session_dir=tmp_path)
+    log_file = tmp_path / "ghostroll.log"
+    fh = next(h for h in logger.handlers if isinstance(h, SessionFileHandler))
+
+    logger.info("routine progress")
+    assert "routine progress" not in log_file.read_text("utf-8")
+
+    logger.warning("card removed")
+    content = log_file.read_text("utf-8")
+    assert "routine progress" in content
+    assert "card removed" in content
+
+    logger.debug("more detail")
+    fh.flush()
+    assert "more detail" in log_file.read_text("utf-8")
+    fh.close()
@@ -45,3 +45,19 @@ def test_case_insensitive():
     assert is_media(Path("TEST.JPG"))
     assert is_media(Path("TEST.ARW"))
 
+
+
+def test_accepts_str_paths():
+    assert is_media("DCIM/100CANON/IMG_0001.JPG")
+    assert is_raw("DCIM/100CANON/IMG_0001.CR3")
+    assert not is_jpeg("DCIM/100CANON/IMG_0001.CR3")
+
+
+@pytest.mark.parametrize(
+    "name",
+    [".jpg", "DCIM/.jpg", "DCIM/.JPEG", "a/.cr2", "IMG.jpg.", "IMG.jpg/x", "..jpg", "a/..cr2", "._IMG_0001.JPG"],
+)
+def test_matches_path_suffix(name: str):
+    p = Path(name)
+    assert is_jpeg(name) == is_jpeg(p) == (p.suffix.lower() in {".jpg", ".jpeg"})
+    assert is_media(name) == is_media(p) == (p.suffix.lower() in {".jpg", ".jpeg", ".cr2"})
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import subprocess
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from ghostroll import mount_check
+from ghostroll.mount_check import is_real_device_mount
+
+
+@pytest.fixture(autouse=True)
+def linux(monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    monkeypatch.setattr(mount_check.platform, "system", lambda: "Linux")
+    # The test paths don't exist here; treat them as mount points so the
+    # mount table decides.
+    monkeypatch.setattr(mount_check.os.path, "ismount", lambda p: True)
+    mount_check._read_mountinfo.cache_clear()
+    mount_check._findmnt.cache_clear()
+    yield
+    mount_check._read_mountinfo.cache_clear()
+    mount_check._findmnt.cache_clear()
+
+
+def _write_mountinfo(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, lines: list[str]) -> None:
+    p = tmp_path / "mountinfo"
+    p.write_text("".join(line + "\n" for line in lines), encoding="utf-8")
+    monkeypatch.setattr(mount_check, "_MOUNTINFO", str(p))
+
+
+@pytest.fixture
+def fake_findmnt(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> list[list[str]]:
+    calls: list[list[str]] = []
+
+    def fake_run(cmd, **kwargs):
+        calls.append(cmd)
+        return subprocess.CompletedProcess(cmd, 0, stdout="vfat /dev/null\n", stderr="")
+
+    # No readable mountinfo, so checks fall back to findmnt.
+    monkeypatch.setattr(mount_check, "_MOUNTINFO", str(tmp_path / "missing"))
+    monkeypatch.setattr(mount_check.subprocess, "run", fake_run)
+    return calls
+
+
+def test_mountinfo_lookup_without_subprocess(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    def no_run(cmd, **kwargs):
+        raise AssertionError(f"unexpected subprocess: {cmd}")
+
+    monkeypatch.setattr(mount_check.subprocess, "run", no_run)
+    _write_mountinfo(
+        tmp_path,
+        monkeypatch,
+        [
+            "22 1 8:2 / / rw,relatime shared:1 - ext4 /dev/null rw",
+            "40 22 0:35 / /mnt/auto-import rw,relatime shared:20 - autofs systemd-1 rw,fd=49",
+            "41 40 179:1 / /mnt/auto-import rw,relatime shared:21 - vfat /dev/null rw",
+            "42 22 0:36 / /mnt/idle rw,relatime shared:22 - autofs systemd-1 rw,fd=50",
+            "43 22 179:2 / /mnt/EOS\\040DIGITAL rw,relatime - exfat /dev/null rw",
+            "44 22 179:3 / /mnt/gone rw,relatime - vfat /dev/does-not-exist rw",
+        ],
+    )
+
+    # A device stacked over its autofs trigger counts as mounted.
+    assert is_real_device_mount(Path("/mnt/auto-import"))
+    assert not is_real_device_mount(Path("/mnt/idle"))
+    assert is_real_device_mount(Path("/mnt/EOS DIGITAL"))
+    assert not is_real_device_mount(Path("/mnt/gone"))
+    assert not is_real_device_mount(Path("/mnt/not-mounted"))
+
+
+def test_findmnt_result_shared_within_a_second(fake_findmnt: list[list[str]], monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(mount_check.time, "monotonic", lambda: 100.5)
+    assert is_real_device_mount(Path("/mnt/card"))
+    assert is_real_device_mount(Path("/mnt/card"))
+    assert len(fake_findmnt) == 1
+
+    assert is_real_device_mount(Path("/mnt/other"))
+    assert len(fake_findmnt) == 2
+
+    monkeypatch.setattr(mount_check.time, "monotonic", lambda: 101.0)
+    assert is_real_device_mount(Path("/mnt/card"))
+    assert len(fake_findmnt) == 3
+
+
+def test_autofs_is_not_a_device_mount(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    def fake_run(cmd, **kwargs):
+        return subprocess.CompletedProcess(cmd, 0, stdout="autofs systemd-1\n", stderr="")
+
+    monkeypatch.setattr(mount_check, "_MOUNTINFO", str(tmp_path / "missing"))
+    monkeypatch.setattr(mount_check.subprocess, "run", fake_run)
+    assert not is_real_device_mount(Path("/mnt/auto-import"))
+
+
+def test_proc_mounts_fallback_when_findmnt_missing(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    def no_findmnt(cmd, **kwargs):
+        raise FileNotFoundError(cmd[0])
+
+    mounts = tmp_path / "mounts"
+    mounts.write_text(
+        "/dev/root / ext4 rw 0 0\n"
+        "/mnt/card /mnt/bind-of-card none rw,bind 0 0\n"
+        "systemd-1 /mnt/card autofs rw 0 0\n"
+        "/dev/mmcblk0p1 /mnt/card vfat rw 0 0\n"
+        "systemd-1 /mnt/idle autofs rw 0 0\n"
+        "/dev/sda1 /mnt/EOS\\040DIGITAL exfat rw 0 0",
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(mount_check, "_MOUNTINFO", str(tmp_path / "missing"))
+    monkeypatch.setattr(mount_check, "_PROC_MOUNTS", str(mounts))
+    monkeypatch.setattr(mount_check.subprocess, "run", no_findmnt)
+
+    assert mount_check._proc_mounts_fstype("/mnt/card") == "vfat"
+    assert is_real_device_mount(Path("/mnt/card"))
+    assert not is_real_device_mount(Path("/mnt/idle"))
+    assert is_real_device_mount(Path("/mnt/EOS DIGITAL"))
+    assert not is_real_device_mount(Path("/mnt/other"))
+
+
+def test_plain_directory_rejected_before_mount_table(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    reads: list[int] = []
+
+    class _SpyTable:
+        def __call__(self, bucket: int) -> dict[str, tuple[str, str]]:
+            reads.append(bucket)
+            return {}
+
+        def cache_clear(self) -> None:
+            pass
+
+    monkeypatch.setattr(mount_check.os.path, "ismount", lambda p: False)
+    monkeypatch.setattr(mount_check, "_read_mountinfo", _SpyTable())
+    assert not is_real_device_mount(tmp_path)
+    assert reads == []
+
+
+def test_automount_trigger_waits_only_until_device_appears(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    path_str = str(tmp_path)
+    tables = [
+        {path_str: ("autofs", "systemd-1")},
+        {path_str: ("autofs", "systemd-1")},
+        {path_str: ("vfat", "/dev/mmcblk0p1")},
+    ]
+    sleeps: list[float] = []
+    monkeypatch.setattr(mount_check, "_parse_mountinfo", lambda: tables.pop(0))
+    monkeypatch.setattr(mount_check.time, "sleep", sleeps.append)
+
+    assert mount_check._trigger_automount(path_str)
+    assert sleeps == [0.005, 0.01]
+
+    # Already mounted (or a plain directory): no waiting at all
+    sleeps.clear()
+    monkeypatch.setattr(mount_check, "_parse_mountinfo", lambda: {})
+    assert mount_check._trigger_automount(path_str)
+    assert sleeps == []
+
+    assert not mount_check._trigger_automount(str(tmp_path / "missing"))
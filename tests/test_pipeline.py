@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from ghostroll import pipeline
+from ghostroll.db import connect
+from ghostroll.pipeline import _build_share_zip, _path_sort_key
+
+
+def test_path_sort_key_matches_path_ordering():
+    paths = [
+        Path("/sd/DCIM/100CANON/IMG_0002.JPG"),
+        Path("/sd/DCIM/100CANON-B/IMG_0001.JPG"),
+        Path("/sd/DCIM/100CANON/IMG_0001.JPG"),
+        Path("/sd/DCIM/100CANON.X"),
+        Path("/sd/DCIM/100CANON/sub/IMG_0001.JPG"),
+    ]
+    assert sorted(paths, key=_path_sort_key) == sorted(paths)
+
+
+def test_build_share_zip_orders_entries(tmp_path: Path):
+    share_dir = tmp_path / "share"
+    (share_dir / "a").mkdir(parents=True)
+    (share_dir / "a" / "b.jpg").write_bytes(b"1")
+    (share_dir / "a-c.jpg").write_bytes(b"2")
+
+    out_zip = tmp_path / "share.zip"
+    _build_share_zip(share_dir=share_dir, out_zip=out_zip)
+
+    with zipfile.ZipFile(out_zip) as zf:
+        assert zf.namelist() == ["share/a/b.jpg", "share/a-c.jpg"]
+
+
+def test_build_share_zip_stores_compressed_media(tmp_path: Path):
+    share_dir = tmp_path / "share"
+    share_dir.mkdir()
+    (share_dir / "IMG_0001.JPG").write_bytes(b"x" * 1000)
+    (share_dir / "notes.txt").write_bytes(b"x" * 1000)
+
+    out_zip = tmp_path / "share.zip"
+    _build_share_zip(share_dir=share_dir, out_zip=out_zip)
+
+    with zipfile.ZipFile(out_zip) as zf:
+        assert zf.getinfo("share/IMG_0001.JPG").compress_type == zipfile.ZIP_STORED
+        assert zf.getinfo("share/notes.txt").compress_type == zipfile.ZIP_DEFLATED
+        assert zf.read("share/IMG_0001.JPG") == b"x" * 1000
+
+
+def test_sha256_local_cached_reuses_and_invalidates(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    f = tmp_path / "a.jpg"
+    f.write_bytes(b"first")
+
+    calls: list[Path] = []
+    real = pipeline.sha256_file
+
+    def counting(path, **kw):
+        calls.append(path)
+        return real(path, **kw)
+
+    monkeypatch.setattr(pipeline, "sha256_file", counting)
+
+    cache: pipeline.FileHashCache = {}
+    pending: list = []
+    first = pipeline._sha256_local_cached(cache, f, pending=pending)
+    assert pipeline._sha256_local_cached(cache, f, pending=pending) == first
+    assert len(calls) == 1
+    assert len(pending) == 1
+
+    f.write_bytes(b"second!")
+    st = f.stat()
+    os.utime(f, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    second = pipeline._sha256_local_cached(cache, f, pending=pending)
+    assert second != first
+    assert second == real(f)
+    assert len(calls) == 2
+
+    # Written in one batch, then loaded back for the next run
+    conn = connect(tmp_path / "test.db")
+    with conn:
+        pipeline._db_store_sha_batch(conn, items=pending)
+    loaded = pipeline._db_get_file_hashes(conn, dev=st.st_dev)
+    conn.close()
+    assert pipeline._sha256_local_cached(loaded, f, pending=[]) == second
+    assert len(calls) == 2
+
+
+def test_uploaded_marks_batch_and_load_by_prefix(tmp_path: Path):
+    conn = connect(tmp_path / "test.db")
+    with conn:
+        pipeline._db_mark_uploaded_batch(
+            conn,
+            items=[
+                ("sessions/shoot-1/share/a.jpg", "aa", 1),
+                ("sessions/shoot-1/index.html", "bb", 2),
+                ("sessions/shoot-10/index.html", "cc", 3),
+                ("sessions/shoot-1.old/index.html", "dd", 4),
+            ],
+        )
+        pipeline._db_mark_uploaded_batch(conn, items=[("sessions/shoot-1/index.html", "ee", 5)])
+
+    assert pipeline._db_get_uploaded(conn, prefix="sessions/shoot-1") == {
+        "sessions/shoot-1/share/a.jpg": "aa",
+        "sessions/shoot-1/index.html": "ee",
+    }
+    conn.close()
+
+
+def test_iter_media_files_walks_tree_without_subprocess(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    def no_run(cmd, **kwargs):
+        raise AssertionError(f"unexpected subprocess: {cmd}")
+
+    monkeypatch.setattr(subprocess, "run", no_run)
+    dcim = tmp_path / "DCIM"
+    (dcim / "100CANON" / "sub").mkdir(parents=True)
+    (dcim / "100CANON" / "IMG_0001.JPG").write_bytes(b"x")
+    (dcim / "100CANON" / "IMG_0001.CR3").write_bytes(b"x")
+    (dcim / "100CANON" / "._IMG_0001.JPG").write_bytes(b"x")
+    (dcim / "100CANON" / "notes.txt").write_bytes(b"x")
+    (dcim / "100CANON" / "sub" / "IMG_0002.jpg").write_bytes(b"x")
+    (dcim / "link.jpg").symlink_to(dcim / "100CANON" / "IMG_0001.JPG")
+    (dcim / "linkdir").symlink_to(dcim / "100CANON", target_is_directory=True)
+
+    (dcim / "100CANON" / "IMG_0001.CR3").write_bytes(b"raw data")
+    assert pipeline._iter_media_files(dcim) == [
+        (dcim / "100CANON" / "IMG_0001.CR3", 8),
+        (dcim / "100CANON" / "IMG_0001.JPG", 1),
+        (dcim / "100CANON" / "sub" / "IMG_0002.jpg", 1),
+    ]
+
+
+def test_db_lookups_probe_without_parameter_limit(tmp_path: Path):
+    conn = connect(tmp_path / "test.db")
+    conn.execute(
+        "INSERT INTO ingested_files(sha256,size_bytes,first_seen_utc) VALUES('aa', 10, 'x'), ('bb', 20, 'x')"
+    )
+    dcim = tmp_path / "DCIM"
+    conn.execute(
+        "INSERT INTO failed_files(file_path,size_bytes,first_failed_utc,last_failed_utc,failure_count) "
+        "VALUES('100CANON/A.JPG', 1, 'x', 'x', 2), (?, 1, 'x', 'x', 3), ('100CANON/C.JPG', 1, 'x', 'x', 1)",
+        (str(dcim / "100CANON" / "B.JPG"),),
+    )
+    conn.commit()
+
+    probes = [f"{i:064x}" for i in range(40_000)] + ["bb"]
+    assert pipeline._db_get_existing_shas(conn, probes) == {"bb"}
+    assert pipeline._db_get_known_sizes(conn, [10, 30, 10]) == {10}
+    paths = [dcim / "100CANON" / n for n in ("A.JPG", "B.JPG", "C.JPG", "D.JPG")]
+    # Only dcim-relative rows (what _db_mark_failed_file writes) with >= 2 failures match
+    assert pipeline._db_get_failed_files(conn, dcim_dir=dcim, paths=paths) == {paths[0]}
+    for _ in range(2):
+        pipeline._db_mark_failed_file(conn, file_path=paths[3], size_bytes=1, dcim_dir=dcim)
+    assert pipeline._db_get_failed_files(conn, dcim_dir=dcim, paths=paths) == {paths[0], paths[3]}
+    conn.commit()
+    # Lookups leave no transaction open on the pipeline's connection
+    assert not conn.in_transaction
+    conn.close()
+
+
+def test_scan_session_originals_matches_card_files(tmp_path: Path):
+    dcim = tmp_path / "vol" / "DCIM"
+    session = tmp_path / "sessions" / "shoot-1"
+    orig = session / "originals" / "DCIM" / "100CANON"
+    orig.mkdir(parents=True)
+    (orig / "IMG_0001.JPG").write_bytes(b"x")
+    (orig / "IMG_0002.JPG").write_bytes(b"x")  # no longer on the card
+
+    card_files = {dcim / "100CANON" / "IMG_0001.JPG", dcim / "100CANON" / "IMG_0003.JPG"}
+    found = pipeline._scan_session_originals(session, dcim_dir=dcim, card_files=card_files)
+    assert found == {dcim / "100CANON" / "IMG_0001.JPG": orig / "IMG_0001.JPG"}
+    assert pipeline._scan_session_originals(tmp_path / "missing", dcim_dir=dcim, card_files=card_files) == {}
+
+
+def test_copy2_ignore_existing_copies_data_and_mtime(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    src = tmp_path / "IMG_0001.CR3"
+    src.write_bytes(os.urandom(300_000))
+    os.utime(src, (1_600_000_000, 1_600_000_000))
+
+    dst = tmp_path / "out" / "IMG_0001.CR3"
+    assert pipeline._copy2_ignore_existing(src, dst)
+    assert dst.read_bytes() == src.read_bytes()
+    assert dst.stat().st_mtime == 1_600_000_000
+    assert not pipeline._copy2_ignore_existing(src, dst)
+
+    # Filesystems without copy_file_range fall back to shutil.copy2
+    def exdev(*args):
+        raise OSError(pipeline.errno.EXDEV, "cross-device")
+
+    monkeypatch.setattr(pipeline.os, "copy_file_range", exdev, raising=False)
+    dst2 = tmp_path / "out" / "IMG_0002.CR3"
+    assert pipeline._copy2_ignore_existing(src, dst2)
+    assert dst2.read_bytes() == src.read_bytes()
+    assert dst2.stat().st_mtime == 1_600_000_000
+
+
+def test_sha_xattr_round_trip(tmp_path: Path):
+    f = tmp_path / "IMG_0001.JPG"
+    f.write_bytes(b"data")
+    pipeline._store_sha_xattr(f, sha256="ab" * 32, size_bytes=4)
+    try:
+        os.getxattr(f, pipeline._SHA_XATTR)
+    except (AttributeError, OSError):
+        pytest.skip("no user xattrs on this filesystem")
+
+    assert pipeline._read_sha_xattr(f, st=f.stat()) == "ab" * 32
+    # Stale once the file changes
+    f.write_bytes(b"other data")
+    assert pipeline._read_sha_xattr(f, st=f.stat()) is None
+
+    # Not recorded when the copy's size doesn't match the hashed size
+    g = tmp_path / "IMG_0002.JPG"
+    g.write_bytes(b"data")
+    pipeline._store_sha_xattr(g, sha256="cd" * 32, size_bytes=5)
+    assert pipeline._read_sha_xattr(g, st=g.stat()) is None
+
+
+def test_pair_prefer_jpeg_splits_jpegs_and_raws():
+    files = [
+        Path("/sd/DCIM/100CANON/IMG_0002.CR3"),
+        Path("/sd/DCIM/100CANON/IMG_0001.jpg"),
+        Path("/sd/DCIM/100CANON/IMG_0001.CR3"),
+        Path("/sd/DCIM/100CANON/IMG_0003.JPEG"),
+        Path("/sd/DCIM/100CANON/IMG_0001.jpg"),
+    ]
+    jpegs, raws = pipeline._pair_prefer_jpeg(files)
+    assert jpegs == [Path("/sd/DCIM/100CANON/IMG_0001.jpg"), Path("/sd/DCIM/100CANON/IMG_0003.JPEG")]
+    assert raws == [Path("/sd/DCIM/100CANON/IMG_0001.CR3"), Path("/sd/DCIM/100CANON/IMG_0002.CR3")]
@@ -17,15 +17,7 @@ def _make_jpeg(path: Path) -> None:
     img.save(path, format="JPEG", quality=92)
 
 
-@pytest.mark.parametrize("workers", [(2, 2, 4)])
-def test_end_to_end_offline_smoke(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, workers) -> None:
-    process_workers, upload_workers, presign_workers = workers
-
-    # Fake SD card mount
-    vol = tmp_path / "vol"
-    dcim = vol / "DCIM" / "100CANON"
-    _make_jpeg(dcim / "IMG_0001.JPG")
-
+def _mock_s3(monkeypatch: pytest.MonkeyPatch) -> MagicMock:
     # Mock boto3 availability and client
     monkeypatch.setattr('ghostroll.aws_boto3.BOTO3_AVAILABLE', True)
     
@@ -35,9 +27,12 @@ def test_end_to_end_offline_smoke(tmp_path: Path, monkeypatch: pytest.MonkeyPatc
     mock_s3_client.upload_file = MagicMock()
     
     # Mock generate_presigned_url to return fake URLs
+    mock_s3_client.presigned_keys = []
+
     def fake_presign(operation, Params, ExpiresIn):
         bucket = Params.get('Bucket', '')
         key = Params.get('Key', '')
+        mock_s3_client.presigned_keys.append(key)
         return f"https://example.invalid/presigned?obj={bucket}/{key}&X-Amz-Signature=fake"
     
     mock_s3_client.generate_presigned_url = fake_presign
@@ -56,8 +51,10 @@ def test_end_to_end_offline_smoke(tmp_path: Path, monkeypatch: pytest.MonkeyPatc
     monkeypatch.setattr('ghostroll.aws_boto3.boto3', mock_boto3_module)
     monkeypatch.setattr('ghostroll.aws_boto3.Config', mock_config_class)
     monkeypatch.setattr('ghostroll.aws_boto3.TransferConfig', mock_transfer_config_class)
+    return mock_s3_client
 
-    out = tmp_path / "out"
+
+def _set_env(monkeypatch: pytest.MonkeyPatch, out: Path) -> None:
     monkeypatch.setenv("GHOSTROLL_BASE_DIR", str(out))
     monkeypatch.setenv("GHOSTROLL_DB_PATH", str(out / "ghostroll.db"))
     monkeypatch.setenv("GHOSTROLL_STATUS_PATH", str(out / "status.json"))
@@ -65,6 +62,20 @@ def test_end_to_end_offline_smoke(tmp_path: Path, monkeypatch: pytest.MonkeyPatc
     monkeypatch.setenv("GHOSTROLL_STATUS_IMAGE_SIZE", "320x240")
     monkeypatch.setenv("GHOSTROLL_S3_BUCKET", "photo-ingest-project")
     monkeypatch.setenv("GHOSTROLL_S3_PREFIX_ROOT", "sessions/")
+
+
+@pytest.mark.parametrize("workers", [(2, 2, 4)])
+def test_end_to_end_offline_smoke(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, workers) -> None:
+    process_workers, upload_workers, presign_workers = workers
+
+    # Fake SD card mount
+    vol = tmp_path / "vol"
+    dcim = vol / "DCIM" / "100CANON"
+    _make_jpeg(dcim / "IMG_0001.JPG")
+
+    mock_s3_client = _mock_s3(monkeypatch)
+    out = tmp_path / "out"
+    _set_env(monkeypatch, out)
     monkeypatch.setenv("GHOSTROLL_PROCESS_WORKERS", str(process_workers))
     monkeypatch.setenv("GHOSTROLL_UPLOAD_WORKERS", str(upload_workers))
     monkeypatch.setenv("GHOSTROLL_PRESIGN_WORKERS", str(presign_workers))
@@ -97,8 +108,200 @@ def test_end_to_end_offline_smoke(tmp_path: Path, monkeypatch: pytest.MonkeyPatc
         names = set(zf.namelist())
         assert "share/100CANON/IMG_0001.jpg" in names
 
+    # Uploads are recorded in the DB once the run finishes
+    from ghostroll.db import connect
+
+    conn = connect(out / "ghostroll.db")
+    keys = {row["s3_key"] for row in conn.execute("SELECT s3_key FROM uploads")}
+    # A completed run leaves no cached local hashes behind
+    assert conn.execute("SELECT COUNT(*) FROM file_hashes").fetchone()[0] == 0
+    conn.close()
+    assert f"sessions/{sess.name}/share.zip" in keys
+    assert f"sessions/{sess.name}/share/100CANON/IMG_0001.jpg" in keys
+
+    # Gallery assets and share.zip are each signed once per run
+    asset_keys = [k for k in mock_s3_client.presigned_keys if not k.endswith((".json", ".html"))]
+    assert sorted(asset_keys) == [
+        f"sessions/{sess.name}/share.zip",
+        f"sessions/{sess.name}/share/100CANON/IMG_0001.jpg",
+        f"sessions/{sess.name}/thumbs/100CANON/IMG_0001.jpg",
+    ]
+
     # Second run should dedupe to no-op (exit 0)
     with pytest.raises(SystemExit) as e2:
         ghostroll_main(["run", "--volume", str(vol)])
     assert e2.value.code == 0
 
+
+
+def test_switching_to_blake3_keeps_sha256_ingests(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    pytest.importorskip("blake3")
+    from ghostroll.db import connect
+
+    vol = tmp_path / "vol"
+    _make_jpeg(vol / "DCIM" / "100CANON" / "IMG_0001.JPG")
+    _mock_s3(monkeypatch)
+    out = tmp_path / "out"
+    _set_env(monkeypatch, out)
+
+    with pytest.raises(SystemExit) as e:
+        ghostroll_main(["run", "--volume", str(vol)])
+    assert e.value.code == 0
+    assert len(list(out.glob("shoot-*"))) == 1
+
+    # Same card after switching algorithms: recognized through its SHA-256 row,
+    # so no new session; the BLAKE3 digest is recorded alongside it.
+    monkeypatch.setenv("GHOSTROLL_HASH_ALGO", "blake3")
+    with pytest.raises(SystemExit) as e2:
+        ghostroll_main(["run", "--volume", str(vol)])
+    assert e2.value.code == 0
+    assert len(list(out.glob("shoot-*"))) == 1
+
+    conn = connect(out / "ghostroll.db")
+    shas = sorted(row[0] for row in conn.execute("SELECT sha256 FROM ingested_files"))
+    conn.close()
+    assert len(shas) == 2
+    assert shas[1].startswith("b3:") and len(shas[0]) == 64
+
+
+def test_known_new_files_are_copied_while_hashing(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    from ghostroll import hashing
+
+    vol = tmp_path / "vol"
+    dcim = vol / "DCIM" / "100CANON"
+    _make_jpeg(dcim / "IMG_0001.JPG")
+    _mock_s3(monkeypatch)
+    out = tmp_path / "out"
+    _set_env(monkeypatch, out)
+
+    with pytest.raises(SystemExit) as e:
+        ghostroll_main(["run", "--volume", str(vol)])
+    assert e.value.code == 0
+
+    # A second file whose size isn't in the DB yet is new without a duplicate check
+    new_file = dcim / "IMG_0002.JPG"
+    new_file.write_bytes((dcim / "IMG_0001.JPG").read_bytes() + b"\0" * 100)
+    copies: list[Path] = []
+    real_hash_and_copy = hashing.hash_and_copy_file
+
+    def spy(src, dst, **kwargs):
+        copies.append(src)
+        return real_hash_and_copy(src, dst, **kwargs)
+
+    monkeypatch.setattr("ghostroll.pipeline.hash_and_copy_file", spy)
+    with pytest.raises(SystemExit) as e2:
+        ghostroll_main(["run", "--volume", str(vol)])
+    assert e2.value.code == 0
+
+    assert copies == [new_file]
+    sess = sorted(out.glob("shoot-*"))[-1]
+    copied = sess / "originals" / "DCIM" / "100CANON" / "IMG_0002.JPG"
+    assert copied.read_bytes() == new_file.read_bytes()
+    assert copied.stat().st_mtime == new_file.stat().st_mtime
+    assert not list(out.glob(".incoming*"))
+
+
+def test_failed_run_leaves_no_staging_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    from ghostroll import pipeline
+
+    vol = tmp_path / "vol"
+    dcim = vol / "DCIM" / "100CANON"
+    _make_jpeg(dcim / "IMG_0001.JPG")
+    _mock_s3(monkeypatch)
+    out = tmp_path / "out"
+    _set_env(monkeypatch, out)
+    with pytest.raises(SystemExit) as e:
+        ghostroll_main(["run", "--volume", str(vol)])
+    assert e.value.code == 0
+
+    # A stale dir from a killed run is swept; a fresh one may be a concurrent run's
+    stale = out / ".incoming-killed"
+    stale.mkdir()
+    os.utime(stale, (0, 0))
+    concurrent = out / ".incoming-other"
+    concurrent.mkdir()
+
+    # A file of a size not in the DB yet is copied into staging while it is hashed
+    (dcim / "IMG_0002.JPG").write_bytes((dcim / "IMG_0001.JPG").read_bytes() + b"\0" * 100)
+    staged_files: list[Path] = []
+
+    def fail_after_hashing(staged, *, staging_dcim, **kwargs):
+        staged_files.extend(p for p in staging_dcim.rglob("*") if p.is_file())
+        raise RuntimeError("disk went away")
+
+    monkeypatch.setattr(pipeline, "_adopt_staged", fail_after_hashing)
+    with pytest.raises((SystemExit, RuntimeError)):
+        ghostroll_main(["run", "--volume", str(vol)])
+
+    assert [p.name for p in staged_files] == ["IMG_0002.JPG"]
+    assert list(out.glob(".incoming*")) == [concurrent]
+
+
+def test_completed_run_keeps_other_sessions_cached_hashes(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    from ghostroll import pipeline
+    from ghostroll.aws_boto3 import AwsBoto3Error
+    from ghostroll.db import connect
+
+    _mock_s3(monkeypatch)
+    out = tmp_path / "out"
+    _set_env(monkeypatch, out)
+
+    def _hash_keys() -> set[tuple[int, int]]:
+        conn = connect(out / "ghostroll.db")
+        keys = {(row["dev"], row["ino"]) for row in conn.execute("SELECT dev, ino FROM file_hashes")}
+        conn.close()
+        return keys
+
+    # Session A: every upload fails, so the run stops with its hashes cached
+    def failing_upload(*args, **kwargs):
+        raise AwsBoto3Error("network down")
+
+    monkeypatch.setattr(pipeline, "s3_upload_file", failing_upload)
+    vol_a = tmp_path / "vol-a"
+    _make_jpeg(vol_a / "DCIM" / "100CANON" / "IMG_0001.JPG")
+    with pytest.raises(SystemExit) as e:
+        ghostroll_main(["run", "--volume", str(vol_a)])
+    assert e.value.code != 0
+    rows_a = _hash_keys()
+    assert rows_a
+
+    # Session B (another card) completes and prunes only its own rows
+    monkeypatch.setattr(pipeline, "s3_upload_file", lambda *args, **kwargs: None)
+    vol_b = tmp_path / "vol-b"
+    vol_b.mkdir()
+    (vol_b / "DCIM" / "100CANON").mkdir(parents=True)
+    Image.new("RGB", (2400, 1600), (10, 200, 40)).save(vol_b / "DCIM" / "100CANON" / "IMG_0100.JPG", quality=92)
+    with pytest.raises(SystemExit) as e2:
+        ghostroll_main(["run", "--volume", str(vol_b)])
+    assert e2.value.code == 0
+    assert len(list(out.glob("shoot-*"))) == 2
+    assert _hash_keys() == rows_a
+
+
+def test_fallback_log_upload_uses_the_gzip_key(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    import gzip
+
+    from ghostroll import pipeline
+
+    vol = tmp_path / "vol"
+    _make_jpeg(vol / "DCIM" / "100CANON" / "IMG_0001.JPG")
+    _mock_s3(monkeypatch)
+    out = tmp_path / "out"
+    _set_env(monkeypatch, out)
+
+    def no_uploader(**kwargs):
+        raise RuntimeError("uploader unavailable")
+
+    puts: dict[str, tuple[bytes, str]] = {}
+    monkeypatch.setattr(pipeline, "ensure_log_upload", no_uploader)
+    monkeypatch.setattr(
+        pipeline, "s3_put_bytes", lambda data, *, bucket, key, content_type: puts.update({key: (data, content_type)})
+    )
+    with pytest.raises(SystemExit) as e:
+        ghostroll_main(["run", "--volume", str(vol)])
+    assert e.value.code == 0
+
+    sess = sorted(out.glob("shoot-*"))[-1]
+    body, content_type = puts[f"sessions/{sess.name}/logs/ghostroll.log.gz"]
+    assert content_type == "application/gzip"
+    assert b"Uploading session log" in gzip.decompress(body)
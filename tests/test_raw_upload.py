@@ -192,8 +192,8 @@ def test_end_to_end_with_raw_files(tmp_path: Path, monkeypatch: pytest.MonkeyPat
             assert "DCIM/100CANON/IMG_0001.JPG" not in names
         
             # Verify upload was called for RAW zip
-            # upload_file is called with (local_path, bucket, key) or (local_path, bucket, key, Config=...)
-            upload_calls = mock_s3_client.upload_file.call_args_list
+            # The shared transfer manager's upload is called with (local_path, bucket, key, extra_args=...)
+            upload_calls = mock_boto3_module.s3.transfer.create_transfer_manager.return_value.upload.call_args_list
             raw_zip_uploaded = False
             for call in upload_calls:
                 # Check args: first arg is local path (Path object), second is bucket, third is key
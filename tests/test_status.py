@@ -1,12 +1,14 @@
 from __future__ import annotations
 
 import json
+import threading
 import time
 from pathlib import Path
 
 import pytest
 
-from ghostroll.status import Status, StatusWriter, get_hostname, get_ip_address
+from ghostroll import status as status_mod
+from ghostroll.status import AsyncStatusWriter, Status, StatusWriter, dumps_json_bytes, get_hostname, get_ip_address
 
 
 def test_status_dataclass():
@@ -131,3 +133,72 @@ def test_get_ip_address():
         assert len(parts) == 4
         assert all(0 <= int(p) <= 255 for p in parts)
 
+
+
+def test_async_status_writer_coalesces_and_flushes(tmp_path: Path):
+    json_path = tmp_path / "status.json"
+    written: list[tuple[str, str, str]] = []
+    gate = threading.Event()
+
+    class _SlowWriter(StatusWriter):
+        def write(self, status: Status) -> None:
+            gate.wait(timeout=5)
+            written.append((status.state, status.step, status.message))
+            super().write(status)
+
+    writer = AsyncStatusWriter(_SlowWriter(json_path=json_path), maxsize=4)
+    # The first update occupies the drain thread while the rest queue up.
+    writer.write(Status(state="running", step="start", message="0"))
+    time.sleep(0.05)
+    for i in range(1, 4):
+        writer.write(Status(state="running", step="process", message=str(i)))
+    writer.write(Status(state="running", step="upload", message="4"))
+    writer.write(Status(state="done", step="done", message="5"))
+    gate.set()
+    writer.close()
+
+    # Queue full: the oldest pending update was dropped; same-step runs collapse.
+    assert written == [
+        ("running", "start", "0"),
+        ("running", "process", "3"),
+        ("running", "upload", "4"),
+        ("done", "done", "5"),
+    ]
+    assert json.loads(json_path.read_text("utf-8"))["state"] == "done"
+
+
+@pytest.mark.parametrize("use_orjson", [False, True])
+def test_dumps_json_bytes_matches_stdlib(use_orjson: bool, monkeypatch: pytest.MonkeyPatch):
+    if use_orjson:
+        monkeypatch.setattr(status_mod, "_ORJSON", pytest.importorskip("orjson"))
+    else:
+        monkeypatch.setattr(status_mod, "_ORJSON", False)
+    payload = {"uploading": True, "message": "Upload in progress…", "counts": {"b": 2, "a": 1}}
+
+    assert json.loads(dumps_json_bytes(payload)) == payload
+    assert dumps_json_bytes(payload, pretty=True).decode("utf-8") == json.dumps(
+        payload, indent=2, sort_keys=True, ensure_ascii=False
+    )
+
+
+def test_async_status_writer_close_persists_final_state(tmp_path: Path):
+    json_path = tmp_path / "status.json"
+    failures = [1]
+
+    class _FlakyWriter(StatusWriter):
+        def write(self, status: Status) -> None:
+            if status.state == "done" and failures:
+                failures.pop()
+                raise OSError("disk busy")
+            super().write(status)
+
+    writer = AsyncStatusWriter(_FlakyWriter(json_path=json_path))
+    writer.write(Status(state="running", step="upload", message="uploading"))
+    writer.write(Status(state="done", step="done", message="Complete."))
+    writer.close()
+    # The background write of the final state failed; close() wrote it again.
+    assert json.loads(json_path.read_text("utf-8"))["state"] == "done"
+
+    # Written straight through once closed, rather than lost
+    writer.write(Status(state="error", step="upload", message="late"))
+    assert json.loads(json_path.read_text("utf-8"))["state"] == "error"